@@ -0,0 +1,157 @@
+import argparse
+import hashlib
+import json
+import mimetypes
+import os
+import random
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+from bs4 import BeautifulSoup
+import http_client
+import stat_blocks
+
+INDEX_FILE = "index.json"
+
+
+def load_index(fixture_dir):
+    with open(os.path.join(fixture_dir, INDEX_FILE), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_fixture(fixture_dir, entry):
+    with open(os.path.join(fixture_dir, entry['file']), 'rb') as f:
+        return f.read()
+
+
+def request_key(url):
+    parts = urlsplit(url)
+    return f"{parts.path}?{parts.query}" if parts.query else parts.path
+
+
+class FixtureRecorder:
+    def __init__(self, fixture_dir, site_root=stat_blocks.AIDEDD_ROOT):
+        self.fixture_dir = fixture_dir
+        self.site_root = site_root
+        self.client = http_client.HttpClient()
+        os.makedirs(self.fixture_dir, exist_ok=True)
+        self.index = load_index(self.fixture_dir) if os.path.exists(os.path.join(self.fixture_dir, INDEX_FILE)) else {}
+
+    def record(self, url):
+        key = request_key(url)
+        if key in self.index:
+            return read_fixture(self.fixture_dir, self.index[key])
+        response = self.client.get(url, use_cache=False)
+        content_type = response.headers.get('Content-Type', 'application/octet-stream')
+        # L'extension suit le type de contenu : bench_stat_blocks.py retrouve les fiches par *.html
+        filename = hashlib.sha1(key.encode('utf-8')).hexdigest() + (mimetypes.guess_extension(content_type.split(';')[0].strip()) or '')
+        with open(os.path.join(self.fixture_dir, filename), 'wb') as f:
+            f.write(response.content)
+        self.index[key] = {'file': filename, 'status': response.status_code, 'content_type': content_type, 'recorded_at': time.time()}
+        print(f"Enregistré : {key} ({response.status_code}, {len(response.content)} octets)")
+        return response.content
+
+    def save_index(self):
+        with open(os.path.join(self.fixture_dir, INDEX_FILE), 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, indent=1, ensure_ascii=False)
+
+    def record_site(self, limit=None, images=True):
+        try:
+            listing = self.record(stat_blocks.listing_url(self.site_root))
+            table = BeautifulSoup(listing, 'html.parser').find('table', id='liste')
+            names = [row.find_all('td')[1].find('a').text.strip() for row in table.find('tbody').find_all('tr') if len(row.find_all('td')) >= 8] if table else []
+            for name in names[:limit]:
+                url = stat_blocks.monster_url(name, self.site_root)
+                try:
+                    monster_info = stat_blocks.parse_stat_block(name, url, self.record(url), self.site_root)
+                    if images:
+                        for image_url in monster_info.get('image_urls', []):
+                            self.record(image_url)
+                except Exception as e:
+                    print(f"Erreur avec {url}: {e}")
+        finally:
+            self.save_index()
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        time.sleep(max(0, random.gauss(server.latency, server.jitter)) / 1000)
+        if server.error_rate and random.random() < server.error_rate:
+            self.send_body(server.error_status, "Erreur injectée".encode("utf-8"), 'text/plain')
+            return
+        entry = server.index.get(self.path)
+        if entry is None:
+            self.send_body(404, b"Fixture absente", 'text/plain')
+            return
+        content = read_fixture(server.fixture_dir, entry)
+        if entry['content_type'].startswith('text/html'):
+            # Les liens absolus vers aidedd pointent vers ce serveur
+            content = content.replace(server.recorded_root.encode('utf-8'), server.root.encode('utf-8'))
+        etag = '"' + hashlib.sha1(content).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_body(304, b"", None, etag)
+            return
+        self.send_body(entry['status'], content, entry['content_type'], etag, formatdate(entry['recorded_at'], usegmt=True))
+
+    def send_body(self, status, content, content_type, etag=None, last_modified=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        if etag:
+            self.send_header('ETag', etag)
+        if last_modified:
+            self.send_header('Last-Modified', last_modified)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fixture_dir, host='127.0.0.1', port=8000, latency=0, jitter=0, error_rate=0, error_status=503,
+                 recorded_root=stat_blocks.AIDEDD_ROOT, verbose=False):
+        super().__init__((host, port), ReplayHandler)
+        self.fixture_dir = fixture_dir
+        self.index = load_index(fixture_dir)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.recorded_root = recorded_root
+        self.root = f"http://{host}:{self.server_address[1]}"
+        self.verbose = verbose
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enregistre aidedd.org dans un dossier de fixtures et le rejoue localement")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="Enregistre la liste, les fiches et les portraits")
+    record.add_argument("--dir", default="fixtures")
+    record.add_argument("--limit", type=int, default=None, help="Nombre maximal de fiches")
+    record.add_argument("--no-images", action="store_true")
+    serve = commands.add_parser("serve", help="Sert les fixtures enregistrées")
+    serve.add_argument("--dir", default="fixtures")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument("--latency", type=float, default=0, help="Latence moyenne en ms")
+    serve.add_argument("--jitter", type=float, default=0, help="Écart type de la latence en ms")
+    serve.add_argument("--error-rate", type=float, default=0, help="Proportion de réponses en erreur (0-1)")
+    serve.add_argument("--error-status", type=int, default=503)
+    serve.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        FixtureRecorder(args.dir).record_site(args.limit, not args.no_images)
+    else:
+        server = ReplayServer(args.dir, args.host, args.port, args.latency, args.jitter, args.error_rate, args.error_status, verbose=args.verbose)
+        print(f"Fixtures servies sur {server.root} (AIDEDD_SITE_ROOT={server.root})")
+        server.serve_forever()
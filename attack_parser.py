@@ -0,0 +1,119 @@
+import re
+from dice import compile_expression
+
+# Formulations aidedd : "Attaque d'arme au corps à corps : +4 pour toucher", "Attaque au corps à corps avec une arme : +4
+# pour toucher" (2014), "Jet d'attaque au corps à corps : +4" (2024)
+ATTACK_RE = re.compile(r"(?:Attaque|Jet d'attaque)\s+(?:(d'arme|de sort)\s+)?(au corps à corps ou à distance|au corps à corps|à distance)"
+                       r"(?:\s+(avec une arme|avec un sort))?\s*:\s*([+-]\s*\d+)", re.IGNORECASE)
+# Dernier recours pour toute autre tournure : le bonus qui précède "pour toucher"
+TO_HIT_RE = re.compile(r"([+-]\s*\d+)\s*pour toucher", re.IGNORECASE)
+KIND_RE = re.compile(r"au corps à corps ou à distance|au corps à corps|à distance", re.IGNORECASE)
+REACH_RE = re.compile(r"allonge\s+(\d+(?:[.,]\d+)?\s*m)\b", re.IGNORECASE)
+RANGE_RE = re.compile(r"portée\s+(\d+(?:[.,]\d+)?(?:\s*/\s*\d+(?:[.,]\d+)?)?\s*m)\b", re.IGNORECASE)
+# "jet de sauvegarde de Dextérité DD 13" ou "Jet de sauvegarde de Dextérité : DD 13"
+SAVE_RE = re.compile(r"jet de sauvegarde d(?:e\s+|')(\w+)\s*:?\s*(?:,\s*)?DD\s*(\d+)", re.IGNORECASE)
+HIT_RE = re.compile(r"Touché\s*:", re.IGNORECASE)
+# "5 (1d6 + 2) dégâts tranchants", "plus 7 (2d6) dégâts de feu", "1 dégât perforant"
+DAMAGE_RE = re.compile(r"(?:\b(plus)\s+)?(\d+)\s*(?:\(\s*([^)]*?)\s*\))?\s*dégâts?\s+(?:de\s+|d')?([^\W\d_]+)", re.IGNORECASE)
+ATTACK_FIELDS = ['source', 'name', 'kind', 'to_hit', 'reach', 'range', 'damage_dice', 'damage_average', 'damage_type', 'save_dc', 'save_ability']
+SOURCES = {'actions': 'action', 'legendary_actions': 'légendaire'}
+KINDS = {'au corps à corps': 'corps à corps', 'à distance': 'distance', 'au corps à corps ou à distance': 'corps à corps ou distance'}
+ORIGINS = {"d'arme": 'arme', 'de sort': 'sort', 'avec une arme': 'arme', 'avec un sort': 'sort'}
+
+
+def split_entries(entries):
+    # Texte libre du créateur ("Cimeterre. Attaque...", une action par ligne) ou tuples (titre, contenu) du scraper
+    if isinstance(entries, str):
+        entries = [(line, "") for line in entries.split('\n')]
+    result = []
+    for title, content in entries or []:
+        title, content = (title or '').strip(), (content or '').lstrip('. ').strip()
+        if not content:
+            title, _, content = title.partition('. ')
+        if title or content:
+            result.append((title.strip(' .'), content.strip()))
+    return result
+
+
+def damage_expression(average, dice):
+    # "1d6 + 2" -> "1d6+2" si dice.py sait le lancer, sinon la valeur fixe
+    text = re.sub(r"\s+", "", dice or '')
+    if text:
+        try:
+            compile_expression(text)
+            return text
+        except ValueError:
+            pass
+    return str(average)
+
+
+def parse_damage(text):
+    # Dégâts principaux puis les "plus ..." qui s'y ajoutent ; une alternative ("ou 6 (1d8 + 2)...") arrête la lecture
+    dice, average, types = [], 0, []
+    for match in DAMAGE_RE.finditer(text):
+        if dice and not match.group(1):
+            break
+        dice.append(damage_expression(match.group(2), match.group(3)))
+        average += int(match.group(2))
+        types.append(match.group(4).lower())
+    if not dice:
+        return None, None, None
+    return '+'.join(dice).replace('+-', '-'), average, ', '.join(types)
+
+
+def match_attack(line):
+    # (type d'attaque, bonus, fin de la correspondance) ou None
+    match = ATTACK_RE.search(line)
+    if match:
+        origin = ORIGINS.get((match.group(1) or match.group(3) or '').lower())
+        kind = KINDS[match.group(2).lower()]
+        return f"{origin} {kind}" if origin else kind, int(match.group(4).replace(' ', '')), match.end()
+    match = TO_HIT_RE.search(line)
+    if match:
+        kind = KIND_RE.search(line, 0, match.start())
+        return KINDS[kind.group(0).lower()] if kind else None, int(match.group(1).replace(' ', '')), match.end()
+    return None
+
+
+def parse_attack(name, text, source='action'):
+    line = f"{name}. {text}"
+    attack, save = match_attack(line), SAVE_RE.search(line)
+    if not attack and not save:
+        return None
+    record = dict.fromkeys(ATTACK_FIELDS)
+    record.update(source=source, name=name)
+    if attack:
+        record['kind'], record['to_hit'], attack_end = attack
+        reach, reach_range = REACH_RE.search(line), RANGE_RE.search(line)
+        record['reach'] = reach.group(1) if reach else None
+        record['range'] = re.sub(r"\s*/\s*", "/", reach_range.group(1)) if reach_range else None
+        hit = HIT_RE.search(line, attack_end)
+        damage_text = line[hit.end():] if hit else line[attack_end:]
+    else:
+        record['kind'] = 'sauvegarde'
+        damage_text = line[save.end():]
+    if save:
+        record['save_ability'], record['save_dc'] = save.group(1).capitalize(), int(save.group(2))
+    record['damage_dice'], record['damage_average'], record['damage_type'] = parse_damage(damage_text)
+    if not attack and record['damage_dice'] is None:
+        # Un jet de sauvegarde sans dégâts (état, charme...) n'est pas une attaque qu'on peut lancer
+        return None
+    return record
+
+
+def parse_attacks(monster):
+    # monster : ligne de la base ou monster_info ; renvoie les attaques dans l'ordre de la fiche
+    attacks = []
+    for key, source in SOURCES.items():
+        for name, text in split_entries(monster[key] if key in monster.keys() else None):
+            record = parse_attack(name, text, source)
+            if record:
+                attacks.append(record)
+    return attacks
+
+
+def describe_attack(attack):
+    parts = [f"{attack['to_hit']:+d}" if attack['to_hit'] is not None else f"DD {attack['save_dc']} {attack['save_ability']}"]
+    if attack['damage_dice']:
+        parts.append(f"{attack['damage_dice']} {attack['damage_type']}")
+    return f"{attack['name']} ({', '.join(parts)})"
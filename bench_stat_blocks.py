@@ -0,0 +1,97 @@
+import argparse
+import glob
+import os
+import re
+import time
+from bs4 import BeautifulSoup
+from aidedd_fixtures import INDEX_FILE, load_index
+import stat_blocks
+
+
+def parse_stat_block_legacy(monster_name, url, content):
+    # Analyse d'origine : page complète avec html.parser et plusieurs parcours de l'arbre
+    soup = BeautifulSoup(content, 'html.parser')
+    monster_block = soup.find('div', class_='jaune') or soup.find('div', class_='col1')
+    if not monster_block:
+        return stat_blocks.error_info(monster_name, url)
+    image_urls = []
+    picture_div = soup.find('div', class_='picture')
+    if picture_div:
+        img = picture_div.find('img')
+        if img and img.get('src'):
+            image_urls.append(img['src'])
+    stats = {}
+    red_div = soup.find('div', class_='red')
+    if red_div:
+        stats = stat_blocks.parse_stats(red_div)
+    abilities_raw = {strong.text.strip(): div.text.replace(strong.text, '').strip() for div in soup.find_all('div', class_='carac') if div.find('strong') for strong in [div.find('strong')]}
+    abilities = {}
+    for key, value in abilities_raw.items():
+        match = re.match(r"(\d+)", value)
+        abilities[key] = f"{int(match.group(1))} ({stat_blocks.calculate_modifier(int(match.group(1))):+d})" if match else value
+    monster_data = {
+        'name': monster_name,
+        'url': url,
+        'html': str(monster_block),
+        'image_urls': image_urls,
+        'type': soup.find('div', class_='type').text.strip() if soup.find('div', class_='type') else '',
+        'stats': stats,
+        'abilities': abilities,
+        'details': [p.text.strip() for p in soup.find_all('p') if any(kw in p.text for kw in stat_blocks.DETAIL_KEYWORDS)],
+        'traits': [(p.find('strong').text.strip(), p.text.replace(p.find('strong').text, '').strip()) for p in soup.find_all('p') if p.find('strong') and p.find('em')],
+        'actions': [],
+        'legendary_actions': []
+    }
+    current_section = 'actions'
+    for tag in soup.find_all(['div', 'p']):
+        if 'rub' in tag.get('class', []):
+            title = tag.text.strip()
+            content = next((sib.text.strip() for sib in tag.find_next_siblings() if sib.name == 'p'), "")
+            if 'légendaire' in title.lower():
+                current_section = 'legendary_actions'
+            monster_data[current_section].append((title, content))
+    return monster_data
+
+
+def page_paths(entry):
+    if not os.path.isdir(entry):
+        return [entry]
+    if os.path.exists(os.path.join(entry, INDEX_FILE)):
+        # Dossier de fixtures : les fiches sont les réponses HTML de l'index, quel que soit le nom du fichier
+        return sorted(os.path.join(entry, fixture['file']) for fixture in load_index(entry).values()
+                      if fixture['content_type'].startswith('text/html') and fixture['status'] == 200)
+    return sorted(glob.glob(os.path.join(entry, "**", "*.html"), recursive=True))
+
+
+def read_page(path):
+    with open(path, 'rb') as f:
+        return path, f.read()
+
+
+def benchmark(parse, pages, repeat):
+    timings = []
+    for path, content in pages:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            parse(os.path.basename(path), path, content)
+        timings.append((time.perf_counter() - start) / repeat * 1000)
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare le temps d'analyse des fiches de monstres avant/après")
+    parser.add_argument("pages", nargs="+", help="Fichiers HTML ou dossiers de pages enregistrées")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = [read_page(path) for entry in args.pages for path in page_paths(entry)]
+    if not pages:
+        raise SystemExit("Aucune page trouvée")
+
+    before = benchmark(parse_stat_block_legacy, pages, args.repeat)
+    after = benchmark(stat_blocks.parse_stat_block, pages, args.repeat)
+    print(f"{len(pages)} pages, {args.repeat} répétitions, analyseur : {stat_blocks.PARSER}")
+    print(f"{'page':<40} {'avant (ms)':>12} {'après (ms)':>12}")
+    for (path, _), old, new in zip(pages, before, after):
+        print(f"{os.path.basename(path)[:40]:<40} {old:>12.3f} {new:>12.3f}")
+    print(f"{'moyenne':<40} {sum(before) / len(before):>12.3f} {sum(after) / len(after):>12.3f}")
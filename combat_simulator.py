@@ -0,0 +1,214 @@
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import numpy as np
+import attack_parser
+import monster_utils
+from dice import compile_expression
+
+MULTIATTACK_RE = re.compile(r"(?:effectue|fait|porte)\s+(\w+)\s+attaques", re.IGNORECASE)
+NUMBER_WORDS = {'deux': 2, 'trois': 3, 'quatre': 4, 'cinq': 5, 'six': 6}
+ABILITY_LABELS = ['DEX', 'Dextérité']
+MAX_ROUNDS = 50
+
+
+@dataclass
+class Combatant:
+    name: str
+    hp: int
+    ac: int
+    attack_bonus: int
+    damage_dice: int
+    damage_sides: int
+    damage_bonus: int
+    attacks: int = 1
+    initiative_bonus: int = 0
+    is_pc: bool = False
+
+
+def attack_profile(attack):
+    # (bonus, dés, faces, bonus dégâts) : un seul type de dé par attaque, les dés suivants ("plus 2d6 de feu") comptent pour leur moyenne
+    expression = compile_expression(attack['damage_dice'] or '0')
+    if not expression.terms:
+        return attack['to_hit'], 0, 1, expression.constant
+    first, extra = expression.terms[0], expression.terms[1:]
+    bonus = expression.constant + round(sum(term.sign * term.keep * (term.sides + 1) / 2 for term in extra))
+    return attack['to_hit'], first.count, first.sides, bonus
+
+
+def parse_multiattack(actions):
+    for title, text in actions:
+        match = MULTIATTACK_RE.search(f"{title} {text}")
+        if match:
+            word = match.group(1).lower()
+            return int(word) if word.isdigit() else NUMBER_WORDS.get(word, 1)
+    return 1
+
+
+def ability_modifier(monster_info, labels):
+    for label in labels:
+        match = re.match(r"\s*(\d+)", monster_info.get('abilities', {}).get(label, ''))
+        if match:
+            return monster_utils.calculate_modifier(int(match.group(1)))
+    return 0
+
+
+def combatant_from_info(name, monster_info, attacks=None):
+    # Mêmes sources que start_encounter : PV de extract_monster_info, CA, meilleure attaque, DEX pour l'initiative ;
+    # attacks : lignes de monster_attacks si l'appelant les a, sinon le texte des actions est analysé
+    actions = monster_info.get('actions', [])
+    if attacks is None:
+        attacks = attack_parser.parse_attacks(monster_info)
+    attacks = [attack_profile(attack) for attack in attacks if attack['to_hit'] is not None and attack['source'] == 'action']
+    # Attaque retenue : la plus forte en dégâts moyens ; sans attaque reconnue, 1d4 sans bonus
+    to_hit, dice, sides, bonus = max(attacks, key=lambda a: a[1] * (a[2] + 1) / 2 + a[3]) if attacks else (0, 1, 4, 0)
+    ac = monster_info.get('ac_value')
+    if ac is None:
+        match = monster_utils.LEADING_NUMBER_RE.match(monster_info.get('stats', {}).get("Classe d'armure", '') or '')
+        ac = int(match.group(1)) if match else 10
+    initiative = monster_info.get('initiative_bonus')
+    if initiative is None:
+        initiative = ability_modifier(monster_info, ABILITY_LABELS)
+    return Combatant(name, max(1, int(monster_info.get('hp', 1))), ac, to_hit, dice, sides, bonus,
+                     parse_multiattack(actions) if attacks else 1, initiative)
+
+
+def party_member(level, name="PJ", hp=None, ac=16, ability=3):
+    # Profil simple de PJ combattant : d10 de vie, maîtrise selon le niveau, arme 1d8, attaque supplémentaire au niveau 5
+    level = max(1, min(20, int(level)))
+    proficiency = 2 + (level - 1) // 4
+    hp = hp or 10 + 2 + (level - 1) * 8
+    return Combatant(name, hp, ac, proficiency + ability, 1, 8, ability, 2 if level >= 5 else 1, 2, True)
+
+
+def build_party(party_size, party_level, **profile):
+    return [party_member(party_level, f"PJ {i + 1}", **profile) for i in range(party_size)]
+
+
+def roll_damage(rng, dice, sides, bonus, crit):
+    # Dés lancés pour le maximum de la ligne puis masqués : les critiques doublent les dés, pas le bonus
+    count = np.where(crit, dice * 2, dice)
+    width = int(count.max()) if count.size else 0
+    rolls = rng.integers(1, sides[:, None] + 1, size=(count.size, max(width, 1)))
+    rolls[np.arange(max(width, 1))[None, :] >= count[:, None]] = 0
+    return np.maximum(rolls.sum(axis=1) + bonus, 0)
+
+
+def simulate_batch(combatants, simulations, seed=None, max_rounds=MAX_ROUNDS):
+    rng = np.random.default_rng(seed)
+    n, c = simulations, len(combatants)
+    sims = np.arange(n)
+    is_pc = np.array([combatant.is_pc for combatant in combatants])
+    ac = np.array([combatant.ac for combatant in combatants])
+    to_hit = np.array([combatant.attack_bonus for combatant in combatants])
+    dice = np.array([combatant.damage_dice for combatant in combatants])
+    sides = np.array([combatant.damage_sides for combatant in combatants])
+    bonus = np.array([combatant.damage_bonus for combatant in combatants])
+    attacks = np.array([combatant.attacks for combatant in combatants])
+    max_hp = np.array([combatant.hp for combatant in combatants])
+    hp = np.tile(max_hp, (n, 1))
+
+    # Initiative : d20 + bonus, départage aléatoire ; un ordre par simulation
+    initiative = rng.integers(1, 21, size=(n, c)) + np.array([combatant.initiative_bonus for combatant in combatants]) + rng.random((n, c))
+    order = np.argsort(-initiative, axis=1)
+
+    finished = np.zeros(n, dtype=bool)
+    rounds = np.full(n, max_rounds)
+    for round_number in range(1, max_rounds + 1):
+        for slot in range(c):
+            actor = order[:, slot]
+            acting = ~finished & (hp[sims, actor] > 0)
+            if not acting.any():
+                continue
+            actor_is_pc = is_pc[actor]
+            for attack in range(int(attacks.max())):
+                active = acting & (attacks[actor] > attack)
+                enemies = (hp > 0) & (is_pc[None, :] != actor_is_pc[:, None])
+                active &= enemies.any(axis=1)
+                if not active.any():
+                    break
+                # Les PJ concentrent leurs coups sur l'ennemi le plus entamé, les monstres frappent un PJ au hasard
+                focus = np.where(enemies, hp, np.iinfo(hp.dtype).max).argmin(axis=1)
+                scatter = np.where(enemies, rng.random((n, c)), -1).argmax(axis=1)
+                target = np.where(actor_is_pc, focus, scatter)
+                d20 = rng.integers(1, 21, size=n)
+                crit = d20 == 20
+                hit = active & (d20 > 1) & (crit | (d20 + to_hit[actor] >= ac[target]))
+                if not hit.any():
+                    continue
+                damage = roll_damage(rng, dice[actor[hit]], sides[actor[hit]], bonus[actor[hit]], crit[hit])
+                hp[sims[hit], target[hit]] = np.maximum(hp[sims[hit], target[hit]] - damage, 0)
+            alive_pc = ((hp > 0) & is_pc).any(axis=1)
+            alive_monster = ((hp > 0) & ~is_pc).any(axis=1)
+            ended = ~finished & ~(alive_pc & alive_monster)
+            rounds[ended] = round_number
+            finished |= ended
+        if finished.all():
+            break
+
+    alive_pc = ((hp > 0) & is_pc).any(axis=1)
+    alive_monster = ((hp > 0) & ~is_pc).any(axis=1)
+    return {
+        'simulations': n,
+        'wins': int((alive_pc & ~alive_monster).sum()),
+        'tpk': int((~alive_pc).sum()),
+        'rounds': int(rounds[finished].sum()),
+        'finished': int(finished.sum()),
+        'pc_hp_lost': int((max_hp[is_pc] - hp[:, is_pc]).sum()),
+        'pc_deaths': int((hp[:, is_pc] == 0).sum()),
+    }
+
+
+def _run_batch(args):
+    return simulate_batch(*args)
+
+
+def simulate(party, monsters, simulations=10000, processes=1, seed=None, batch_size=5000):
+    # processes > 1 : lots répartis sur un pool de processus, chacun avec sa propre graine dérivée
+    combatants = list(party) + list(monsters)
+    batches = [batch_size] * (simulations // batch_size) + ([simulations % batch_size] if simulations % batch_size else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    jobs = [(combatants, size, batch_seed) for size, batch_seed in zip(batches, seeds)]
+    if processes and processes > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(processes, len(jobs))) as pool:
+            results = list(pool.map(_run_batch, jobs))
+    else:
+        results = [_run_batch(job) for job in jobs]
+    totals = {key: sum(result[key] for result in results) for key in results[0]}
+    return {
+        'simulations': totals['simulations'],
+        'win_rate': totals['wins'] / totals['simulations'],
+        'tpk_rate': totals['tpk'] / totals['simulations'],
+        'expected_rounds': totals['rounds'] / totals['finished'] if totals['finished'] else float(MAX_ROUNDS),
+        'expected_pc_hp_lost': totals['pc_hp_lost'] / totals['simulations'],
+        'expected_pc_deaths': totals['pc_deaths'] / totals['simulations'],
+    }
+
+
+def describe(report):
+    return (f"Victoire : {report['win_rate']:.1%}  |  Massacre du groupe : {report['tpk_rate']:.1%}\n"
+            f"Rounds attendus : {report['expected_rounds']:.1f}  |  PV perdus par le groupe : {report['expected_pc_hp_lost']:.0f}"
+            f"  |  PJ à terre : {report['expected_pc_deaths']:.2f}\n({report['simulations']} combats simulés)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simule un combat PJ contre monstres (banc d'essai : 4 PJ contre 6 monstres par défaut)")
+    parser.add_argument("--simulations", type=int, default=10000)
+    parser.add_argument("--party-size", type=int, default=4)
+    parser.add_argument("--party-level", type=int, default=3)
+    parser.add_argument("--monsters", type=int, default=6)
+    parser.add_argument("--processes", type=int, default=1, help=f"0 : tous les cœurs ({os.cpu_count()})")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    # Gobelin type : CA 15, 7 PV, cimeterre +4 (1d6 + 2)
+    goblin_actions = [("Cimeterre", ". Attaque d'arme au corps à corps : +4 pour toucher, allonge 1,50 m, une cible. Touché : 5 (1d6 + 2) dégâts tranchants.")]
+    monsters = [combatant_from_info(f"Gobelin {i + 1}", {'hp': 7, 'ac_value': 15, 'initiative_bonus': 2, 'actions': goblin_actions})
+                for i in range(args.monsters)]
+    start = time.perf_counter()
+    report = simulate(build_party(args.party_size, args.party_level), monsters, args.simulations,
+                      args.processes or os.cpu_count(), args.seed)
+    print(describe(report))
+    print(f"Durée : {time.perf_counter() - start:.2f} s")
@@ -0,0 +1,203 @@
+import argparse
+import random
+import re
+import time
+from fractions import Fraction
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Un terme : "2d8", "d20", "4d6kh3" (garde les 3 plus hauts), "2d20kl1", "d20adv" / "d20dis" (avantage / désavantage), "+3"
+TERM_RE = re.compile(r"([+-])?(?:(\d*)d(\d+)(?:(kh|kl|k)(\d+)|(adv|dis))?|(\d+))")
+
+
+class DiceTerm:
+    def __init__(self, sign, count, sides, keep=None, highest=True):
+        self.sign = sign
+        self.count = count
+        self.sides = sides
+        self.keep = count if keep is None else keep
+        self.highest = highest
+
+    def __repr__(self):
+        keep = f"k{'h' if self.highest else 'l'}{self.keep}" if self.keep < self.count else ""
+        return f"{'-' if self.sign < 0 else '+'}{self.count}d{self.sides}{keep}"
+
+    def roll(self, rng):
+        rolls = [rng.randint(1, self.sides) for _ in range(self.count)]
+        if self.keep < self.count:
+            rolls.sort(reverse=self.highest)
+            rolls = rolls[:self.keep]
+        return self.sign * sum(rolls)
+
+    def roll_batch(self, generator, n):
+        rolls = generator.integers(1, self.sides + 1, size=(n, self.count))
+        if self.keep < self.count:
+            rolls.sort(axis=1)
+            rolls = rolls[:, -self.keep:] if self.highest else rolls[:, :self.keep]
+        return self.sign * rolls.sum(axis=1)
+
+    def distribution(self):
+        # Nombre de tirages menant à chaque total ; pour kh/kl on ne garde en état que les dés conservés, triés
+        if self.keep == self.count:
+            ways = {0: 1}
+            for _ in range(self.count):
+                ways = convolve(ways, {face: 1 for face in range(1, self.sides + 1)})
+        else:
+            states = {(): 1}
+            for _ in range(self.count):
+                next_states = {}
+                for state, count in states.items():
+                    for face in range(1, self.sides + 1):
+                        kept = sorted(state + (face,), reverse=self.highest)[:self.keep]
+                        key = tuple(kept)
+                        next_states[key] = next_states.get(key, 0) + count
+                states = next_states
+            ways = {}
+            for state, count in states.items():
+                ways[sum(state)] = ways.get(sum(state), 0) + count
+        return {self.sign * total: count for total, count in ways.items()}
+
+
+def convolve(left, right):
+    result = {}
+    for a, ways_a in left.items():
+        for b, ways_b in right.items():
+            result[a + b] = result.get(a + b, 0) + ways_a * ways_b
+    return result
+
+
+class DiceExpression:
+    # Analysée une seule fois (compile_expression est mis en cache) : lancer ne fait plus que tirer les dés
+    def __init__(self, text, terms, constant):
+        self.text = text
+        self.terms = terms
+        self.constant = constant
+        self._distribution = None
+        self._critical = None
+
+    def __repr__(self):
+        return f"DiceExpression({self.text!r})"
+
+    def roll(self, rng=None):
+        rng = rng or random
+        return self.constant + sum(term.roll(rng) for term in self.terms)
+
+    def roll_batch(self, n, generator=None, rng=None):
+        # numpy : un tableau de n totaux en un appel ; sans numpy, une liste tirée avec rng
+        if np is None:
+            return [self.roll(rng) for _ in range(n)]
+        generator = generator or np.random.default_rng()
+        totals = np.full(n, self.constant, dtype=np.int64)
+        for term in self.terms:
+            totals += term.roll_batch(generator, n)
+        return totals
+
+    def critical(self):
+        # Coup critique : tous les dés sont doublés, pas le modificateur
+        if self._critical is None:
+            terms = tuple(DiceTerm(term.sign, term.count * 2, term.sides, term.keep * 2, term.highest) for term in self.terms)
+            self._critical = DiceExpression(f"{self.text} (critique)", terms, self.constant)
+        return self._critical
+
+    @property
+    def minimum(self):
+        return self.constant + sum(term.sign * term.keep * (1 if term.sign > 0 else term.sides) for term in self.terms)
+
+    @property
+    def maximum(self):
+        return self.constant + sum(term.sign * term.keep * (term.sides if term.sign > 0 else 1) for term in self.terms)
+
+    def distribution(self):
+        # Probabilités exactes (Fraction) de chaque total, calculées à la première demande
+        if self._distribution is None:
+            ways, outcomes = {self.constant: 1}, 1
+            for term in self.terms:
+                ways = convolve(ways, term.distribution())
+                outcomes *= term.sides ** term.count
+            self._distribution = {total: Fraction(ways[total], outcomes) for total in sorted(ways)}
+        return self._distribution
+
+    @property
+    def mean(self):
+        return sum(total * probability for total, probability in self.distribution().items())
+
+
+@lru_cache(maxsize=256)
+def compile_expression(text):
+    text = str(text)
+    # Les espaces ne séparent que des termes : "2 d6", "2d 6" ou "5 6" ne sont pas "2d6" ou "56"
+    if re.search(r"\d\s+(?:d\s*)?\d|d\s+\d", text.lower()):
+        raise ValueError(f"Expression de dés invalide : {text}")
+    expression = re.sub(r"\s+", "", text.lower())
+    if not expression:
+        raise ValueError("Expression de dés vide")
+    terms, constant, position = [], 0, 0
+    while position < len(expression):
+        match = TERM_RE.match(expression, position)
+        if not match or match.end() == position or (position and not match.group(1)):
+            raise ValueError(f"Expression de dés invalide : {text}")
+        sign_text, count, sides, keep_mode, keep, advantage, number = match.groups()
+        sign = -1 if sign_text == '-' else 1
+        position = match.end()
+        if number is not None:
+            constant += sign * int(number)
+            continue
+        count, sides = int(count or 1), int(sides)
+        if count < 1 or sides < 1:
+            raise ValueError(f"Expression de dés invalide : {text}")
+        if advantage:
+            # Avantage : deux jets, on garde le meilleur ; n'a de sens que pour un dé unique
+            if count != 1:
+                raise ValueError(f"Avantage/désavantage sur un seul dé : {text}")
+            terms.append(DiceTerm(sign, 2, sides, 1, advantage == 'adv'))
+        elif keep_mode:
+            keep = int(keep)
+            if not 1 <= keep <= count:
+                raise ValueError(f"Nombre de dés gardés invalide : {text}")
+            terms.append(DiceTerm(sign, count, sides, keep, keep_mode != 'kl'))
+        else:
+            terms.append(DiceTerm(sign, count, sides))
+    return DiceExpression(text, tuple(terms), constant)
+
+
+class DiceRoller:
+    # Même graine, mêmes jets : random pour les jets unitaires, numpy pour les séries
+    def __init__(self, seed=None):
+        self.reseed(seed)
+
+    def reseed(self, seed=None):
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.generator = np.random.default_rng(seed) if np is not None else None
+
+    def roll(self, expression, critical=False):
+        expression = compile_expression(expression)
+        return (expression.critical() if critical else expression).roll(self.random)
+
+    def roll_batch(self, expression, n):
+        return compile_expression(expression).roll_batch(n, self.generator, self.random)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyse une expression de dés : bornes, moyenne et distribution exactes, tirage en série")
+    parser.add_argument("expression", nargs="?", default="4d6kh3")
+    parser.add_argument("--batch", type=int, default=1000000, help="Nombre de jets tirés en une fois")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    expression = compile_expression(args.expression)
+    roller = DiceRoller(args.seed)
+    print(f"{args.expression} : min {expression.minimum}, max {expression.maximum}, moyenne {float(expression.mean):.3f}")
+    for total, probability in expression.distribution().items():
+        print(f"  {total:>4} : {float(probability):7.2%}")
+    start = time.perf_counter()
+    rolls = roller.roll_batch(args.expression, args.batch)
+    elapsed = time.perf_counter() - start
+    print(f"{args.batch} jets en {elapsed * 1000:.1f} ms ({'numpy' if np is not None else 'Python pur'}), moyenne observée {sum(rolls) / len(rolls):.3f}")
+    start = time.perf_counter()
+    for _ in range(100000):
+        roller.roll(args.expression)
+    print(f"100000 jets unitaires en {(time.perf_counter() - start) * 1000:.1f} ms")
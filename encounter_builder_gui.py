@@ -1,21 +1,37 @@
-import requests
+import argparse
 from bs4 import BeautifulSoup
-import sqlite3
 from ttkthemes import ThemedTk
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 from dataclasses import dataclass
-import random
 import os
 import tempfile
 import io
-import urllib.request
-import ssl
-import certifi
 import webbrowser
 from PIL import Image, ImageTk
-import re
-import unicodedata
+import hashlib
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import http_client
+import image_cache
+import monster_utils
+import stat_blocks
+import stat_block_store
+import attack_parser
+from lru_cache import LRUCache
+from monster_repository import get_repository
+from monster_search import MonsterSearchIndex, MonsterFacets, FuzzyIndex, bitset, select_positions, fuzzy_key
+from virtual_list import VirtualList, ListProvider
+from encounter_difficulty import EncounterDifficulty, DIFFICULTIES
+import encounter_generator
+from dice import DiceRoller
+
+# Simulation de combat : numpy requis, bouton désactivé sinon
+try:
+    import combat_simulator
+except ImportError:
+    combat_simulator = None
 
 @dataclass
 class Monster:
@@ -54,245 +70,199 @@ CONDITIONS = {
     "Couvert": {"emoji": "🛡️", "description": "Bonus à la CA et jets de Dextérité contre certaines attaques."},
 }
 
+ABILITY_FIELDS = [
+    ("Force", 'str_score', 'str_mod'), ("Dextérité", 'dex_score', 'dex_mod'), ("Constitution", 'con_score', 'con_mod'),
+    ("Intelligence", 'int_score', 'int_mod'), ("Sagesse", 'wis_score', 'wis_mod'), ("Charisme", 'cha_score', 'cha_mod'),
+]
+
+# En dessous de ce nombre de correspondances exactes, la recherche est complétée par les noms approchants
+FUZZY_FALLBACK_RESULTS = 10
+
 class EncounterBuilder:
-    def __init__(self):
+    def __init__(self, sync_on_start=True, stat_block_ttl=stat_block_store.DEFAULT_TTL, site_root=stat_blocks.SITE_ROOT,
+                 image_cache_bytes=image_cache.DEFAULT_MAX_BYTES):
         self.monsters = []
         self.db_path = "monsters.db"
-        self.base_url_fr = "https://www.aidedd.org/dnd-filters/monstres.php"
+        self.repository = get_repository(self.db_path)
+        self.stat_block_store = stat_block_store.StatBlockStore(self.repository, stat_block_ttl)
+        self.refresh_executor = ThreadPoolExecutor(max_workers=1)
+        self.refreshing = set()
+        self.site_root = site_root
+        self.base_url_fr = stat_blocks.listing_url(self.site_root)
         self.monster_cache_dir = os.path.join(tempfile.gettempdir(), "dnd_monsters")
         if not os.path.exists(self.monster_cache_dir):
             os.makedirs(self.monster_cache_dir)
+        self.image_cache = image_cache.ImageCache(os.path.join(self.monster_cache_dir, "images"), image_cache_bytes)
         
-        self.monster_info_cache = {}
+        self.monster_info_cache = LRUCache(maxsize=256, max_age=30 * 60)
         print("Monster info cache cleared at startup.")
 
-        self.scrape_monsters()
+        if sync_on_start:
+            self.scrape_monsters()
         self.load_monsters()
 
     def normalize_name(self, name):
-        name = unicodedata.normalize('NFD', name).encode('ascii', 'ignore').decode('utf-8')
-        name = name.lower().strip()
-        name = re.sub(r'\s+', ' ', name)
-        replacements = {
-            'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e',
-            'à': 'a', 'â': 'a', 'ä': 'a',
-            'î': 'i', 'ï': 'i',
-            'ô': 'o', 'ö': 'o',
-            'û': 'u', 'ü': 'u',
-            'ç': 'c'
-        }
-        for char, replacement in replacements.items():
-            name = name.replace(char, replacement)
-        return name
+        return monster_utils.normalize_name(name)
 
     def cr_to_xp(self, cr):
-        cr_xp_map = {
-            0: 10, 0.125: 25, 0.25: 50, 0.5: 100, 1: 200, 2: 450, 3: 700, 4: 1100,
-            5: 1800, 6: 2300, 7: 2900, 8: 3900, 9: 5000, 10: 5900, 11: 7200,
-            12: 8400, 13: 10000, 14: 11500, 15: 13000, 16: 15000, 17: 18000,
-            18: 20000, 19: 22000, 20: 25000, 21: 33000, 22: 41000, 23: 50000,
-            24: 62000, 25: 75000, 30: 155000
-        }
-        return cr_xp_map.get(cr, 0)
+        return monster_utils.cr_to_xp(cr)
 
     def calculate_modifier(self, score):
-        if score == 1:
-            return -5
-        elif 2 <= score <= 3:
-            return -4
-        elif 4 <= score <= 5:
-            return -3
-        elif 6 <= score <= 7:
-            return -2
-        elif 8 <= score <= 9:
-            return -1
-        elif 10 <= score <= 11:
-            return 0
-        elif 12 <= score <= 13:
-            return 1
-        elif 14 <= score <= 15:
-            return 2
-        elif 16 <= score <= 17:
-            return 3
-        elif 18 <= score <= 19:
-            return 4
-        elif 20 <= score <= 21:
-            return 5
-        return 0
-
-    def scrape_monsters(self):
+        return monster_utils.calculate_modifier(score)
+
+    def parse_monster_listing(self, content):
+        soup = BeautifulSoup(content, 'html.parser')
+        monster_table = soup.find('table', id='liste')
+        if not monster_table:
+            return None
+
+        seen_names = set()
+        monster_data = []
+        size_map = {1: 'TP', 2: 'P', 3: 'M', 4: 'G', 5: 'TG', 6: 'Gig'}
+        for row in monster_table.find('tbody').find_all('tr'):
+            cols = row.find_all('td')
+            if len(cols) >= 8:
+                name = cols[1].find('a').text.strip()
+                normalized_name = self.normalize_name(name)
+
+                if normalized_name in seen_names:
+                    print(f"Doublon détecté dans le scraping pour {name} (normalisé: {normalized_name}), ignoré.")
+                    continue
+                seen_names.add(normalized_name)
+
+                cr_str = cols[4].get('data-sort-value', cols[4].text.strip())
+                cr = float(cr_str.split('/')[0]) / float(cr_str.split('/')[1]) if '/' in cr_str else float(cr_str)
+                monster_type = cols[5].text.strip()
+                size = size_map.get(int(cols[6].get('data-sort-value', '3')), 'M')
+                xp = self.cr_to_xp(cr)
+                monster_data.append((normalized_name, name, cr, monster_type, size, xp))
+        return monster_data
+
+    def scrape_monsters(self, force=False):
         try:
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            response = requests.get(self.base_url_fr, headers=headers)
-            soup = BeautifulSoup(response.content, 'html.parser')
-            monster_table = soup.find('table', id='liste')
-            if not monster_table:
+            sync_state = {} if force else self.repository.get_sync_state()
+
+            headers = {}
+            if sync_state.get('etag'):
+                headers['If-None-Match'] = sync_state['etag']
+            if sync_state.get('last_modified'):
+                headers['If-Modified-Since'] = sync_state['last_modified']
+            response = http_client.get(self.base_url_fr, headers=headers, use_cache=False)
+            if response.status_code == 304:
+                print("Liste des monstres inchangée (304), synchronisation ignorée")
+                return {'status': 'unchanged', 'inserted': 0, 'updated': 0, 'removed': 0}
+            response.raise_for_status()
+
+            content_hash = hashlib.sha256(response.content).hexdigest()
+            new_state = {
+                'etag': response.headers.get('ETag', ''),
+                'last_modified': response.headers.get('Last-Modified', ''),
+                'content_hash': content_hash
+            }
+            if content_hash == sync_state.get('content_hash'):
+                self.repository.set_sync_state(new_state)
+                print("Liste des monstres inchangée (empreinte identique), synchronisation ignorée")
+                return {'status': 'unchanged', 'inserted': 0, 'updated': 0, 'removed': 0}
+
+            monster_data = self.parse_monster_listing(response.content)
+            if monster_data is None:
                 print("Tableau des monstres non trouvé")
-                return
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''CREATE TABLE IF NOT EXISTS monsters
-                            (normalized_name TEXT PRIMARY KEY, name TEXT, cr REAL, type TEXT, size TEXT, xp INTEGER,
-                             ac TEXT, hp TEXT, speed TEXT, str_score INTEGER, dex_score INTEGER, con_score INTEGER,
-                             int_score INTEGER, wis_score INTEGER, cha_score INTEGER, skills TEXT, damage_resistances TEXT,
-                             senses TEXT, languages TEXT, traits TEXT, actions TEXT, legendary_actions TEXT)''')
-            
-            cursor.execute("SELECT normalized_name FROM monsters")
-            existing_names = {row[0] for row in cursor.fetchall()}
-
-            seen_names = set()
-            monster_data = []
-
-            for row in monster_table.find('tbody').find_all('tr'):
-                cols = row.find_all('td')
-                if len(cols) >= 8:
-                    name = cols[1].find('a').text.strip()
-                    normalized_name = self.normalize_name(name)
-                    
-                    if normalized_name in seen_names:
-                        print(f"Doublon détecté dans le scraping pour {name} (normalisé: {normalized_name}), ignoré.")
-                        continue
-                    seen_names.add(normalized_name)
-                    
-                    cr_str = cols[4].get('data-sort-value', cols[4].text.strip())
-                    cr = float(cr_str.split('/')[0]) / float(cr_str.split('/')[1]) if '/' in cr_str else float(cr_str)
-                    monster_type = cols[5].text.strip()
-                    size_map = {1: 'TP', 2: 'P', 3: 'M', 4: 'G', 5: 'TG', 6: 'Gig'}
-                    size = size_map.get(int(cols[6].get('data-sort-value', '3')), 'M')
-                    xp = self.cr_to_xp(cr)
-                    
-                    monster_data.append((name, cr, monster_type, size, xp, normalized_name))
-                    print(f"Extrait: {name} (normalisé: {normalized_name}, CR {cr}, Type: {monster_type}, Taille: {size}, XP: {xp})")
-
-            for data in monster_data:
-                name, cr, monster_type, size, xp, normalized_name = data
-                if normalized_name not in existing_names:
-                    cursor.execute('INSERT INTO monsters (normalized_name, name, cr, type, size, xp) VALUES (?, ?, ?, ?, ?, ?)',
-                                  (normalized_name, name, cr, monster_type, size, xp))
-                    print(f"Ajouté: {name} (normalisé: {normalized_name})")
+                return {'status': 'error', 'inserted': 0, 'updated': 0, 'removed': 0}
+
+            existing, listed = self.repository.listing_snapshot()
+
+            inserts, updates, listing_rows, parsed_names = [], [], [], set()
+            for normalized_name, name, cr, monster_type, size, xp in monster_data:
+                parsed_names.add(normalized_name)
+                row_hash = hashlib.sha1(f"{name}|{cr}|{monster_type}|{size}".encode('utf-8')).hexdigest()
+                current = existing.get(normalized_name)
+                if current is None:
+                    inserts.append((normalized_name, name, cr, monster_type, size, xp))
+                elif normalized_name in listed or current[6] is None:
+                    # Les créatures manuelles portant le même nom ne sont jamais écrasées
+                    if current[1:6] != (name, cr, monster_type, size, xp):
+                        updates.append((normalized_name, name, cr, monster_type, size, xp))
                 else:
-                    print(f"Déjà présent: {name} (normalisé: {normalized_name}), ignoré.")
-            
-            conn.commit()
-            conn.close()
-            print("Scraping et synchronisation terminés")
+                    continue
+                entry = listed.get(normalized_name)
+                if entry is None or entry[1] != row_hash or entry[2] is not None:
+                    listing_rows.append((normalized_name, row_hash))
+
+            removed = [(time.time(), name) for name, entry in listed.items() if name not in parsed_names and entry[2] is None]
+
+            self.repository.apply_listing_sync(inserts, updates, listing_rows, removed, new_state)
+            print(f"Scraping et synchronisation terminés : {len(inserts)} ajoutés, {len(updates)} mis à jour, {len(removed)} retirés")
+            return {'status': 'updated', 'inserted': len(inserts), 'updated': len(updates), 'removed': len(removed)}
         except Exception as e:
             print(f"Erreur lors du scraping : {e}")
+            return {'status': 'error', 'inserted': 0, 'updated': 0, 'removed': 0}
 
     def load_monsters(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM monsters")
-        rows = cursor.fetchall()
+        # Seules les colonnes de la liste sont chargées, les fiches sont lues à la demande ; la liste est remplacée d'un bloc
         seen_names = set()
-        self.monsters = []
-        for row in rows:
-            name, cr, monster_type, size, xp = row[1:6]
-            normalized_name = row[0]
+        monsters = []
+        for normalized_name, name, cr, monster_type, size, xp in self.repository.list_summaries():
             if normalized_name in seen_names:
                 print(f"Doublon détecté lors du chargement: {name} (normalisé: {normalized_name}), ignoré.")
                 continue
             seen_names.add(normalized_name)
-            self.monsters.append(Monster(
-                name=name,
-                cr=cr,
-                type=monster_type,
-                size=size,
-                xp=xp,
-                ac=row[6],
-                hp=row[7],
-                speed=row[8],
-                str_score=row[9],
-                dex_score=row[10],
-                con_score=row[11],
-                int_score=row[12],
-                wis_score=row[13],
-                cha_score=row[14],
-                skills=row[15],
-                damage_resistances=row[16],
-                senses=row[17],
-                languages=row[18],
-                traits=row[19],
-                actions=row[20],
-                legendary_actions=row[21]
-            ))
-            print(f"Chargé: {name} (normalisé: {normalized_name})")
-        conn.close()
+            monsters.append(Monster(name=name, cr=cr, type=monster_type, size=size, xp=xp))
+        self.monsters = monsters
         print(f"Loaded {len(self.monsters)} monsters from database.")
 
     def extract_monster_info(self, monster_name):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM monsters WHERE name = ?", (monster_name,))
-        monster_data = cursor.fetchone()
-        conn.close()
-
-        if monster_data and monster_data[7] is not None:
+        return self.monster_info_cache.get_or_load(monster_name, lambda: self.load_monster_info(monster_name), lambda info: 'error' not in info)
+
+    def load_monster_info(self, monster_name):
+        monster_data = self.repository.get_by_name(monster_name)
+        crawl_data = self.repository.get_crawl_source(monster_data['normalized_name']) if monster_data else None
+
+        # Les fiches aidedd déjà analysées sont servies par le stockage persistant
+        if not (monster_data and monster_data['hp'] is not None and crawl_data is None):
+            normalized_name = monster_data['normalized_name'] if monster_data else self.normalize_name(monster_name)
+            stored_info, is_stale, _ = self.stat_block_store.get(normalized_name)
+            if stored_info is not None:
+                if is_stale:
+                    self.schedule_stat_block_refresh(monster_name, normalized_name)
+                return stored_info
+
+        if monster_data and monster_data['hp'] is not None:
             print(f"Using database data for {monster_name} (manual creature)")
-            print(f"Raw monster data: {monster_data}")
 
             stats = {
-                "Classe d'armure": monster_data[6] if monster_data[6] else "N/A",
-                "Points de vie": monster_data[7] if monster_data[7] else "N/A",
-                "Vitesse": monster_data[8] if monster_data[8] else "N/A"
+                "Classe d'armure": monster_data['ac'] if monster_data['ac'] else "N/A",
+                "Points de vie": monster_data['hp'] if monster_data['hp'] else "N/A",
+                "Vitesse": monster_data['speed'] if monster_data['speed'] else "N/A"
             }
+            # Modificateurs et PV moyens sont précalculés à l'écriture (monster_utils.derived_columns)
             abilities = {
-                "Force": f"{monster_data[9]} ({self.calculate_modifier(monster_data[9]):+d})" if monster_data[9] is not None else "N/A",
-                "Dextérité": f"{monster_data[10]} ({self.calculate_modifier(monster_data[10]):+d})" if monster_data[10] is not None else "N/A",
-                "Constitution": f"{monster_data[11]} ({self.calculate_modifier(monster_data[11]):+d})" if monster_data[11] is not None else "N/A",
-                "Intelligence": f"{monster_data[12]} ({self.calculate_modifier(monster_data[12]):+d})" if monster_data[12] is not None else "N/A",
-                "Sagesse": f"{monster_data[13]} ({self.calculate_modifier(monster_data[13]):+d})" if monster_data[13] is not None else "N/A",
-                "Charisme": f"{monster_data[14]} ({self.calculate_modifier(monster_data[14]):+d})" if monster_data[14] is not None else "N/A"
+                label: f"{monster_data[score]} ({monster_data[modifier]:+d})" if monster_data[score] is not None and monster_data[modifier] is not None else "N/A"
+                for label, score, modifier in ABILITY_FIELDS
             }
             details = []
-            if monster_data[15]:
-                details.append(f"Compétences: {monster_data[15]}")
-            if monster_data[16]:
-                details.append(f"Résistances aux dégâts: {monster_data[16]}")
-            if monster_data[17]:
-                details.append(f"Sens: {monster_data[17]}")
-            if monster_data[18]:
-                details.append(f"Langues: {monster_data[18]}")
-            traits = [(trait.strip(), "") for trait in monster_data[19].split('\n') if trait.strip()] if monster_data[19] else []
-            actions = [(action.strip(), "") for action in monster_data[20].split('\n') if action.strip()] if monster_data[20] else []
-            legendary_actions = [(action.strip(), "") for action in monster_data[21].split('\n') if action.strip()] if monster_data[21] else []
-
-            if not re.match(r"^\d+(?:\s*\(.*\))?$", monster_data[7] or ""):
-                print(f"Warning: Invalid HP format for {monster_name}: {monster_data[7]}")
-            if not re.match(r"^\d+\s*m(?:,\s*\w+\s*\d+\s*m)*$", monster_data[8] or ""):
-                print(f"Warning: Invalid speed format for {monster_name}: {monster_data[8]}")
-            for stat, value in abilities.items():
-                if not re.match(r"^-?\d+\s*\(\+\d+\)$|^-?\d+\s*\(-\d+\)$|^-?\d+\s*\(\+0\)$", value):
-                    print(f"Warning: Invalid {stat} value for {monster_name}: {value}")
-
-            average_hp = 1
-            hp_formula = monster_data[7] or ""
-            print(f"HP formula for {monster_name}: {hp_formula}")
-            if hp_formula:
-                match = re.match(r"(\d+)(?:\s*\((?:.*)\))?", hp_formula)
-                if match:
-                    average_hp = int(match.group(1))
-                    print(f"Extracted HP for {monster_name}: {average_hp} from formula {hp_formula}")
-                else:
-                    print(f"Could not parse HP for {monster_name}: {hp_formula}, defaulting to 1")
-                    average_hp = 1
-            else:
-                print(f"No HP formula found for {monster_name}, defaulting to 1")
-                average_hp = 1
-
-            if average_hp <= 0:
-                print(f"Warning: Invalid HP ({average_hp}) for {monster_name}, setting to 1")
-                average_hp = 1
+            if monster_data['skills']:
+                details.append(f"Compétences: {monster_data['skills']}")
+            if monster_data['damage_resistances']:
+                details.append(f"Résistances aux dégâts: {monster_data['damage_resistances']}")
+            if monster_data['senses']:
+                details.append(f"Sens: {monster_data['senses']}")
+            if monster_data['languages']:
+                details.append(f"Langues: {monster_data['languages']}")
+            traits = [(trait.strip(), "") for trait in monster_data['traits'].split('\n') if trait.strip()] if monster_data['traits'] else []
+            actions = [(action.strip(), "") for action in monster_data['actions'].split('\n') if action.strip()] if monster_data['actions'] else []
+            legendary_actions = [(action.strip(), "") for action in monster_data['legendary_actions'].split('\n') if action.strip()] if monster_data['legendary_actions'] else []
 
             monster_info = {
                 'name': monster_name,
-                'url': None,
-                'html': f'<h2>{monster_name}</h2><p>Monstre personnalisé</p>',
-                'image_urls': [],
-                'hp': average_hp,
-                'hp_formula': hp_formula,
-                'type': monster_data[3] or '',
+                'url': crawl_data['url'] if crawl_data else None,
+                'html': f'<h2>{monster_name}</h2><p>{"Fiche aidedd" if crawl_data else "Monstre personnalisé"}</p>',
+                'image_urls': [crawl_data['image_url']] if crawl_data and crawl_data['image_url'] else [],
+                'hp': max(1, monster_data['hp_avg'] or 1),
+                'hp_formula': monster_data['hp'],
+                'hp_dice': monster_data['hp_dice'],
+                'ac_value': monster_data['ac_value'],
+                'initiative_bonus': monster_data['initiative_bonus'],
+                'type': monster_data['type'] or '',
                 'stats': stats,
                 'abilities': abilities,
                 'details': details,
@@ -303,165 +273,114 @@ class EncounterBuilder:
             print(f"Returning monster_info for {monster_name} (manual) with HP: {monster_info['hp']}")
             return monster_info
 
+        return self.fetch_monster_info(monster_name, monster_data['normalized_name'] if monster_data else self.normalize_name(monster_name))
+
+    def fetch_monster_info(self, monster_name, normalized_name, known_hash=None):
         print(f"Fetching data for {monster_name} from web (scraped creature)")
-        def normalize_name(name):
-            name = unicodedata.normalize('NFD', name.lower()).encode('ascii', 'ignore').decode('utf-8')
-            name = name.replace(' ', '-').replace(',', '')
-            replacements = {
-                'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e',
-                'à': 'a', 'â': 'a', 'ä': 'a',
-                'î': 'i', 'ï': 'i',
-                'ô': 'o', 'ö': 'o',
-                'û': 'u', 'ü': 'u',
-                'ç': 'c'
-            }
-            for char, replacement in replacements.items():
-                name = name.replace(char, replacement)
-            return name
-        
-        base_name = normalize_name(monster_name)
-        url = f"https://www.aidedd.org/dnd/monstres.php?vf={base_name}"
+        url = stat_blocks.monster_url(monster_name, self.site_root)
         print(f"Scraping URL: {url}")
         try:
-            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-            response = requests.get(url, headers=headers, timeout=10)
+            response = http_client.get(url)
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            monster_block = soup.find('div', class_='jaune') or soup.find('div', class_='col1')
-            if not monster_block:
-                print(f"Monster block not found for {monster_name} at {url}")
-                return {'name': monster_name, 'error': 'Fiche non trouvée', 'html': f'<h2>{monster_name}</h2><p>Fiche non disponible.</p>', 'image_urls': [], 'url': url}
-
-            image_urls = []
-            picture_div = soup.find('div', class_='picture')
-            if picture_div:
-                img = picture_div.find('img')
-                if img and img.get('src'):
-                    src = img['src']
-                    full_url = src if src.startswith('http') else f"https://www.aidedd.org{src}"
-                    image_urls.append(full_url)
-
-            if image_urls:
-                print(f"Found image URLs for {monster_name}: {image_urls}")
-            else:
-                print(f"No image URLs found for {monster_name} at {url}")
-
-            stats = {}
-            hp_formula = ""
-            red_div = soup.find('div', class_='red')
-            if red_div:
-                current_key = None
-                current_value = []
-                for child in red_div.children:
-                    if child.name == 'strong':
-                        if current_key and current_value:
-                            stats[current_key] = " ".join(current_value).strip()
-                            if current_key == "Points de vie":
-                                hp_formula = stats[current_key]
-                                print(f"HP formula for {monster_name}: {hp_formula}")
-                        current_key = child.text.strip()
-                        current_value = []
-                    elif child.name == 'br':
-                        continue
-                    elif child.string:
-                        current_value.append(child.string.strip())
-                    elif child.name == 'div':
-                        continue
-                if current_key and current_value:
-                    stats[current_key] = " ".join(current_value).strip()
-                    if current_key == "Points de vie":
-                        hp_formula = stats[current_key]
-                        print(f"HP formula for {monster_name}: {hp_formula}")
-
-            average_hp = 0
-            if hp_formula:
-                hp_formula = hp_formula.strip()
-                match = re.match(r"(\d+)(?:\s*\(.*\))?", hp_formula)
-                if match:
-                    average_hp = int(match.group(1))
-                    print(f"Extracted HP for {monster_name}: {average_hp} from formula {hp_formula}")
-                else:
-                    print(f"Could not parse HP for {monster_name}: {hp_formula}")
-                    average_hp = 1
-            else:
-                print(f"No HP formula found for {monster_name}, defaulting to 1")
-                average_hp = 1
-
-            abilities_raw = {strong.text.strip(): div.text.replace(strong.text, '').strip() for div in soup.find_all('div', class_='carac') if div.find('strong') for strong in [div.find('strong')]}
-            abilities = {}
-            for key, value in abilities_raw.items():
-                match = re.match(r"(\d+)", value)
-                if match:
-                    score = int(match.group(1))
-                    modifier = self.calculate_modifier(score)
-                    abilities[key] = f"{score} ({modifier:+d})"
-                else:
-                    abilities[key] = value
-
-            monster_data = {
-                'name': monster_name,
-                'url': url,
-                'html': str(monster_block).replace('src="/', 'src="https://www.aidedd.org/').replace('href="/', 'href="https://www.aidedd.org/'),
-                'image_urls': image_urls,
-                'hp': average_hp,
-                'hp_formula': hp_formula,
-                'type': soup.find('div', class_='type').text.strip() if soup.find('div', class_='type') else '',
-                'stats': stats,
-                'abilities': abilities,
-                'details': [p.text.strip() for p in soup.find_all('p') if any(kw in p.text for kw in ['Compétences', 'Résistances', 'Immunités', 'Sens', 'Langues', 'Puissance'])],
-                'traits': [(p.find('strong').text.strip(), p.text.replace(p.find('strong').text, '').strip()) for p in soup.find_all('p') if p.find('strong') and p.find('em')],
-                'actions': [],
-                'legendary_actions': []
-            }
-            current_section = 'actions'
-            for tag in soup.find_all(['div', 'p']):
-                if 'rub' in tag.get('class', []):
-                    title = tag.text.strip()
-                    content = next((sib.text.strip() for sib in tag.find_next_siblings() if sib.name == 'p'), "")
-                    if 'action' in title.lower():
-                        current_section = 'actions'
-                    elif 'légendaire' in title.lower():
-                        current_section = 'legendary_actions'
-                    if current_section in ['actions', 'legendary_actions']:
-                        monster_data[current_section].append((title, content))
-
-            if monster_data['hp'] <= 0:
-                print(f"Warning: Invalid HP ({monster_data['hp']}) for {monster_name}, setting to 1")
-                monster_data['hp'] = 1
-            print(f"Returning monster_data for {monster_name} (scraped) with HP: {monster_data['hp']}")
+            content_hash = stat_block_store.source_hash(response.content)
+            if content_hash == known_hash:
+                self.stat_block_store.touch(normalized_name)
+                return None
+            monster_data = stat_blocks.parse_stat_block(monster_name, url, response.content, self.site_root)
+            if 'error' not in monster_data:
+                self.stat_block_store.put(normalized_name, monster_data, content_hash)
+                self.repository.replace_attacks(normalized_name, attack_parser.parse_attacks(monster_data))
+            print(f"Returning monster_data for {monster_name} (scraped) with HP: {monster_data.get('hp')}")
             return monster_data
         except Exception as e:
             print(f"Erreur avec {url}: {e}")
-            return {'name': monster_name, 'error': 'Fiche non trouvée', 'html': f'<h2>{monster_name}</h2><p>Fiche non disponible.</p>', 'image_urls': [], 'url': url}
+            return stat_blocks.error_info(monster_name, url)
+
+    def get_monster_attacks(self, monster_name, monster_info=None):
+        # Attaques lues dans monster_attacks ; une fiche en cache d'avant la table est analysée une fois puis enregistrée
+        normalized_name = self.normalize_name(monster_name)
+        attacks = [dict(row) for row in self.repository.get_attacks(normalized_name)]
+        if not attacks and monster_info and 'error' not in monster_info and monster_info.get('actions'):
+            attacks = attack_parser.parse_attacks(monster_info)
+            if attacks:
+                self.repository.replace_attacks(normalized_name, attacks)
+        return attacks
+
+    def schedule_stat_block_refresh(self, monster_name, normalized_name):
+        if normalized_name in self.refreshing:
+            return
+        self.refreshing.add(normalized_name)
+
+        def refresh():
+            try:
+                _, _, known_hash = self.stat_block_store.get(normalized_name)
+                monster_info = self.fetch_monster_info(monster_name, normalized_name, known_hash)
+                # Fiche modifiée : la version analysée en mémoire est remplacée ; inchangée (None) ou en erreur, on garde l'ancienne
+                if monster_info is not None and 'error' not in monster_info:
+                    self.monster_info_cache.put(monster_name, monster_info)
+            finally:
+                self.refreshing.discard(normalized_name)
+        self.refresh_executor.submit(refresh)
 
     def download_and_cache_image(self, image_url):
         try:
-            image_filename = os.path.join(self.monster_cache_dir, image_url.split('/')[-1])
-            print(f"Attempting to download image from {image_url} to {image_filename}")
-            if not os.path.exists(image_filename):
-                headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-                context = ssl.create_default_context(cafile=certifi.where())
-                with urllib.request.urlopen(urllib.request.Request(image_url, headers=headers), context=context) as response:
-                    with open(image_filename, 'wb') as f:
-                        f.write(response.read())
-                print(f"Successfully downloaded image to {image_filename}")
-            return image_filename
+            return self.image_cache.get(image_url)
         except Exception as e:
             print(f"Erreur lors du téléchargement de l'image {image_url}: {e}")
             return None
 
+    def load_thumbnail(self, image_url, size=(150, 150)):
+        # Appelé hors du thread Tk : téléchargement, décodage et redimensionnement
+        image_path = self.download_and_cache_image(image_url)
+        if not image_path or not os.path.exists(image_path):
+            return None
+        thumbnail_path = f"{os.path.splitext(image_path)[0]}_thumb.png"
+        if os.path.exists(thumbnail_path):
+            image = Image.open(thumbnail_path)
+            image.load()
+            return image
+        image = Image.open(image_path)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        image = image.resize(size, Image.Resampling.LANCZOS)
+        tmp_path = f"{thumbnail_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        image.save(tmp_path, format="PNG")
+        os.replace(tmp_path, thumbnail_path)
+        self.image_cache.refresh_size(image_url)
+        return image
+
     def get_monster_summary(self, monster_info):
         return {k: monster_info.get(k, []) if k in ['traits', 'actions', 'legendary_actions', 'details'] else monster_info.get(k, '') for k in ['name', 'type', 'stats', 'abilities', 'details', 'traits', 'actions', 'legendary_actions']}
 
+def build_search_indexes(monsters):
+    # Recherche, facettes et trigrammes : construits ensemble en arrière-plan, jamais à la frappe
+    search_index = MonsterSearchIndex(monsters)
+    return search_index, MonsterFacets(search_index), FuzzyIndex(search_index.keys)
+
+
 class EncounterApp:
-    def __init__(self, root):
-        self.builder = EncounterBuilder()
+    def __init__(self, root, seed=None):
+        # Le catalogue local est affiché tout de suite, la synchronisation réseau tourne en arrière-plan
+        self.builder = EncounterBuilder(sync_on_start=False)
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.search_index = MonsterSearchIndex(self.builder.monsters)
+        self.facets = MonsterFacets(self.search_index)
+        self.fuzzy_index = None
+        self.search_after = None
+        self.search_result = None
+        self.search_mask = None
         self.encounter = []
+        self.difficulty = EncounterDifficulty()
+        # Une graine fixe (--seed) rejoue la même séance : initiatives et PV lancés
+        self.dice = DiceRoller(seed)
         self.party = []
         self.initiative_order = []
         self.current_turn = 0
         self.round_count = 0
         self.hp_popup = None
+        self.photo_cache = LRUCache(maxsize=64)
+        self.pending_thumbnails = set()
+        self.displayed_image_url = None
         self.condition_tooltips = {}
         self.rename_tooltips = {}
         
@@ -515,6 +434,70 @@ class EncounterApp:
         self.showing_full_detail = False
         
         self.setup_config_frame()
+        # La liste s'affiche tout de suite ; l'index approché suit en arrière-plan
+        search_index = self.search_index
+        self.run_in_background(FuzzyIndex, lambda fuzzy_index: self.set_fuzzy_index(search_index, fuzzy_index), search_index.keys)
+        self.start_background_sync()
+
+    def run_in_background(self, func, callback, *args):
+        future = self.executor.submit(func, *args)
+
+        def poll():
+            if future.done():
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Erreur dans la tâche en arrière-plan : {e}")
+                    result = None
+                callback(result)
+            else:
+                self.root.after(50, poll)
+        self.root.after(50, poll)
+        return future
+
+    def set_fuzzy_index(self, search_index, fuzzy_index):
+        # Ignoré si le catalogue a été rechargé entre-temps : les positions ne correspondraient plus
+        if fuzzy_index is None or search_index is not self.search_index:
+            return
+        self.fuzzy_index = fuzzy_index
+        if self.search_var.get().strip():
+            self.search_result = None
+            self.update_monster_list()
+
+    def start_background_sync(self):
+        self.sync_status_var.set("Synchronisation du catalogue en cours...")
+        self.sync_progress.grid()
+        self.sync_progress.start(10)
+        self.run_in_background(self.sync_catalogue, self.on_sync_finished)
+
+    def sync_catalogue(self):
+        # Rechargement et index reconstruits dans la même tâche : le thread Tk n'a plus qu'à les échanger
+        result = self.builder.scrape_monsters()
+        if result['status'] == 'updated':
+            self.builder.load_monsters()
+            result['indexes'] = build_search_indexes(self.builder.monsters)
+        return result
+
+    def on_sync_finished(self, result):
+        self.sync_progress.stop()
+        self.sync_progress.grid_remove()
+        if not result or result['status'] == 'error':
+            self.sync_status_var.set(f"Hors ligne : catalogue local ({len(self.builder.monsters)} monstres)")
+            return
+        if result['status'] == 'unchanged':
+            self.sync_status_var.set(f"Catalogue à jour ({len(self.builder.monsters)} monstres)")
+            return
+        # Les positions changent avec le nouvel index : la sélection est retrouvée par le nom
+        selected = self.selected_monster()
+        self.monster_list.set_provider(ListProvider([]), keep_selection=False)
+        self.search_index, self.facets, self.fuzzy_index = result['indexes']
+        self.search_result = None
+        self.refresh_facet_values()
+        self.update_monster_list()
+        position = self.search_index.position(selected.name) if selected else None
+        if position is not None and self.monster_list.provider.index_of(position) is not None:
+            self.monster_list.select(self.monster_list.provider.index_of(position))
+        self.sync_status_var.set(f"Catalogue synchronisé : {result['inserted']} ajoutés, {result['updated']} mis à jour, {result['removed']} retirés")
 
     def setup_config_frame(self):
         self.config_frame.columnconfigure(1, weight=1)
@@ -525,66 +508,318 @@ class EncounterApp:
         ttk.Label(self.config_frame, text="Niveau des PJ :", style="TLabel").grid(row=0, column=2, padx=10, pady=5, sticky="e")
         self.party_level = tk.IntVar(value=1)
         ttk.Spinbox(self.config_frame, from_=1, to=20, textvariable=self.party_level, width=5).grid(row=0, column=3, padx=10, pady=5, sticky="w")
+        self.party_size.trace("w", self.on_party_change)
+        self.party_level.trace("w", self.on_party_change)
         
         ttk.Label(self.config_frame, text="Rechercher :", style="TLabel").grid(row=1, column=0, padx=10, pady=5, sticky="e")
         self.search_var = tk.StringVar()
-        ttk.Entry(self.config_frame, textvariable=self.search_var).grid(row=1, column=1, columnspan=3, padx=10, pady=5, sticky="ew")
-        self.search_var.trace("w", self.update_monster_list)
+        ttk.Entry(self.config_frame, textvariable=self.search_var).grid(row=1, column=1, columnspan=2, padx=10, pady=5, sticky="ew")
+        self.search_var.trace("w", self.schedule_monster_list_update)
+        # Recherche plein texte (FTS5) dans les noms, types, résistances, traits et actions
+        self.fulltext_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.config_frame, text="Plein texte", variable=self.fulltext_var, command=self.update_monster_list,
+                        state="normal" if self.builder.repository.fulltext else "disabled").grid(row=1, column=3, padx=10, pady=5, sticky="w")
+        
+        self.setup_facet_frame()
         
-        self.monster_listbox = tk.Listbox(self.config_frame, height=10, font=("Georgia", 12), bg="#FFF8E1", fg="#2F1E0F", selectbackground="#A0522D", relief="flat")
-        self.monster_listbox.grid(row=2, column=0, columnspan=4, padx=10, pady=5, sticky="ew")
+        # Liste virtuelle : seules les lignes visibles sont créées, quelle que soit la taille du catalogue
+        self.monster_list = VirtualList(self.config_frame, height=10, on_activate=lambda position: self.add_monster(),
+                                        font=("Georgia", 12), bg="#FFF8E1", fg="#2F1E0F", selectbackground="#A0522D", relief="flat")
+        self.monster_list.grid(row=3, column=0, columnspan=4, padx=10, pady=5, sticky="ew")
+        self.refresh_facet_values()
         self.update_monster_list()
         
-        ttk.Label(self.config_frame, text="Quantité :", style="TLabel").grid(row=3, column=0, padx=10, pady=5, sticky="e")
+        ttk.Label(self.config_frame, text="Quantité :", style="TLabel").grid(row=4, column=0, padx=10, pady=5, sticky="e")
         self.quantity_var = tk.IntVar(value=1)
-        ttk.Spinbox(self.config_frame, from_=1, to=99, textvariable=self.quantity_var, width=5).grid(row=3, column=1, padx=10, pady=5, sticky="w")
+        ttk.Spinbox(self.config_frame, from_=1, to=99, textvariable=self.quantity_var, width=5).grid(row=4, column=1, padx=10, pady=5, sticky="w")
         
-        ttk.Button(self.config_frame, text="Ajouter", command=self.add_monster).grid(row=3, column=3, padx=10, pady=5)
+        ttk.Button(self.config_frame, text="Ajouter", command=self.add_monster).grid(row=4, column=3, padx=10, pady=5)
         
         self.encounter_text = scrolledtext.ScrolledText(self.config_frame, height=6, font=("Georgia", 12), bg="#FFF8E1", fg="#2F1E0F", relief="flat")
-        self.encounter_text.grid(row=4, column=0, columnspan=4, padx=10, pady=5, sticky="ew")
+        self.encounter_text.grid(row=5, column=0, columnspan=4, padx=10, pady=5, sticky="ew")
+        self.difficulty_var = tk.StringVar()
+        ttk.Label(self.config_frame, textvariable=self.difficulty_var, style="TLabel").grid(row=6, column=0, columnspan=4, padx=10, pady=5, sticky="w")
+        self.update_difficulty_display()
         
         btn_frame = ttk.Frame(self.config_frame)
-        btn_frame.grid(row=5, column=0, columnspan=4, pady=10)
+        btn_frame.grid(row=7, column=0, columnspan=4, pady=10)
         ttk.Button(btn_frame, text="Effacer", command=self.clear_encounter).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="Démarrer", command=self.start_encounter).pack(side=tk.LEFT, padx=5)
+        self.roll_hp_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(btn_frame, text="PV lancés", variable=self.roll_hp_var).pack(side=tk.LEFT, padx=5)
+        self.target_difficulty_var = tk.StringVar(value=DIFFICULTIES[2])
+        ttk.Combobox(btn_frame, textvariable=self.target_difficulty_var, values=DIFFICULTIES[1:], state="readonly", width=10).pack(side=tk.LEFT, padx=(20, 5))
+        self.max_distinct_var = tk.IntVar(value=3)
+        self.max_count_var = tk.IntVar(value=8)
+        ttk.Label(btn_frame, text="Types max :", style="TLabel").pack(side=tk.LEFT, padx=(5, 2))
+        ttk.Spinbox(btn_frame, from_=1, to=6, textvariable=self.max_distinct_var, width=3).pack(side=tk.LEFT)
+        ttk.Label(btn_frame, text="Monstres max :", style="TLabel").pack(side=tk.LEFT, padx=(5, 2))
+        ttk.Spinbox(btn_frame, from_=1, to=20, textvariable=self.max_count_var, width=3).pack(side=tk.LEFT)
+        ttk.Button(btn_frame, text="Générer", command=self.generate_encounter).pack(side=tk.LEFT, padx=5)
+        self.simulate_button = ttk.Button(btn_frame, text="Simuler", command=self.simulate_encounter, state="normal" if combat_simulator else "disabled")
+        self.simulate_button.pack(side=tk.LEFT, padx=5)
+
+        status_frame = ttk.Frame(self.config_frame)
+        status_frame.grid(row=8, column=0, columnspan=4, pady=5, sticky="ew")
+        self.sync_status_var = tk.StringVar(value=f"Catalogue local : {len(self.builder.monsters)} monstres")
+        ttk.Label(status_frame, textvariable=self.sync_status_var, style="Small.TLabel").grid(row=0, column=0, padx=10, sticky="w")
+        self.sync_progress = ttk.Progressbar(status_frame, mode="indeterminate", length=150)
+        self.sync_progress.grid(row=0, column=1, padx=10, sticky="w")
+        self.sync_progress.grid_remove()
+
+    def schedule_monster_list_update(self, *args):
+        # Regroupe les frappes rapprochées : un seul filtrage une fois la saisie posée
+        if self.search_after is not None:
+            self.root.after_cancel(self.search_after)
+        self.search_after = self.root.after(150, self.update_monster_list)
+
+    def setup_facet_frame(self):
+        facet_frame = ttk.LabelFrame(self.config_frame, text="Filtres", padding=5)
+        facet_frame.grid(row=2, column=0, columnspan=4, padx=10, pady=5, sticky="ew")
+        facet_frame.columnconfigure(1, weight=1)
+        facet_frame.columnconfigure(3, weight=1)
+
+        self.cr_min_var = tk.DoubleVar(value=0)
+        self.cr_max_var = tk.DoubleVar(value=0)
+        self.cr_min_label = ttk.Label(facet_frame, text="FP min :", style="TLabel", width=12)
+        self.cr_min_label.grid(row=0, column=0, padx=5, sticky="e")
+        self.cr_min_scale = ttk.Scale(facet_frame, variable=self.cr_min_var, orient="horizontal", command=lambda value: self.on_cr_change('min'))
+        self.cr_min_scale.grid(row=0, column=1, padx=5, sticky="ew")
+        self.cr_max_label = ttk.Label(facet_frame, text="FP max :", style="TLabel", width=12)
+        self.cr_max_label.grid(row=0, column=2, padx=5, sticky="e")
+        self.cr_max_scale = ttk.Scale(facet_frame, variable=self.cr_max_var, orient="horizontal", command=lambda value: self.on_cr_change('max'))
+        self.cr_max_scale.grid(row=0, column=3, padx=5, sticky="ew")
+
+        ttk.Label(facet_frame, text="Types :", style="TLabel").grid(row=1, column=0, padx=5, sticky="ne")
+        self.type_listbox = tk.Listbox(facet_frame, height=5, selectmode=tk.MULTIPLE, exportselection=False, font=("Georgia", 11), bg="#FFF8E1", fg="#2F1E0F", selectbackground="#A0522D", relief="flat")
+        self.type_listbox.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+        self.type_listbox.bind("<<ListboxSelect>>", self.update_monster_list)
+        ttk.Label(facet_frame, text="Tailles :", style="TLabel").grid(row=1, column=2, padx=5, sticky="ne")
+        self.size_listbox = tk.Listbox(facet_frame, height=5, selectmode=tk.MULTIPLE, exportselection=False, font=("Georgia", 11), bg="#FFF8E1", fg="#2F1E0F", selectbackground="#A0522D", relief="flat")
+        self.size_listbox.grid(row=1, column=3, padx=5, pady=5, sticky="ew")
+        self.size_listbox.bind("<<ListboxSelect>>", self.update_monster_list)
+
+        self.facet_count_var = tk.StringVar()
+        ttk.Label(facet_frame, textvariable=self.facet_count_var, style="TLabel").grid(row=2, column=1, padx=5, sticky="w")
+        ttk.Button(facet_frame, text="Réinitialiser", command=self.reset_facets).grid(row=2, column=3, padx=5, pady=5, sticky="e")
+        self.type_values = []
+        self.size_values = []
+
+    def refresh_facet_values(self):
+        # Après (re)chargement du catalogue : nouvelles valeurs, sélections conservées quand elles existent encore
+        selected_types = self.selected_facet_values(self.type_listbox, self.type_values)
+        selected_sizes = self.selected_facet_values(self.size_listbox, self.size_values)
+        for listbox, values, selected in ((self.type_listbox, self.facets.type_values, selected_types), (self.size_listbox, self.facets.size_values, selected_sizes)):
+            listbox.delete(0, tk.END)
+            for i, value in enumerate(values):
+                listbox.insert(tk.END, value)
+                if value in selected:
+                    listbox.selection_set(i)
+        self.type_values = list(self.facets.type_values)
+        self.size_values = list(self.facets.size_values)
+        last = max(len(self.facets.cr_values) - 1, 0)
+        self.cr_min_scale.configure(from_=0, to=last)
+        self.cr_max_scale.configure(from_=0, to=last)
+        self.cr_min_var.set(0)
+        self.cr_max_var.set(last)
+        self.update_cr_labels()
+
+    def selected_facet_values(self, listbox, values):
+        return [values[i] for i in listbox.curselection() if i < len(values)]
+
+    def selected_cr_range(self):
+        if not self.facets.cr_values:
+            return None, None
+        return self.facets.cr_values[round(self.cr_min_var.get())], self.facets.cr_values[round(self.cr_max_var.get())]
+
+    def update_cr_labels(self):
+        cr_min, cr_max = self.selected_cr_range()
+        if cr_min is not None:
+            self.cr_min_label.configure(text=f"FP min : {monster_utils.format_cr(cr_min)}")
+            self.cr_max_label.configure(text=f"FP max : {monster_utils.format_cr(cr_max)}")
+
+    def on_cr_change(self, moved):
+        # Deux curseurs pour une plage : celui qu'on déplace pousse l'autre plutôt que de croiser
+        low, high = round(self.cr_min_var.get()), round(self.cr_max_var.get())
+        if low > high:
+            if moved == 'min':
+                self.cr_max_var.set(low)
+            else:
+                self.cr_min_var.set(high)
+        self.update_cr_labels()
+        self.update_monster_list()
+
+    def reset_facets(self):
+        self.type_listbox.selection_clear(0, tk.END)
+        self.size_listbox.selection_clear(0, tk.END)
+        self.cr_min_var.set(0)
+        self.cr_max_var.set(max(len(self.facets.cr_values) - 1, 0))
+        self.update_cr_labels()
+        self.update_monster_list()
+
+    def update_facet_counts(self, listbox, values, counts):
+        # Réécrit seulement les libellés dont le compteur a changé, en gardant la sélection
+        selected = set(listbox.curselection())
+        for i, value in enumerate(values):
+            label = f"{value} ({counts.get(value, 0)})"
+            if listbox.get(i) != label:
+                listbox.delete(i)
+                listbox.insert(i, label)
+                if i in selected:
+                    listbox.selection_set(i)
 
     def update_monster_list(self, *args):
-        search_term = self.search_var.get().lower()
-        self.monster_listbox.delete(0, tk.END)
-        sorted_monsters = sorted(self.builder.monsters, key=lambda m: (m.name.lower(), m.cr))
-        seen_entries = set()
-        for monster in sorted_monsters:
-            entry = f"{monster.name} (CR {monster.cr})"
-            normalized_entry = self.builder.normalize_name(monster.name)
-            if search_term in monster.name.lower() and normalized_entry not in seen_entries:
-                self.monster_listbox.insert(tk.END, entry)
-                seen_entries.add(normalized_entry)
-                print(f"Affiché: {entry} (normalisé: {normalized_entry})")
+        if self.search_after is not None:
+            self.root.after_cancel(self.search_after)
+        self.search_after = None
+        search_term = self.search_var.get()
+        index = self.search_index
+        ranked = None
+        if self.fulltext_var.get() and search_term.strip():
+            ranked_names = self.builder.repository.search_fulltext(search_term)
+            if ranked_names is not None:
+                ranked = [position for position in map(index.position, ranked_names) if position is not None]
+        # "goblin", "dragn rouje" : fautes de frappe et variantes que la sous-chaîne ne trouve pas ; tant que l'index
+        # approché n'est pas prêt, seule la sous-chaîne répond (la frappe ne construit jamais d'index)
+        if (ranked is None and self.fuzzy_index is not None and len(fuzzy_key(search_term)) >= 3
+                and len(index.search(search_term)) < FUZZY_FALLBACK_RESULTS):
+            exact = index.search(search_term)
+            exact_positions = set(exact)
+            close = [position for position in self.fuzzy_index.search(search_term) if position not in exact_positions]
+            if close:
+                ranked = exact + close
+        result = index.search(search_term) if ranked is None else ranked
+        # Le bitset de la recherche n'est recalculé que si le résultat a changé
+        if result is not self.search_result:
+            self.search_result = result
+            self.search_mask = None if len(result) == len(index) else bitset(result, len(index))
+        cr_min, cr_max = self.selected_cr_range()
+        mask, type_counts, size_counts = self.facets.filter(self.search_mask, cr_min, cr_max,
+                                                            self.selected_facet_values(self.type_listbox, self.type_values),
+                                                            self.selected_facet_values(self.size_listbox, self.size_values))
+        self.update_facet_counts(self.type_listbox, self.type_values, type_counts)
+        self.update_facet_counts(self.size_listbox, self.size_values, size_counts)
+        if mask != (self.search_mask if self.search_mask is not None else self.facets.all):
+            result = select_positions(mask, result, len(index))
+        self.facet_count_var.set(f"{len(result)} monstres")
+        self.monster_list.set_provider(ListProvider(result, index.labels.__getitem__))
+
+    def selected_monster(self):
+        position = self.monster_list.selected_item()
+        return self.search_index.monsters[position] if position is not None else None
 
     def add_monster(self):
-        selected = self.monster_listbox.curselection()
-        if not selected:
+        monster = self.selected_monster()
+        if not monster:
             messagebox.showwarning("Aucune sélection", "Sélectionnez un monstre.")
             return
-        monster_name = self.monster_listbox.get(selected[0]).split(" (CR")[0]
-        monster = next((m for m in self.builder.monsters if m.name == monster_name), None)
-        if monster:
-            self.encounter.append((monster, self.quantity_var.get()))
-            self.update_encounter_display()
-
-    def update_encounter_display(self):
-        self.encounter_text.delete(1.0, tk.END)
-        total_xp = 0
-        for monster, qty in self.encounter:
-            xp = monster.xp * qty
-            total_xp += xp
-            self.encounter_text.insert(tk.END, f"{qty}x {monster.name} (CR {monster.cr}, {xp} XP)\n")
-        self.encounter_text.insert(tk.END, f"\nTotal XP : {total_xp}")
+        self.append_to_encounter(monster, self.quantity_var.get())
+        self.update_difficulty_display()
+
+    def append_to_encounter(self, monster, qty):
+        # Une ligne de plus et des totaux mis à jour : la rencontre n'est pas reparcourue
+        self.encounter.append((monster, qty))
+        self.difficulty.add(monster.xp, qty)
+        self.encounter_text.insert(tk.END, f"{qty}x {monster.name} (CR {monster.cr}, {monster.xp * qty} XP)\n")
+
+    def update_difficulty_display(self):
+        summary = self.difficulty.summary()
+        thresholds = " / ".join(f"{label} {xp}" for label, xp in summary['thresholds'].items())
+        self.difficulty_var.set(f"Total XP : {summary['total_xp']}  |  XP ajustée : {summary['adjusted_xp']} (x{summary['multiplier']:g}, "
+                                f"{summary['monster_count']} monstres)  |  Difficulté : {summary['label']}  |  Seuils : {thresholds}")
+
+    def on_party_change(self, *args):
+        try:
+            self.difficulty.set_party(self.party_size.get(), self.party_level.get())
+        except (tk.TclError, ValueError):
+            return
+        self.update_difficulty_display()
 
     def clear_encounter(self):
         self.encounter = []
-        self.update_encounter_display()
+        self.difficulty.clear()
+        self.encounter_text.delete(1.0, tk.END)
+        self.update_difficulty_display()
+
+    def set_encounter(self, encounter):
+        self.clear_encounter()
+        for monster, qty in encounter:
+            self.append_to_encounter(monster, qty)
+        self.update_difficulty_display()
+
+    def generate_encounter(self):
+        # Les filtres actifs (FP, types, tailles) bornent la recherche
+        try:
+            party_size, party_level = self.party_size.get(), self.party_level.get()
+        except tk.TclError:
+            messagebox.showwarning("Groupe invalide", "Indiquez le nombre et le niveau des PJ.")
+            return
+        try:
+            max_distinct, max_count = self.max_distinct_var.get(), self.max_count_var.get()
+        except tk.TclError:
+            max_distinct = max_count = 0
+        if max_distinct < 1 or max_count < 1:
+            messagebox.showwarning("Limites invalides", "Indiquez le nombre maximal de types et de monstres.")
+            return
+        cr_min, cr_max = self.selected_cr_range()
+        suggestions = encounter_generator.generate_encounters(
+            self.search_index.monsters, party_size, party_level, DIFFICULTIES.index(self.target_difficulty_var.get()),
+            self.selected_facet_values(self.type_listbox, self.type_values), self.selected_facet_values(self.size_listbox, self.size_values),
+            cr_min, cr_max, max_distinct, max_count)
+        if not suggestions:
+            messagebox.showinfo("Aucune rencontre", "Aucune combinaison ne tombe dans la difficulté demandée avec ces filtres.")
+            return
+
+        window = tk.Toplevel(self.root)
+        window.title(f"Rencontres suggérées ({self.target_difficulty_var.get()})")
+        window.configure(bg="#F5E8C7")
+        window.geometry("700x320")
+        suggestion_list = tk.Listbox(window, height=10, font=("Georgia", 12), bg="#FFF8E1", fg="#2F1E0F", selectbackground="#A0522D", relief="flat")
+        suggestion_list.pack(pady=10, padx=10, fill="both", expand=True)
+        for suggestion in suggestions:
+            suggestion_list.insert(tk.END, encounter_generator.describe(suggestion))
+        suggestion_list.selection_set(0)
+
+        def use_selected(event=None):
+            selected = suggestion_list.curselection()
+            if selected:
+                self.set_encounter(suggestions[selected[0]]['encounter'])
+                window.destroy()
+
+        suggestion_list.bind("<Double-Button-1>", use_selected)
+        ttk.Button(window, text="Utiliser", command=use_selected).pack(pady=5)
+
+    def simulate_encounter(self):
+        try:
+            party_size, party_level = self.party_size.get(), self.party_level.get()
+        except tk.TclError:
+            party_size = 0
+        if not self.encounter or party_size < 1:
+            messagebox.showwarning("Erreur", "Ajoutez des monstres et définissez un groupe valide.")
+            return
+        encounter = list(self.encounter)
+        party = combat_simulator.build_party(party_size, party_level)
+        self.simulate_button.config(state="disabled")
+        self.sync_status_var.set(f"Simulation de {len(party)} PJ contre {sum(qty for _, qty in encounter)} monstres...")
+
+        def simulate():
+            # Une fiche absente de la base est téléchargée : lecture des fiches et simulation hors du thread Tk
+            monsters = []
+            for monster, qty in encounter:
+                monster_info = self.builder.extract_monster_info(monster.name)
+                attacks = self.builder.get_monster_attacks(monster.name, monster_info)
+                monsters.extend(combat_simulator.combatant_from_info(f"{monster.name} {i+1}", monster_info, attacks) for i in range(qty))
+            return combat_simulator.simulate(party, monsters)
+
+        def on_done(report):
+            self.simulate_button.config(state="normal")
+            self.sync_status_var.set(f"Catalogue local : {len(self.builder.monsters)} monstres")
+            if report is None:
+                messagebox.showerror("Erreur", "La simulation a échoué.")
+                return
+            messagebox.showinfo("Simulation du combat", combat_simulator.describe(report))
+
+        self.run_in_background(simulate, on_done)
 
     def update_hp_bar_color(self, hp_bar, hp_current, hp_max):
         if hp_max <= 0:
@@ -638,17 +873,22 @@ class EncounterApp:
         for monster, qty in self.encounter:
             base_name = monster.name
             monster_info = self.builder.extract_monster_info(base_name)
+            if monster_info.get('image_urls') and self.photo_cache.get(monster_info['image_urls'][0]) is None:
+                self.request_thumbnail(monster_info['image_urls'][0], monster.name)
             hp = monster_info.get('hp', 1)
             if hp <= 0:
                 hp = 1
                 print(f"Warning: HP for {monster.name} was {hp}, setting to 1")
             print(f"Setting HP for {monster.name}: {hp}")
+            # PV lancés : chaque exemplaire tire sa propre formule ("2d8+2"), la moyenne sert si elle manque
+            hp_dice = (monster_info.get('hp_dice') or monster_utils.parse_hp(monster_info.get('hp_formula'))[1]) if self.roll_hp_var.get() else None
             for i in range(qty):
+                instance_hp = max(1, self.dice.roll(hp_dice)) if hp_dice else hp
                 self.initiative_order.append([
                     f"{monster.name} {i+1}",
                     tk.IntVar(value=0),
-                    tk.IntVar(value=hp),
-                    tk.IntVar(value=hp),
+                    tk.IntVar(value=instance_hp),
+                    tk.IntVar(value=instance_hp),
                     [],
                     False,
                     {"damage_dealt": 0, "damage_taken": 0, "healing_done": 0}
@@ -718,7 +958,7 @@ class EncounterApp:
         self.update_turn_order()
 
     def roll_initiative(self, var):
-        var.set(random.randint(1, 20))
+        var.set(self.dice.roll("1d20"))
 
     def toggle_concentration(self, index):
         self.initiative_order[index][5] = not self.initiative_order[index][5]
@@ -853,6 +1093,7 @@ class EncounterApp:
         if self.hp_popup:
             self.hp_popup.destroy()
         
+        monster_info = None
         if not name.startswith("PJ"):
             base_name = " ".join(name.split()[:-1])
             monster_info = self.builder.extract_monster_info(base_name)
@@ -948,65 +1189,91 @@ class EncounterApp:
             
             ttk.Button(rename_frame, text="Renommer", command=save_new_name).grid(row=1, column=0, columnspan=2, pady=5)
 
-        if not name.startswith("PJ"):
-            base_name = " ".join(name.split()[:-1])
-            monster_info = self.builder.extract_monster_info(base_name)
-            if 'error' not in monster_info:
-                summary_frame = ttk.LabelFrame(main_frame, text=f"Caractéristiques ({base_name})", padding=10)
-                summary_frame.grid(row=3, column=0, padx=10, pady=5, sticky="nsew")
-                summary_frame.columnconfigure((0, 1, 2), weight=1, uniform="column")
-                
-                summary_text = scrolledtext.ScrolledText(summary_frame, height=15, width=80, font=("Georgia", 12), bg="#FFF8E1", fg="#2F1E0F", relief="flat")
-                summary_text.grid(row=0, column=0, columnspan=3, padx=5, pady=5, sticky="nsew")
-                
-                monster_summary = self.builder.get_monster_summary(monster_info)
-                
-                summary_text.insert(tk.END, f"{monster_summary['name']}\n", "bold")
-                summary_text.insert(tk.END, f"{monster_summary['type']}\n\n", "italic")
-                summary_text.insert(tk.END, "Statistiques\n", "bold")
-                for key, value in monster_summary['stats'].items():
-                    if value and value != "N/A":
-                        summary_text.insert(tk.END, f"{key}: {value}\n")
-                
-                summary_text.insert(tk.END, "\nCaractéristiques\n", "bold")
-                for key, value in monster_summary['abilities'].items():
-                    if value and value != "N/A":
-                        summary_text.insert(tk.END, f"{key}: {value}\n")
-                
-                if monster_summary['details']:
-                    summary_text.insert(tk.END, "\nDétails\n", "bold")
-                    for detail in monster_summary['details']:
-                        if detail:
-                            summary_text.insert(tk.END, f"{detail}\n")
-                
-                if monster_summary['traits']:
-                    summary_text.insert(tk.END, "\nTraits\n", "bold")
-                    for title, content in monster_summary['traits']:
-                        if title:
-                            summary_text.insert(tk.END, f"{title}\n{content}\n")
-                
-                if monster_summary['actions']:
-                    summary_text.insert(tk.END, "\nActions\n", "bold")
-                    for title, content in monster_summary['actions']:
-                        if title:
-                            summary_text.insert(tk.END, f"{title}\n{content}\n")
-                
-                if monster_summary['legendary_actions']:
-                    summary_text.insert(tk.END, "\nActions Légendaires\n", "bold")
-                    for title, content in monster_summary['legendary_actions']:
-                        if title:
-                            summary_text.insert(tk.END, f"{title}\n{content}\n")
-                
-                summary_text.tag_configure("bold", font=("Georgia", 12, "bold"), foreground="#8B4513")
-                summary_text.tag_configure("italic", font=("Georgia", 12, "italic"))
-                summary_text.config(state=tk.DISABLED)
-                
-                ttk.Button(summary_frame, text="Voir la Fiche Complète", command=lambda: self.open_monster_webpage(monster_info)).grid(row=1, column=0, columnspan=3, pady=10)
+        attacks = self.builder.get_monster_attacks(base_name, monster_info) if monster_info and 'error' not in monster_info else []
+        if attacks:
+            attack_frame = ttk.LabelFrame(main_frame, text="Attaques", padding=10)
+            attack_frame.grid(row=2, column=0, padx=10, pady=5, sticky="ew")
+            attack_result = tk.StringVar(value="Cliquez sur une attaque pour la lancer ; les dégâts sont reportés dans Modification.")
+            for attack in attacks:
+                ttk.Button(attack_frame, text=attack_parser.describe_attack(attack), command=lambda a=attack: self.roll_attack(a, attack_result)).pack(fill="x", padx=5, pady=2)
+            ttk.Label(attack_frame, textvariable=attack_result, style="TLabel", wraplength=800).pack(fill="x", padx=5, pady=5)
+
+        if monster_info and 'error' not in monster_info:
+            summary_frame = ttk.LabelFrame(main_frame, text=f"Caractéristiques ({base_name})", padding=10)
+            summary_frame.grid(row=3, column=0, padx=10, pady=5, sticky="nsew")
+            summary_frame.columnconfigure((0, 1, 2), weight=1, uniform="column")
+            
+            summary_text = scrolledtext.ScrolledText(summary_frame, height=15, width=80, font=("Georgia", 12), bg="#FFF8E1", fg="#2F1E0F", relief="flat")
+            summary_text.grid(row=0, column=0, columnspan=3, padx=5, pady=5, sticky="nsew")
+            
+            monster_summary = self.builder.get_monster_summary(monster_info)
+            
+            summary_text.insert(tk.END, f"{monster_summary['name']}\n", "bold")
+            summary_text.insert(tk.END, f"{monster_summary['type']}\n\n", "italic")
+            summary_text.insert(tk.END, "Statistiques\n", "bold")
+            for key, value in monster_summary['stats'].items():
+                if value and value != "N/A":
+                    summary_text.insert(tk.END, f"{key}: {value}\n")
+            
+            summary_text.insert(tk.END, "\nCaractéristiques\n", "bold")
+            for key, value in monster_summary['abilities'].items():
+                if value and value != "N/A":
+                    summary_text.insert(tk.END, f"{key}: {value}\n")
+            
+            if monster_summary['details']:
+                summary_text.insert(tk.END, "\nDétails\n", "bold")
+                for detail in monster_summary['details']:
+                    if detail:
+                        summary_text.insert(tk.END, f"{detail}\n")
+            
+            if monster_summary['traits']:
+                summary_text.insert(tk.END, "\nTraits\n", "bold")
+                for title, content in monster_summary['traits']:
+                    if title:
+                        summary_text.insert(tk.END, f"{title}\n{content}\n")
+            
+            if monster_summary['actions']:
+                summary_text.insert(tk.END, "\nActions\n", "bold")
+                for title, content in monster_summary['actions']:
+                    if title:
+                        summary_text.insert(tk.END, f"{title}\n{content}\n")
+            
+            if monster_summary['legendary_actions']:
+                summary_text.insert(tk.END, "\nActions Légendaires\n", "bold")
+                for title, content in monster_summary['legendary_actions']:
+                    if title:
+                        summary_text.insert(tk.END, f"{title}\n{content}\n")
+            
+            summary_text.tag_configure("bold", font=("Georgia", 12, "bold"), foreground="#8B4513")
+            summary_text.tag_configure("italic", font=("Georgia", 12, "italic"))
+            summary_text.config(state=tk.DISABLED)
+            
+            ttk.Button(summary_frame, text="Voir la Fiche Complète", command=lambda: self.open_monster_webpage(monster_info)).grid(row=1, column=0, columnspan=3, pady=10)
 
         def on_mouse_wheel(event):
             main_canvas.yview_scroll(-1 * (event.delta // 120), "units")
         main_canvas.bind_all("<MouseWheel>", on_mouse_wheel)
 
+    def roll_attack(self, attack, result_var):
+        damage = None
+        if attack['to_hit'] is not None:
+            d20 = self.dice.roll("1d20")
+            critical = d20 == 20
+            if attack['damage_dice'] and d20 > 1:
+                damage = self.dice.roll(attack['damage_dice'], critical)
+            outcome = "échec automatique" if d20 == 1 else f"{damage} dégâts {attack['damage_type']}" if damage is not None else ""
+            if critical:
+                outcome = f"critique ! {outcome}".strip()
+            result = f"{attack['name']} : {d20 + attack['to_hit']} pour toucher ({d20} {attack['to_hit']:+d})"
+            result_var.set(f"{result} - {outcome}" if outcome else result)
+        else:
+            damage = self.dice.roll(attack['damage_dice'])
+            result_var.set(f"{attack['name']} : jet de sauvegarde de {attack['save_ability']} DD {attack['save_dc']} - "
+                           f"{damage} dégâts {attack['damage_type']} (moitié : {damage // 2})")
+        # Les dégâts tirés sont prêts à être appliqués à la cible avec le bouton Dégâts
+        if damage is not None:
+            self.hp_mod_var.set(str(max(0, damage)))
+
     def apply_healing(self, index):
         try:
             amount = float(self.hp_mod_var.get())
@@ -1054,27 +1321,40 @@ class EncounterApp:
         else:
             messagebox.showwarning("Avertissement", "Aucune URL disponible pour cette créature.")
 
+    def request_thumbnail(self, image_url, monster_name=None):
+        if image_url in self.pending_thumbnails:
+            return
+        self.pending_thumbnails.add(image_url)
+        self.run_in_background(self.builder.load_thumbnail, lambda thumbnail: self.on_thumbnail_loaded(image_url, thumbnail, monster_name), image_url)
+
+    def on_thumbnail_loaded(self, image_url, thumbnail, monster_name):
+        self.pending_thumbnails.discard(image_url)
+        if thumbnail is None:
+            if self.displayed_image_url == image_url:
+                self.monster_image_label.config(image="", text="Erreur de téléchargement")
+            print(f"Failed to download image for {monster_name}")
+            return
+        photo = ImageTk.PhotoImage(thumbnail)
+        self.photo_cache.put(image_url, photo)
+        if self.displayed_image_url == image_url:
+            self.monster_image_label.config(image=photo, text="")
+            self.monster_image_label.image = photo
+
     def display_monster_stats(self, monster_info):
         self.monster_stats_text.delete(1.0, tk.END)
         
         if 'image_urls' in monster_info and monster_info['image_urls']:
-            try:
-                image_url = monster_info['image_urls'][0]
-                image_path = self.builder.download_and_cache_image(image_url)
-                if image_path and os.path.exists(image_path):
-                    image = Image.open(image_path)
-                    image = image.resize((150, 150), Image.Resampling.LANCZOS)
-                    photo = ImageTk.PhotoImage(image)
-                    self.monster_image_label.config(image=photo)
-                    self.monster_image_label.image = photo
-                    print(f"Successfully displayed image for {monster_info['name']}")
-                else:
-                    self.monster_image_label.config(image="", text="Erreur de téléchargement")
-                    print(f"Failed to download image for {monster_info['name']}")
-            except Exception as e:
-                print(f"Erreur lors du chargement de l'image pour {monster_info['name']}: {e}")
-                self.monster_image_label.config(image="", text="Image non disponible")
+            image_url = monster_info['image_urls'][0]
+            self.displayed_image_url = image_url
+            photo = self.photo_cache.get(image_url)
+            if photo is not None:
+                self.monster_image_label.config(image=photo, text="")
+                self.monster_image_label.image = photo
+            else:
+                self.monster_image_label.config(image="", text="Chargement de l'image...")
+                self.request_thumbnail(image_url, monster_info['name'])
         else:
+            self.displayed_image_url = None
             self.monster_image_label.config(image="", text="Aucune image")
             print(f"No image available for {monster_info['name']}")
 
@@ -1148,6 +1428,8 @@ class EncounterApp:
             self.initiative_frame.destroy()
         self.monster_stats_frame.pack_forget()
         self.monster_image_label.config(image="", text="")
+        self.displayed_image_url = None
+        print(f"Monster info cache stats: {self.builder.monster_info_cache.stats()}")
         self.builder.monster_info_cache.clear()
 
     def show_battle_report(self):
@@ -1210,6 +1492,9 @@ class EncounterApp:
         report_text.tag_configure("separator", foreground="#8B4513", justify="center")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Créateur de rencontres D&D 5e")
+    parser.add_argument("--seed", type=int, default=None, help="Graine des dés pour rejouer une séance")
+    args = parser.parse_args()
     root = ThemedTk(theme="clam")
-    app = EncounterApp(root)
+    app = EncounterApp(root, args.seed)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,137 @@
+import argparse
+import random
+import time
+from bisect import bisect_right
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Seuils d'XP par personnage (Guide du maître) : facile, moyenne, difficile, mortelle
+XP_THRESHOLDS = {
+    1: (25, 50, 75, 100), 2: (50, 100, 150, 200), 3: (75, 150, 225, 400), 4: (125, 250, 375, 500),
+    5: (250, 500, 750, 1100), 6: (300, 600, 900, 1400), 7: (350, 750, 1100, 1700), 8: (450, 900, 1400, 2100),
+    9: (550, 1100, 1600, 2400), 10: (600, 1200, 1900, 2800), 11: (800, 1600, 2400, 3600), 12: (1000, 2000, 3000, 4500),
+    13: (1100, 2200, 3400, 5100), 14: (1250, 2500, 3800, 5700), 15: (1400, 2800, 4300, 6400), 16: (1600, 3200, 4800, 7200),
+    17: (2000, 3900, 5900, 8800), 18: (2100, 4200, 6300, 9500), 19: (2400, 4900, 7300, 10900), 20: (2800, 5700, 8500, 12700),
+}
+DIFFICULTIES = ["Triviale", "Facile", "Moyenne", "Difficile", "Mortelle"]
+
+# Échelle des multiplicateurs ; COUNT_STEPS donne le nombre de monstres à partir duquel on monte d'un cran
+MULTIPLIERS = [0.5, 1, 1.5, 2, 2.5, 3, 4, 5]
+COUNT_STEPS = [1, 2, 3, 7, 11, 15]
+
+
+def party_thresholds(party_size, party_level):
+    level = max(1, min(20, int(party_level)))
+    return tuple(threshold * max(0, int(party_size)) for threshold in XP_THRESHOLDS[level])
+
+
+def party_shift(party_size):
+    # Moins de 3 PJ : un cran au-dessus ; 6 PJ ou plus : un cran en dessous
+    return 1 if party_size < 3 else -1 if party_size >= 6 else 0
+
+
+def encounter_multiplier(monster_count, party_size):
+    if monster_count <= 0:
+        return 0
+    return MULTIPLIERS[max(0, min(len(MULTIPLIERS) - 1, bisect_right(COUNT_STEPS, monster_count) + party_shift(party_size)))]
+
+
+def difficulty_index(adjusted_xp, thresholds):
+    # 0 sous le seuil facile, 4 au-delà du seuil mortel
+    return bisect_right(thresholds, adjusted_xp)
+
+
+class EncounterDifficulty:
+    # Totaux tenus à jour à chaque ajout ou retrait : rien n'est recalculé en reparcourant la rencontre
+    def __init__(self, party_size=4, party_level=1):
+        self.total_xp = 0
+        self.monster_count = 0
+        self.set_party(party_size, party_level)
+
+    def set_party(self, party_size, party_level):
+        self.party_size = max(0, int(party_size))
+        self.party_level = max(1, min(20, int(party_level)))
+        self.thresholds = party_thresholds(self.party_size, self.party_level)
+
+    def add(self, xp, quantity=1):
+        self.total_xp += xp * quantity
+        self.monster_count += quantity
+
+    def remove(self, xp, quantity=1):
+        self.total_xp = max(0, self.total_xp - xp * quantity)
+        self.monster_count = max(0, self.monster_count - quantity)
+
+    def clear(self):
+        self.total_xp = 0
+        self.monster_count = 0
+
+    @property
+    def multiplier(self):
+        return encounter_multiplier(self.monster_count, self.party_size)
+
+    @property
+    def adjusted_xp(self):
+        return int(self.total_xp * self.multiplier)
+
+    @property
+    def difficulty(self):
+        return difficulty_index(self.adjusted_xp, self.thresholds) if self.monster_count else 0
+
+    @property
+    def label(self):
+        return DIFFICULTIES[self.difficulty]
+
+    def summary(self):
+        return {'total_xp': self.total_xp, 'monster_count': self.monster_count, 'multiplier': self.multiplier,
+                'adjusted_xp': self.adjusted_xp, 'difficulty': self.difficulty, 'label': self.label,
+                'thresholds': dict(zip(DIFFICULTIES[1:], self.thresholds))}
+
+
+def score_totals(total_xp, monster_counts, party_size, party_level):
+    # Version tableau de EncounterDifficulty : (XP ajustée, indice de difficulté) pour chaque rencontre
+    thresholds = party_thresholds(party_size, party_level)
+    if np is None:
+        adjusted = [int(xp * encounter_multiplier(count, party_size)) for xp, count in zip(total_xp, monster_counts)]
+        return adjusted, [difficulty_index(xp, thresholds) if count else 0 for xp, count in zip(adjusted, monster_counts)]
+    total_xp = np.asarray(total_xp, dtype=np.int64)
+    monster_counts = np.asarray(monster_counts, dtype=np.int64)
+    steps = np.clip(np.searchsorted(COUNT_STEPS, monster_counts, side='right') + party_shift(party_size), 0, len(MULTIPLIERS) - 1)
+    multipliers = np.where(monster_counts > 0, np.asarray(MULTIPLIERS)[steps], 0)
+    adjusted = (total_xp * multipliers).astype(np.int64)
+    difficulty = np.where(monster_counts > 0, np.searchsorted(thresholds, adjusted, side='right'), 0)
+    return adjusted, difficulty
+
+
+def score_encounters(quantities, xp, party_size, party_level):
+    # quantities : une ligne par rencontre candidate, une colonne par monstre ; xp : XP de chaque monstre
+    if np is None:
+        totals = [sum(q * x for q, x in zip(row, xp)) for row in quantities]
+        counts = [sum(row) for row in quantities]
+        return (totals, *score_totals(totals, counts, party_size, party_level))
+    quantities = np.asarray(quantities, dtype=np.int64)
+    totals = quantities @ np.asarray(xp, dtype=np.int64)
+    return (totals, *score_totals(totals, quantities.sum(axis=1), party_size, party_level))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Évalue la difficulté de rencontres tirées au hasard (banc d'essai du calcul vectorisé)")
+    parser.add_argument("--encounters", type=int, default=100000)
+    parser.add_argument("--monsters", type=int, default=20, help="Nombre de monstres différents possibles")
+    parser.add_argument("--party-size", type=int, default=4)
+    parser.add_argument("--party-level", type=int, default=5)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    xp = [rng.choice([10, 25, 50, 100, 200, 450, 700, 1100, 1800]) for _ in range(args.monsters)]
+    quantities = [[rng.choice([0, 0, 0, 1, 2]) for _ in range(args.monsters)] for _ in range(args.encounters)]
+    start = time.perf_counter()
+    totals, adjusted, difficulty = score_encounters(quantities, xp, args.party_size, args.party_level)
+    elapsed = time.perf_counter() - start
+    counts = [0] * len(DIFFICULTIES)
+    for index in difficulty:
+        counts[int(index)] += 1
+    print(f"{args.encounters} rencontres évaluées en {elapsed * 1000:.1f} ms ({'numpy' if np is not None else 'Python pur'})")
+    for label, count in zip(DIFFICULTIES, counts):
+        print(f"  {label} : {count}")
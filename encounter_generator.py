@@ -0,0 +1,140 @@
+import argparse
+import random
+import time
+from types import SimpleNamespace
+import monster_utils
+from monster_repository import get_repository
+from encounter_difficulty import DIFFICULTIES, EncounterDifficulty, encounter_multiplier, party_thresholds
+
+# Au-delà du seuil mortel, la bande cible s'arrête à 1,5 fois ce seuil
+DEADLY_CEILING = 1.5
+
+
+def target_band(party_size, party_level, difficulty):
+    # Bande d'XP ajustée visée : du seuil demandé jusqu'au seuil suivant (exclu)
+    thresholds = party_thresholds(party_size, party_level)
+    low = thresholds[difficulty - 1]
+    high = thresholds[difficulty] - 1 if difficulty < len(thresholds) else int(thresholds[-1] * DEADLY_CEILING)
+    return low, high
+
+
+def filter_monsters(monsters, types=(), sizes=(), cr_min=None, cr_max=None):
+    types, sizes = set(types), set(sizes)
+    return [monster for monster in monsters if monster.xp > 0
+            and (not types or monster_utils.base_type(monster.type) in types)
+            and (not sizes or monster.size in sizes)
+            and (cr_min is None or monster.cr >= cr_min)
+            and (cr_max is None or monster.cr <= cr_max)]
+
+
+def bucket_compositions(bucket_xp, low, high, party_size, max_distinct, max_count, limit):
+    # Séparation et évaluation sur les paliers d'XP (un palier par FP) : pour un effectif total n le multiplicateur
+    # est fixe, la bande d'XP brute aussi ; on coupe toute branche qui ne peut plus y entrer. limit vaut pour chaque
+    # effectif : les petits groupes n'épuisent pas le budget avant que les grands soient explorés
+    compositions = []
+    for count in range(1, max_count + 1):
+        multiplier = encounter_multiplier(count, party_size)
+        raw_low, raw_high = low / multiplier, high / multiplier
+        found = []
+
+        def explore(start, remaining, xp, picks):
+            if len(found) >= limit:
+                return
+            if remaining == 0:
+                if raw_low <= xp <= raw_high:
+                    found.append((count, tuple(picks)))
+                return
+            if len(picks) >= max_distinct:
+                return
+            for i in range(start, len(bucket_xp)):
+                # Paliers triés par XP décroissante : bucket_xp[i] est le plus fort encore possible, le dernier le plus faible
+                if xp + remaining * bucket_xp[i] < raw_low:
+                    return
+                if xp + bucket_xp[i] + (remaining - 1) * bucket_xp[-1] > raw_high:
+                    continue
+                for quantity in range(remaining, 0, -1):
+                    if xp + quantity * bucket_xp[i] > raw_high:
+                        continue
+                    picks.append((i, quantity))
+                    explore(i + 1, remaining - quantity, xp + quantity * bucket_xp[i], picks)
+                    picks.pop()
+
+        explore(0, count, 0, [])
+        compositions.extend(found)
+    return compositions
+
+
+def generate_encounters(monsters, party_size, party_level, difficulty=2, types=(), sizes=(), cr_min=None, cr_max=None,
+                        max_distinct=3, max_count=8, suggestions=10, seed=None, candidates=2000):
+    # difficulty : indice dans DIFFICULTIES (1 facile ... 4 mortelle)
+    rng = random.Random(seed)
+    pool = filter_monsters(monsters, types, sizes, cr_min, cr_max)
+    if not pool or party_size < 1:
+        return []
+    buckets = {}
+    for monster in pool:
+        buckets.setdefault(monster.xp, []).append(monster)
+    bucket_xp = sorted(buckets, reverse=True)
+    low, high = target_band(party_size, party_level, difficulty)
+    target = (low + high) / 2
+    compositions = bucket_compositions(bucket_xp, low, high, party_size, max_distinct, max_count, candidates)
+
+    scored = []
+    for count, picks in compositions:
+        raw_xp = sum(bucket_xp[i] * quantity for i, quantity in picks)
+        adjusted = int(raw_xp * encounter_multiplier(count, party_size))
+        # Au plus près du centre de la bande, puis un léger bonus aux rencontres variées
+        scored.append((abs(adjusted - target) / target - 0.02 * len(picks) + rng.random() * 0.05, picks))
+    scored.sort(key=lambda item: item[0])
+
+    # Diversité : chaque suggestion évite les paliers déjà très présents et les monstres déjà proposés
+    results, used_shapes, used_monsters = [], set(), {}
+    for score, picks in scored:
+        shape = tuple(i for i, _ in picks)
+        if shape in used_shapes:
+            continue
+        used_shapes.add(shape)
+        encounter = []
+        for i, quantity in picks:
+            choices = buckets[bucket_xp[i]]
+            fresh = [monster for monster in choices if monster.name not in used_monsters]
+            monster = rng.choice(fresh or choices)
+            used_monsters[monster.name] = used_monsters.get(monster.name, 0) + 1
+            encounter.append((monster, quantity))
+        engine = EncounterDifficulty(party_size, party_level)
+        for monster, quantity in encounter:
+            engine.add(monster.xp, quantity)
+        results.append(dict(engine.summary(), encounter=encounter))
+        if len(results) >= suggestions:
+            break
+    return results
+
+
+def describe(suggestion):
+    monsters = ", ".join(f"{quantity}x {monster.name}" for monster, quantity in suggestion['encounter'])
+    return f"{suggestion['label']} - {suggestion['adjusted_xp']} XP ajustée : {monsters}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Propose des rencontres qui tombent dans la bande de difficulté visée")
+    parser.add_argument("--party-size", type=int, default=4)
+    parser.add_argument("--party-level", type=int, default=3)
+    parser.add_argument("--difficulty", choices=DIFFICULTIES[1:], default="Moyenne")
+    parser.add_argument("--type", action="append", default=[], help="Type de base (répétable)")
+    parser.add_argument("--size", action="append", default=[], help="Taille (répétable)")
+    parser.add_argument("--cr-min", type=float, default=None)
+    parser.add_argument("--cr-max", type=float, default=None)
+    parser.add_argument("--max-distinct", type=int, default=3)
+    parser.add_argument("--max-count", type=int, default=8)
+    parser.add_argument("--suggestions", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--db", default="monsters.db")
+    args = parser.parse_args()
+    monsters = [SimpleNamespace(**dict(row)) for row in get_repository(args.db).list_summaries()]
+    start = time.perf_counter()
+    results = generate_encounters(monsters, args.party_size, args.party_level, DIFFICULTIES.index(args.difficulty),
+                                  args.type, args.size, args.cr_min, args.cr_max, args.max_distinct, args.max_count,
+                                  args.suggestions, args.seed)
+    print(f"{len(results)} suggestions en {(time.perf_counter() - start) * 1000:.1f} ms")
+    for suggestion in results:
+        print(f"  {describe(suggestion)}")
@@ -0,0 +1,212 @@
+import email.utils
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+DEFAULT_TIMEOUT = (5, 15)
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "dnd_monsters", "http_cache")
+CACHE_MAX_BYTES = 100 * 1024 * 1024
+# Fraîcheur heuristique (RFC 9111 §4.2.2) : 10 % de l'âge du document, au plus un jour
+HEURISTIC_FRACTION = 0.1
+HEURISTIC_MAX = 24 * 3600
+STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control', 'Expires', 'Date')
+
+
+class HttpResponse:
+    def __init__(self, url, status_code, content, headers, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = requests.structures.CaseInsensitiveDict(headers)
+        self.from_cache = from_cache
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+def parse_http_date(value):
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def cache_directives(headers):
+    directives = {}
+    for part in headers.get('Cache-Control', '').split(','):
+        key, _, value = part.strip().partition('=')
+        if key:
+            directives[key.lower()] = value.strip('"')
+    return directives
+
+
+def freshness_lifetime(headers):
+    directives = cache_directives(headers)
+    if 'no-cache' in directives:
+        return 0
+    if re.fullmatch(r"\d+", directives.get('max-age', '')):
+        return int(directives['max-age'])
+    date = parse_http_date(headers.get('Date')) or time.time()
+    expires = parse_http_date(headers.get('Expires'))
+    if expires is not None:
+        return max(0, expires - date)
+    last_modified = parse_http_date(headers.get('Last-Modified'))
+    if last_modified is not None:
+        return min(HEURISTIC_MAX, max(0, (date - last_modified) * HEURISTIC_FRACTION))
+    return 0
+
+
+class HttpClient:
+    def __init__(self, cache_dir=CACHE_DIR, pool_size=10, retries=3, backoff=0.5, timeout=DEFAULT_TIMEOUT, max_cache_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.max_cache_bytes = max_cache_bytes
+        self.local = threading.local()
+        self.evict_lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=[429, 500, 502, 503, 504],
+                      allowed_methods=['GET', 'HEAD'], respect_retry_after_header=True, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': USER_AGENT, 'Accept-Encoding': 'gzip, deflate'})
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def connection(self):
+        # Même index que le cache d'images : taille et dernier accès de chaque entrée, pour évincer la moins récemment lue
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.cache_dir, "index.db"), timeout=10)
+            conn.execute('''CREATE TABLE IF NOT EXISTS entries
+                            (key TEXT PRIMARY KEY, url TEXT, size INTEGER, last_access REAL)''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)")
+            self.local.conn = conn
+        return conn
+
+    def cache_key(self, url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def cache_paths(self, url):
+        key = self.cache_key(url)
+        return os.path.join(self.cache_dir, f"{key}.json"), os.path.join(self.cache_dir, f"{key}.body")
+
+    def entry_size(self, url):
+        return sum(os.path.getsize(path) for path in self.cache_paths(url) if os.path.exists(path))
+
+    def load_entry(self, url):
+        meta_path, body_path = self.cache_paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        conn = self.connection()
+        with conn:
+            # Entrée écrite avant l'index : on l'y ajoute à la première lecture
+            if conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), self.cache_key(url))).rowcount == 0:
+                conn.execute("INSERT INTO entries (key, url, size, last_access) VALUES (?, ?, ?, ?)",
+                             (self.cache_key(url), url, self.entry_size(url), time.time()))
+        return meta, body
+
+    def write_atomic(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def store_entry(self, url, headers, content=None):
+        meta_path, body_path = self.cache_paths(url)
+        meta = {'url': url, 'stored_at': time.time(), 'headers': {k: headers[k] for k in STORED_HEADERS if k in headers}}
+        if content is not None:
+            self.write_atomic(body_path, content)
+        self.write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+        conn = self.connection()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO entries (key, url, size, last_access) VALUES (?, ?, ?, ?)",
+                         (self.cache_key(url), url, self.entry_size(url), time.time()))
+        self.evict()
+        return meta
+
+    def cache_size(self):
+        return self.connection().execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def evict(self):
+        with self.evict_lock:
+            conn = self.connection()
+            total = self.cache_size()
+            if total <= self.max_cache_bytes:
+                return
+            for key, url, size in conn.execute("SELECT key, url, size FROM entries ORDER BY last_access").fetchall():
+                for path in self.cache_paths(url):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                with conn:
+                    conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= size
+                if total <= self.max_cache_bytes:
+                    break
+
+    def get(self, url, headers=None, use_cache=True, timeout=None):
+        timeout = timeout or self.timeout
+        if not use_cache:
+            response = self.session.get(url, headers=headers, timeout=timeout)
+            return HttpResponse(url, response.status_code, response.content, response.headers)
+
+        entry = self.load_entry(url)
+        request_headers = dict(headers or {})
+        if entry is not None:
+            meta, body = entry
+            if time.time() - meta['stored_at'] < freshness_lifetime(meta['headers']):
+                return HttpResponse(url, 200, body, meta['headers'], from_cache=True)
+            if meta['headers'].get('ETag'):
+                request_headers['If-None-Match'] = meta['headers']['ETag']
+            if meta['headers'].get('Last-Modified'):
+                request_headers['If-Modified-Since'] = meta['headers']['Last-Modified']
+
+        response = self.session.get(url, headers=request_headers, timeout=timeout)
+        if response.status_code == 304 and entry is not None:
+            merged = dict(entry[0]['headers'])
+            merged.update({k: response.headers[k] for k in STORED_HEADERS if k in response.headers})
+            meta = self.store_entry(url, merged)
+            return HttpResponse(url, 200, entry[1], meta['headers'], from_cache=True)
+        if response.status_code == 200 and 'no-store' not in cache_directives(response.headers):
+            try:
+                self.store_entry(url, response.headers, response.content)
+            except OSError as e:
+                print(f"Impossible de mettre en cache {url}: {e}")
+        return HttpResponse(url, response.status_code, response.content, response.headers)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def get(url, headers=None, use_cache=True, timeout=None):
+    return get_client().get(url, headers=headers, use_cache=use_cache, timeout=timeout)
@@ -0,0 +1,118 @@
+import glob
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import http_client
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "dnd_monsters", "images")
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp'}
+
+
+class ImageCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, client=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.client = client or http_client.get_client()
+        self.local = threading.local()
+        self.evict_lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.cache_dir, "index.db"), timeout=10)
+            conn.execute('''CREATE TABLE IF NOT EXISTS images
+                            (key TEXT PRIMARY KEY, url TEXT, filename TEXT, size INTEGER, last_access REAL)''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_images_last_access ON images(last_access)")
+            self.local.conn = conn
+        return conn
+
+    def key_for(self, url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def path_for(self, url):
+        extension = os.path.splitext(urlsplit(url).path)[1].lower()
+        if extension not in IMAGE_EXTENSIONS:
+            extension = '.img'
+        return os.path.join(self.cache_dir, f"{self.key_for(url)}{extension}")
+
+    def entry_files(self, key):
+        # Les fichiers temporaires (écriture en cours, miniature en cours) ne font pas encore partie de l'entrée
+        return [path for path in glob.glob(os.path.join(self.cache_dir, f"{key}*")) if not path.endswith('.tmp')]
+
+    def entry_size(self, key):
+        return sum(os.path.getsize(path) for path in self.entry_files(key))
+
+    def get(self, url):
+        key = self.key_for(url)
+        path = self.path_for(url)
+        conn = self.connection()
+        if os.path.exists(path):
+            with conn:
+                if conn.execute("UPDATE images SET last_access = ? WHERE key = ?", (time.time(), key)).rowcount == 0:
+                    conn.execute("INSERT INTO images (key, url, filename, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                                 (key, url, os.path.basename(path), self.entry_size(key), time.time()))
+            return path
+
+        response = self.client.get(url, use_cache=False)
+        response.raise_for_status()
+        # Écriture atomique : un lecteur ne voit jamais un fichier partiel
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(response.content)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO images (key, url, filename, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                         (key, url, os.path.basename(path), len(response.content), time.time()))
+        self.evict()
+        return path
+
+    def refresh_size(self, url):
+        # Les fichiers dérivés (miniatures) partagent la clé et comptent dans le budget
+        key = self.key_for(url)
+        conn = self.connection()
+        with conn:
+            conn.execute("UPDATE images SET size = ?, last_access = ? WHERE key = ?", (self.entry_size(key), time.time(), key))
+        self.evict()
+
+    def total_size(self):
+        return self.connection().execute("SELECT COALESCE(SUM(size), 0) FROM images").fetchone()[0]
+
+    def evict(self):
+        with self.evict_lock:
+            conn = self.connection()
+            total = self.total_size()
+            if total <= self.max_bytes:
+                return
+            for key, size in conn.execute("SELECT key, size FROM images ORDER BY last_access").fetchall():
+                for path in self.entry_files(key):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                with conn:
+                    conn.execute("DELETE FROM images WHERE key = ?", (key,))
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def prefetch(self, urls, max_workers=4):
+        def fetch(url):
+            try:
+                return url, self.get(url)
+            except Exception as e:
+                print(f"Erreur lors du téléchargement de l'image {url}: {e}")
+                return url, None
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return dict(executor.map(fetch, dict.fromkeys(urls)))
@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class LRUCache:
+    def __init__(self, maxsize=256, max_age=None):
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self.data = OrderedDict()
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key):
+        entry = self.data.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            if self.max_age is None or time.monotonic() - stored_at <= self.max_age:
+                self.data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self.data[key]
+            self.evictions += 1
+        self.misses += 1
+        return _MISSING
+
+    def get(self, key, default=None):
+        with self.lock:
+            value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def put(self, key, value):
+        with self.lock:
+            self.data[key] = (value, time.monotonic())
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader, cacheable=None):
+        # Un seul chargement par clé : les appels concurrents attendent le premier
+        with self.lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                return value
+            flight = self.in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.in_flight[key] = _Flight()
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = loader()
+            if cacheable is None or cacheable(flight.value):
+                self.put(key, flight.value)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            flight.event.set()
+
+    def pop(self, key, default=None):
+        with self.lock:
+            entry = self.data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def stats(self):
+        with self.lock:
+            return {'size': len(self.data), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def __len__(self):
+        return len(self.data)
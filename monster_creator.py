@@ -1,10 +1,13 @@
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, messagebox, scrolledtext
 from ttkthemes import ThemedTk
-import sqlite3
-from dataclasses import dataclass
-import re
-import unicodedata
+from dataclasses import dataclass, asdict
+import monster_utils
+from monster_repository import get_repository
+from monster_search import FuzzyIndex
+from virtual_list import VirtualList, ListProvider, RepositoryProvider
+from stat_block_store import StatBlockStore
 
 @dataclass
 class CustomMonster:
@@ -37,7 +40,13 @@ class MonsterCreatorApp:
         self.root.geometry("1200x800")
         self.root.configure(bg="#F5E8C7")
         self.db_path = "monsters.db"
+        self.repository = get_repository(self.db_path)
         self.selected_monster = None
+        self.monster_names = []
+        self.fuzzy_index = None
+        self.index_future = None
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.browse_provider = ListProvider([])
 
         self.colors = {
             "background": "#F5E8C7",
@@ -74,12 +83,18 @@ class MonsterCreatorApp:
 
         select_frame = ttk.Frame(header_frame, style="Section.TFrame")
         select_frame.pack(side=tk.LEFT, padx=20)
-        ttk.Label(select_frame, text="Sélectionner un Monstre :").pack(side=tk.LEFT, padx=5)
+        ttk.Label(select_frame, text="Sélectionner un Monstre :").grid(row=0, column=0, padx=5, sticky="e")
         self.monster_select_var = tk.StringVar()
-        self.monster_select = ttk.Combobox(select_frame, textvariable=self.monster_select_var, width=30)
-        self.monster_select.pack(side=tk.LEFT, padx=5)
+        self.monster_select = ttk.Entry(select_frame, textvariable=self.monster_select_var, width=30)
+        self.monster_select.grid(row=0, column=1, padx=5, sticky="ew")
+        # Sans saisie, la liste parcourt la base page par page ; avec saisie, elle montre les noms approchants
+        self.monster_list = VirtualList(select_frame, height=6, on_select=self.load_selected_monster, font=("Georgia", 11),
+                                        bg=self.colors["entry_bg"], fg=self.colors["text"], relief="flat")
+        self.monster_list.grid(row=1, column=1, padx=5, pady=(5, 0), sticky="ew")
         self.load_monster_list()
-        self.monster_select.bind("<<ComboboxSelected>>", self.load_selected_monster)
+        self.monster_select.bind("<KeyRelease>", self.filter_monster_choices)
+        self.monster_select.bind("<Return>", self.load_best_match)
+        self.monster_select.bind("<Down>", self.focus_monster_list)
 
         btn_frame = ttk.Frame(header_frame, style="Section.TFrame")
         btn_frame.pack(side=tk.RIGHT)
@@ -167,57 +182,98 @@ class MonsterCreatorApp:
 
     def load_monster_list(self):
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM monsters")
-            monsters = cursor.fetchall()
-            conn.close()
-            monster_names = [monster[0] for monster in monsters]
-            self.monster_select['values'] = monster_names
+            self.browse_provider = RepositoryProvider(self.repository)
+            self.build_fuzzy_index()
+            self.filter_monster_choices()
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors du chargement des monstres : {e}")
 
-    def load_selected_monster(self, event=None):
-        selected_name = self.monster_select_var.get()
+    def build_fuzzy_index(self):
+        # Noms et trigrammes lus hors du thread Tk (~0,6 s pour 50k noms) ; l'ancien index sert jusqu'à l'échange
+        def build():
+            names = self.repository.list_names()
+            return names, FuzzyIndex(names)
+        future = self.index_future = self.executor.submit(build)
+
+        def poll():
+            if future is not self.index_future:
+                return
+            if not future.done():
+                self.root.after(50, poll)
+                return
+            try:
+                self.monster_names, self.fuzzy_index = future.result()
+            except Exception as e:
+                print(f"Erreur lors de la construction de l'index des noms : {e}")
+                return
+            if self.monster_select_var.get().strip():
+                self.filter_monster_choices()
+        self.root.after(50, poll)
+
+    def filter_monster_choices(self, event=None):
+        # La liste ne propose plus que les noms proches de la saisie, accents et fautes tolérés
+        if event is not None and event.keysym in ("Return", "Up", "Down", "Escape"):
+            return
+        search_term = self.monster_select_var.get()
+        if not search_term.strip():
+            self.monster_list.set_provider(self.browse_provider, keep_selection=False)
+            return
+        if self.fuzzy_index is None:
+            # Premier index encore en construction : la liste complète reste affichée, filtrée dès qu'il arrive
+            self.monster_list.set_provider(self.browse_provider, keep_selection=False)
+            return
+        matches = [(self.monster_names[i],) for i in self.fuzzy_index.search(search_term, limit=30)]
+        self.monster_list.set_provider(ListProvider(matches, label=lambda row: row[0]), keep_selection=False)
+
+    def focus_monster_list(self, event=None):
+        self.monster_list.listbox.focus_set()
+        return self.monster_list.move(1)
+
+    def load_best_match(self, event=None):
+        if self.monster_list.selected_item() is None:
+            self.monster_list.select(0)
+        else:
+            self.load_selected_monster(self.monster_list.selected_item())
+
+    def load_selected_monster(self, row):
+        # row : (name, cr, normalized_name) en parcours de la base, (name,) parmi les noms approchants
+        selected_name = row[0] if row else None
         if not selected_name:
             return
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT name, size, type, cr, xp, ac, hp, speed, str_score, dex_score, con_score, int_score, wis_score, cha_score, skills, damage_resistances, senses, languages, traits, actions, legendary_actions FROM monsters WHERE name = ?", (selected_name,))
-            monster_data = cursor.fetchone()
-            conn.close()
+            monster_data = self.repository.get_by_name(selected_name)
             if monster_data:
                 self.selected_monster = selected_name
-                self.name_var.set(monster_data[0] or "")
-                self.size_var.set(monster_data[1] or "M")
-                self.type_var.set(monster_data[2] or "")
-                self.cr_var.set(monster_data[3] if monster_data[3] is not None else 1.0)
-                self.ac_var.set(monster_data[5] or "10")
-                self.hp_var.set(monster_data[6] or "10 (2d8 + 2)")
-                self.speed_var.set(monster_data[7] or "9 m")
-                self.score_vars["Force"].set(monster_data[8] if monster_data[8] is not None else 10)
-                self.score_vars["Dextérité"].set(monster_data[9] if monster_data[9] is not None else 10)
-                self.score_vars["Constitution"].set(monster_data[10] if monster_data[10] is not None else 10)
-                self.score_vars["Intelligence"].set(monster_data[11] if monster_data[11] is not None else 10)
-                self.score_vars["Sagesse"].set(monster_data[12] if monster_data[12] is not None else 10)
-                self.score_vars["Charisme"].set(monster_data[13] if monster_data[13] is not None else 10)
-                self.skills_var.set(monster_data[14] or "")
-                self.damage_resistances_var.set(monster_data[15] or "")
-                self.senses_var.set(monster_data[16] or "")
-                self.languages_var.set(monster_data[17] or "")
+                self.name_var.set(monster_data['name'] or "")
+                self.size_var.set(monster_data['size'] or "M")
+                self.type_var.set(monster_data['type'] or "")
+                self.cr_var.set(monster_data['cr'] if monster_data['cr'] is not None else 1.0)
+                self.ac_var.set(monster_data['ac'] or "10")
+                self.hp_var.set(monster_data['hp'] or "10 (2d8 + 2)")
+                self.speed_var.set(monster_data['speed'] or "9 m")
+                self.score_vars["Force"].set(monster_data['str_score'] if monster_data['str_score'] is not None else 10)
+                self.score_vars["Dextérité"].set(monster_data['dex_score'] if monster_data['dex_score'] is not None else 10)
+                self.score_vars["Constitution"].set(monster_data['con_score'] if monster_data['con_score'] is not None else 10)
+                self.score_vars["Intelligence"].set(monster_data['int_score'] if monster_data['int_score'] is not None else 10)
+                self.score_vars["Sagesse"].set(monster_data['wis_score'] if monster_data['wis_score'] is not None else 10)
+                self.score_vars["Charisme"].set(monster_data['cha_score'] if monster_data['cha_score'] is not None else 10)
+                self.skills_var.set(monster_data['skills'] or "")
+                self.damage_resistances_var.set(monster_data['damage_resistances'] or "")
+                self.senses_var.set(monster_data['senses'] or "")
+                self.languages_var.set(monster_data['languages'] or "")
                 self.traits_text.delete("1.0", tk.END)
-                self.traits_text.insert("1.0", monster_data[18] or "")
+                self.traits_text.insert("1.0", monster_data['traits'] or "")
                 self.actions_text.delete("1.0", tk.END)
-                self.actions_text.insert("1.0", monster_data[19] or "")
+                self.actions_text.insert("1.0", monster_data['actions'] or "")
                 self.legendary_text.delete("1.0", tk.END)
-                self.legendary_text.insert("1.0", monster_data[20] or "")
+                self.legendary_text.insert("1.0", monster_data['legendary_actions'] or "")
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors du chargement du monstre : {e}")
 
     def reset_fields(self):
         self.selected_monster = None
         self.monster_select_var.set("")
+        self.monster_list.set_provider(self.browse_provider, keep_selection=False)
         self.name_var.set("")
         self.size_var.set("M")
         self.type_var.set("")
@@ -248,24 +304,10 @@ class MonsterCreatorApp:
         ttk.Combobox(frame, textvariable=var, values=values, width=width).pack(side=side, padx=padx)
 
     def cr_to_xp(self, cr):
-        cr_xp_map = {
-            0: 10, 0.125: 25, 0.25: 50, 0.5: 100, 1: 200, 2: 450, 3: 700, 4: 1100,
-            5: 1800, 6: 2300, 7: 2900, 8: 3900, 9: 5000, 10: 5900, 11: 7200,
-            12: 8400, 13: 10000, 14: 11500, 15: 13000, 16: 15000, 17: 18000,
-            18: 20000, 19: 22000, 20: 25000, 21: 33000, 22: 41000, 23: 50000,
-            24: 62000, 25: 75000, 30: 155000
-        }
-        return cr_xp_map.get(cr, 0)
+        return monster_utils.cr_to_xp(cr)
 
     def normalize_name(self, name):
-        name = unicodedata.normalize('NFD', name).encode('ascii', 'ignore').decode('utf-8')
-        name = name.lower().strip()
-        name = re.sub(r'\s+', ' ', name)
-        replacements = {'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e', 'à': 'a', 'â': 'a', 'ä': 'a',
-                        'î': 'i', 'ï': 'i', 'ô': 'o', 'ö': 'o', 'û': 'u', 'ü': 'u', 'ç': 'c'}
-        for char, replacement in replacements.items():
-            name = name.replace(char, replacement)
-        return name
+        return monster_utils.normalize_name(name)
 
     def save_monster(self):
         name = self.name_var.get().strip()
@@ -296,63 +338,17 @@ class MonsterCreatorApp:
             legendary_actions=self.legendary_text.get("1.0", tk.END).strip()
         )
         normalized_name = self.normalize_name(name)
+        for warning in monster_utils.validate_monster(asdict(monster)):
+            print(f"Attention ({monster.name}) : {warning}")
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            # Vérifier si la table monsters existe et obtenir ses colonnes
-            cursor.execute("PRAGMA table_info(monsters)")
-            columns = {col[1] for col in cursor.fetchall()}
-
-            # Nouvelle structure sans le champ alignment
-            new_schema = {'normalized_name', 'name', 'size', 'type', 'cr', 'xp', 'ac', 'hp', 'speed',
-                          'str_score', 'dex_score', 'con_score', 'int_score', 'wis_score', 'cha_score',
-                          'skills', 'damage_resistances', 'senses', 'languages', 'traits', 'actions', 'legendary_actions'}
-
-            if columns:
-                # Si la table existe, vérifier si elle contient la colonne alignment
-                if 'alignment' in columns:
-                    # Créer une nouvelle table sans la colonne alignment
-                    cursor.execute('''CREATE TABLE monsters_new
-                                    (normalized_name TEXT PRIMARY KEY, name TEXT, size TEXT, type TEXT, cr REAL, xp INTEGER,
-                                     ac TEXT, hp TEXT, speed TEXT, str_score INTEGER, dex_score INTEGER, con_score INTEGER,
-                                     int_score INTEGER, wis_score INTEGER, cha_score INTEGER, skills TEXT, damage_resistances TEXT,
-                                     senses TEXT, languages TEXT, traits TEXT, actions TEXT, legendary_actions TEXT)''')
-                    
-                    # Copier les données existantes (sans la colonne alignment)
-                    cursor.execute('''INSERT INTO monsters_new
-                                    (normalized_name, name, size, type, cr, xp, ac, hp, speed, str_score, dex_score, con_score,
-                                     int_score, wis_score, cha_score, skills, damage_resistances, senses, languages, traits, actions, legendary_actions)
-                                    SELECT normalized_name, name, size, type, cr, xp, ac, hp, speed, str_score, dex_score, con_score,
-                                     int_score, wis_score, cha_score, skills, damage_resistances, senses, languages, traits, actions, legendary_actions
-                                    FROM monsters''')
-                    
-                    # Supprimer l'ancienne table et renommer la nouvelle
-                    cursor.execute("DROP TABLE monsters")
-                    cursor.execute("ALTER TABLE monsters_new RENAME TO monsters")
-            else:
-                # Si la table n'existe pas, créer la nouvelle structure sans alignment
-                cursor.execute('''CREATE TABLE monsters
-                                (normalized_name TEXT PRIMARY KEY, name TEXT, size TEXT, type TEXT, cr REAL, xp INTEGER,
-                                 ac TEXT, hp TEXT, speed TEXT, str_score INTEGER, dex_score INTEGER, con_score INTEGER,
-                                 int_score INTEGER, wis_score INTEGER, cha_score INTEGER, skills TEXT, damage_resistances TEXT,
-                                 senses TEXT, languages TEXT, traits TEXT, actions TEXT, legendary_actions TEXT)''')
-
-            # Insérer ou mettre à jour le monstre
-            cursor.execute('''INSERT OR REPLACE INTO monsters 
-                            (normalized_name, name, size, type, cr, xp, ac, hp, speed, str_score, dex_score, con_score,
-                             int_score, wis_score, cha_score, skills, damage_resistances, senses, languages, traits, actions, legendary_actions)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                           (normalized_name, monster.name, monster.size, monster.type, monster.cr, monster.xp,
-                            monster.ac, monster.hp, monster.speed, monster.str_score, monster.dex_score, monster.con_score,
-                            monster.int_score, monster.wis_score, monster.cha_score, monster.skills, monster.damage_resistances,
-                            monster.senses, monster.languages, monster.traits, monster.actions, monster.legendary_actions))
-            conn.commit()
-            conn.close()
+            with self.repository.transaction():
+                self.repository.upsert_many([dict(asdict(monster), normalized_name=normalized_name)])
+                # La fiche aidedd en cache ne doit plus masquer la version éditée
+                StatBlockStore(self.repository).delete(normalized_name)
             messagebox.showinfo("Succès", f"{monster.name} {'mis à jour' if self.selected_monster else 'enregistré'} avec succès.")
-            self.load_monster_list()
             self.selected_monster = None
             self.monster_select_var.set("")
+            self.load_monster_list()
             self.reset_fields()
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors de l'enregistrement : {e}")
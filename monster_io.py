@@ -0,0 +1,255 @@
+import argparse
+import csv
+import json
+import os
+import re
+import time
+import monster_utils
+from monster_repository import get_repository
+
+IMPORT_COLUMNS = ['name', 'size', 'type', 'cr', 'xp', 'ac', 'hp', 'speed', 'str_score', 'dex_score', 'con_score',
+                  'int_score', 'wis_score', 'cha_score', 'skills', 'damage_resistances', 'senses', 'languages',
+                  'traits', 'actions', 'legendary_actions']
+SCORE_COLUMNS = ['str_score', 'dex_score', 'con_score', 'int_score', 'wis_score', 'cha_score']
+FORMATS = {'.jsonl': 'jsonl', '.csv': 'csv', '.json': 'srd'}
+
+SRD_SIZES = {'Tiny': 'TP', 'Small': 'P', 'Medium': 'M', 'Large': 'G', 'Huge': 'TG', 'Gargantuan': 'Gig'}
+SRD_ABILITIES = {'strength': 'str_score', 'dexterity': 'dex_score', 'constitution': 'con_score',
+                 'intelligence': 'int_score', 'wisdom': 'wis_score', 'charisma': 'cha_score'}
+SRD_SPEEDS = {'walk': '', 'fly': 'vol', 'swim': 'nage', 'climb': 'escalade', 'burrow': 'creusement'}
+SRD_SENSES = {'darkvision': 'vision dans le noir', 'blindsight': 'vision aveugle', 'tremorsense': 'perception des vibrations',
+              'truesight': 'vision véritable', 'passive_perception': 'Perception passive'}
+SRD_SKILLS = {'Acrobatics': 'Acrobaties', 'Animal Handling': 'Dressage', 'Arcana': 'Arcanes', 'Athletics': 'Athlétisme',
+              'Deception': 'Tromperie', 'History': 'Histoire', 'Insight': 'Perspicacité', 'Intimidation': 'Intimidation',
+              'Investigation': 'Investigation', 'Medicine': 'Médecine', 'Nature': 'Nature', 'Perception': 'Perception',
+              'Performance': 'Représentation', 'Persuasion': 'Persuasion', 'Religion': 'Religion',
+              'Sleight of Hand': 'Escamotage', 'Stealth': 'Discrétion', 'Survival': 'Survie'}
+
+
+def detect_format(path, fmt=None):
+    fmt = fmt or FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt not in FORMATS.values():
+        raise ValueError(f"Format inconnu pour {path} (jsonl, csv ou srd)")
+    return fmt
+
+
+def iter_json_array(f, chunk_size=65536):
+    # Lit un tableau JSON objet par objet sans charger tout le fichier ; un tableau tronqué ou mal formé donne son
+    # erreur comme dernier élément, les objets déjà lus restent importés
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError("Le fichier SRD doit contenir un tableau JSON")
+    buffer = buffer[1:]
+    eof = False
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError as e:
+            if eof:
+                yield e
+                return
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def read_records(path, fmt):
+    # (numéro de ligne ou d'entrée, dictionnaire brut)
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        if fmt == 'jsonl':
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield number, json.loads(line)
+                    except ValueError as e:
+                        yield number, e
+        elif fmt == 'csv':
+            for number, row in enumerate(csv.DictReader(f), 2):
+                yield number, {key: value for key, value in row.items() if value not in (None, '')}
+        else:
+            for number, item in enumerate(iter_json_array(f), 1):
+                if isinstance(item, json.JSONDecodeError):
+                    yield number, item
+                    return
+                try:
+                    yield number, from_srd(item)
+                except (AttributeError, KeyError, TypeError, ValueError) as e:
+                    yield number, e
+
+
+def join_entries(entries):
+    return '\n'.join(f"{entry['name']}. {entry.get('desc', '')}".strip() for entry in entries or [])
+
+
+def feet_to_meters(value):
+    match = re.match(r"(\d+)", str(value))
+    return f"{int(match.group(1)) * 3 // 10} m" if match else str(value)
+
+
+def from_srd(item):
+    armor_class = item.get('armor_class')
+    if isinstance(armor_class, list):
+        armor_class = armor_class[0].get('value') if armor_class else None
+    hp = item.get('hit_points')
+    hp_roll = item.get('hit_points_roll') or item.get('hit_dice')
+    speeds = item.get('speed') or {}
+    speed = ', '.join(f"{SRD_SPEEDS.get(kind, kind)} {feet_to_meters(value)}".strip() for kind, value in speeds.items() if kind in SRD_SPEEDS)
+    skills = [f"{SRD_SKILLS.get(p['proficiency']['name'][7:], p['proficiency']['name'][7:])} {p['value']:+d}"
+              for p in item.get('proficiencies', []) if p.get('proficiency', {}).get('name', '').startswith('Skill: ')]
+    senses = [f"{SRD_SENSES.get(kind, kind)} {value if kind == 'passive_perception' else feet_to_meters(value)}"
+              for kind, value in (item.get('senses') or {}).items()]
+    record = {
+        'name': item.get('name'),
+        'size': SRD_SIZES.get(item.get('size'), item.get('size')),
+        'type': item.get('type'),
+        'cr': item.get('challenge_rating'),
+        'ac': armor_class,
+        'hp': f"{hp} ({hp_roll})" if hp is not None and hp_roll else hp,
+        'speed': speed,
+        'skills': ', '.join(skills),
+        'damage_resistances': ', '.join(item.get('damage_resistances') or []),
+        'senses': ', '.join(senses),
+        'languages': item.get('languages'),
+        'traits': join_entries(item.get('special_abilities')),
+        'actions': join_entries(item.get('actions')),
+        'legendary_actions': join_entries(item.get('legendary_actions')),
+    }
+    record.update({column: item[ability] for ability, column in SRD_ABILITIES.items() if ability in item})
+    return {key: value for key, value in record.items() if value not in (None, '')}
+
+
+def to_monster_row(record):
+    # Même calcul que l'application : normalized_name depuis le nom, xp depuis le FP
+    if isinstance(record, Exception):
+        raise ValueError(f"entrée invalide : {record}")
+    if not isinstance(record, dict):
+        raise ValueError(f"objet JSON attendu, pas {type(record).__name__}")
+    name = str(record.get('name') or '').strip()
+    if not name:
+        raise ValueError("nom manquant")
+    if record.get('hp') in (None, ''):
+        raise ValueError("points de vie manquants")
+    cr = monster_utils.parse_cr(record.get('cr', 0))
+    row = {column: None for column in IMPORT_COLUMNS}
+    for column in IMPORT_COLUMNS:
+        value = record.get(column)
+        if value not in (None, ''):
+            row[column] = value.strip() if isinstance(value, str) else value
+    for column in SCORE_COLUMNS:
+        if row[column] is not None:
+            row[column] = int(row[column])
+    row.update(normalized_name=monster_utils.normalize_name(name), name=name, cr=cr, xp=monster_utils.cr_to_xp(cr),
+               ac=None if row['ac'] is None else str(row['ac']), hp=str(row['hp']), size=row['size'] or 'M',
+               type=row['type'] or 'Créature')
+    return row
+
+
+def import_monsters(path, fmt=None, repository=None, chunk_size=500):
+    repository = repository or get_repository()
+    fmt = detect_format(path, fmt)
+    report = {'imported': 0, 'errors': []}
+    chunk = []
+
+    def flush():
+        try:
+            report['imported'] += repository.upsert_many(row for _, row in chunk)
+        except Exception:
+            # Lot refusé : on rejoue ligne par ligne pour isoler la fautive
+            for number, row in chunk:
+                try:
+                    report['imported'] += repository.upsert_many([row])
+                except Exception as e:
+                    report['errors'].append((number, str(e)))
+        chunk.clear()
+
+    for number, record in read_records(path, fmt):
+        try:
+            chunk.append((number, to_monster_row(record)))
+        except (ValueError, TypeError, KeyError) as e:
+            report['errors'].append((number, str(e)))
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return report
+
+
+def to_srd(row):
+    def entries(text):
+        result = []
+        for line in (text or '').split('\n'):
+            if line.strip():
+                name, _, desc = line.partition('.')
+                result.append({'name': name.strip(), 'desc': desc.strip()})
+        return result
+    sizes = {code: size for size, code in SRD_SIZES.items()}
+    hp_match = re.match(r"(\d+)\s*(?:\((.*)\))?", row['hp'] or '')
+    ac_match = re.match(r"(\d+)", row['ac'] or '')
+    item = {
+        'name': row['name'],
+        'size': sizes.get(row['size'], row['size']),
+        'type': row['type'],
+        'armor_class': [{'type': 'natural', 'value': int(ac_match.group(1))}] if ac_match else [],
+        'hit_points': int(hp_match.group(1)) if hp_match else None,
+        'hit_points_roll': hp_match.group(2) if hp_match and hp_match.group(2) else None,
+        'damage_resistances': [part.strip() for part in (row['damage_resistances'] or '').split(',') if part.strip()],
+        'languages': row['languages'] or '',
+        'challenge_rating': row['cr'],
+        'xp': row['xp'],
+        'special_abilities': entries(row['traits']),
+        'actions': entries(row['actions']),
+        'legendary_actions': entries(row['legendary_actions']),
+    }
+    item.update({ability: row[column] for ability, column in SRD_ABILITIES.items() if row[column] is not None})
+    return item
+
+
+def export_monsters(path, fmt=None, repository=None):
+    repository = repository or get_repository()
+    fmt = detect_format(path, fmt)
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            writer = csv.DictWriter(f, fieldnames=IMPORT_COLUMNS, extrasaction='ignore')
+            writer.writeheader()
+        elif fmt == 'srd':
+            f.write('[')
+        for row in repository.iter_monsters():
+            row = dict(row)
+            if fmt == 'jsonl':
+                f.write(json.dumps({column: row[column] for column in IMPORT_COLUMNS}, ensure_ascii=False) + '\n')
+            elif fmt == 'csv':
+                writer.writerow(row)
+            else:
+                f.write((',\n' if count else '\n') + json.dumps(to_srd(row), ensure_ascii=False))
+            count += 1
+        if fmt == 'srd':
+            f.write('\n]\n')
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importe ou exporte des monstres (JSONL, CSV, JSON SRD 5e)")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=sorted(set(FORMATS.values())), default=None, help="Déduit de l'extension par défaut")
+    parser.add_argument("--db", default="monsters.db")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+    repository = get_repository(args.db)
+    start = time.perf_counter()
+    if args.command == "import":
+        report = import_monsters(args.path, args.format, repository, args.chunk_size)
+        for number, error in report['errors']:
+            print(f"Ligne {number} ignorée : {error}")
+        print(f"{report['imported']} monstres importés, {len(report['errors'])} erreurs en {time.perf_counter() - start:.2f} s")
+    else:
+        count = export_monsters(args.path, args.format, repository)
+        print(f"{count} monstres exportés vers {args.path} en {time.perf_counter() - start:.2f} s")
@@ -0,0 +1,518 @@
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from monster_utils import DERIVED_SCHEMA, derived_columns, fold
+from attack_parser import ATTACK_FIELDS, parse_attacks
+
+MONSTER_SCHEMA = [('normalized_name', 'TEXT PRIMARY KEY'), ('name', 'TEXT'), ('cr', 'REAL'), ('type', 'TEXT'), ('size', 'TEXT'),
+                  ('xp', 'INTEGER'), ('ac', 'TEXT'), ('hp', 'TEXT'), ('speed', 'TEXT'), ('str_score', 'INTEGER'),
+                  ('dex_score', 'INTEGER'), ('con_score', 'INTEGER'), ('int_score', 'INTEGER'), ('wis_score', 'INTEGER'),
+                  ('cha_score', 'INTEGER'), ('skills', 'TEXT'), ('damage_resistances', 'TEXT'), ('senses', 'TEXT'),
+                  ('languages', 'TEXT'), ('traits', 'TEXT'), ('actions', 'TEXT'), ('legendary_actions', 'TEXT')]
+MONSTER_COLUMNS = [column for column, _ in MONSTER_SCHEMA + DERIVED_SCHEMA]
+SOURCE_COLUMNS = ['hp', 'ac', 'speed', 'str_score', 'dex_score', 'con_score', 'int_score', 'wis_score', 'cha_score']
+SUMMARY_COLUMNS = ['normalized_name', 'name', 'cr', 'type', 'size', 'xp']
+# Attaques extraites du texte des actions (attack_parser), une ligne par attaque dans l'ordre de la fiche
+ATTACK_SCHEMA = [('normalized_name', 'TEXT'), ('position', 'INTEGER'), ('source', 'TEXT'), ('name', 'TEXT'), ('kind', 'TEXT'),
+                 ('to_hit', 'INTEGER'), ('reach', 'TEXT'), ('range', 'TEXT'), ('damage_dice', 'TEXT'), ('damage_average', 'INTEGER'),
+                 ('damage_type', 'TEXT'), ('save_dc', 'INTEGER'), ('save_ability', 'TEXT')]
+ATTACK_COLUMNS = [column for column, _ in ATTACK_SCHEMA]
+ATTACK_SOURCE_COLUMNS = ['actions', 'legendary_actions']
+# Clé de pagination : les FP NULL (créatures saisies sans FP) passent avant FP 0
+NULL_CR = -1
+PAGE_KEY = f"name, COALESCE(cr, {NULL_CR}), normalized_name"
+INSERT_ATTACK = f"INSERT INTO monster_attacks ({', '.join(ATTACK_COLUMNS)}) VALUES ({', '.join(f':{column}' for column in ATTACK_COLUMNS)})"
+
+PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 67108864",
+]
+
+SCHEMA = [
+    f"CREATE TABLE IF NOT EXISTS monsters ({', '.join(f'{column} {definition}' for column, definition in MONSTER_SCHEMA)})",
+    # Etat de la synchronisation (ETag, Last-Modified, empreinte de la liste)
+    "CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)",
+    # Monstres provenant de la liste aidedd ; removed_at marque ceux retirés en amont
+    '''CREATE TABLE IF NOT EXISTS listing_entries
+       (normalized_name TEXT PRIMARY KEY, row_hash TEXT, removed_at REAL)''',
+    '''CREATE TABLE IF NOT EXISTS crawl_state
+       (normalized_name TEXT PRIMARY KEY, status TEXT, url TEXT, image_url TEXT,
+        attempts INTEGER DEFAULT 0, last_error TEXT, fetched_at REAL)''',
+    '''CREATE TABLE IF NOT EXISTS stat_blocks
+       (normalized_name TEXT PRIMARY KEY, data BLOB, fetched_at REAL, source_hash TEXT)''',
+]
+
+
+def table_columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def create_base_tables(conn):
+    for statement in SCHEMA:
+        conn.execute(statement)
+
+
+def drop_alignment_column(conn):
+    # Anciennes bases du créateur de monstres
+    if 'alignment' in table_columns(conn, 'monsters'):
+        conn.execute("ALTER TABLE monsters DROP COLUMN alignment")
+
+
+def add_missing_monster_columns(conn):
+    # Les deux outils créaient la table avec des colonnes dans un ordre différent ; seules les colonnes absentes comptent
+    existing = table_columns(conn, 'monsters')
+    for column, definition in MONSTER_SCHEMA[1:]:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE monsters ADD COLUMN {column} {definition}")
+
+
+def create_monster_indexes(conn):
+    # (name, cr) sert la recherche par nom et la pagination ; les filtres CR/type/taille ont chacun leur index
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_monsters_name_cr ON monsters(name, cr)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_monsters_cr ON monsters(cr)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_monsters_type_cr ON monsters(type, cr)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_monsters_size_cr ON monsters(size, cr)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_monsters_type_size_cr ON monsters(type, size, cr)")
+    # Index partiel : seules les fiches encore à récupérer par le crawler
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_monsters_pending ON monsters(normalized_name) WHERE hp IS NULL")
+    conn.execute("ANALYZE")
+
+
+FULLTEXT_COLUMNS = ['name', 'type', 'damage_resistances', 'traits', 'actions', 'legendary_actions']
+FULLTEXT_VALUES = ', '.join(f'new.{column}' for column in ['rowid', 'normalized_name'] + FULLTEXT_COLUMNS)
+
+
+def create_fulltext_index(conn):
+    # remove_diacritics 2 replie les accents comme normalize_name ("Élémentaire" -> "elementaire")
+    try:
+        conn.execute(f'''CREATE VIRTUAL TABLE IF NOT EXISTS monsters_fts
+                        USING fts5(normalized_name UNINDEXED, {', '.join(FULLTEXT_COLUMNS)},
+                                  tokenize="unicode61 remove_diacritics 2", prefix='2 3 4')''')
+    except sqlite3.OperationalError as e:
+        print(f"FTS5 indisponible, recherche plein texte désactivée : {e}")
+        return
+    columns = ', '.join(['rowid', 'normalized_name'] + FULLTEXT_COLUMNS)
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS monsters_fts_insert AFTER INSERT ON monsters BEGIN
+                        INSERT INTO monsters_fts ({columns}) VALUES ({FULLTEXT_VALUES});
+                    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS monsters_fts_delete AFTER DELETE ON monsters BEGIN
+                        DELETE FROM monsters_fts WHERE rowid = old.rowid;
+                    END''')
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS monsters_fts_update
+                    AFTER UPDATE OF normalized_name, {', '.join(FULLTEXT_COLUMNS)} ON monsters BEGIN
+                        DELETE FROM monsters_fts WHERE rowid = old.rowid;
+                        INSERT INTO monsters_fts ({columns}) VALUES ({FULLTEXT_VALUES});
+                    END''')
+    rebuild_fulltext_index(conn)
+
+
+def rebuild_fulltext_index(conn):
+    # Les rowid de monsters peuvent changer après un VACUUM : reconstruire l'index dans ce cas
+    columns = ', '.join(['rowid', 'normalized_name'] + FULLTEXT_COLUMNS)
+    conn.execute("DELETE FROM monsters_fts")
+    conn.execute(f"INSERT INTO monsters_fts ({columns}) SELECT {columns} FROM monsters")
+
+
+def add_derived_columns(conn):
+    existing = table_columns(conn, 'monsters')
+    for column, definition in DERIVED_SCHEMA:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE monsters ADD COLUMN {column} {definition}")
+    backfill_derived_columns(conn)
+
+
+def backfill_derived_columns(conn, chunk_size=1000):
+    last, count = '', 0
+    while True:
+        rows = conn.execute(f"SELECT normalized_name, {', '.join(SOURCE_COLUMNS)} FROM monsters WHERE normalized_name > ? ORDER BY normalized_name LIMIT ?",
+                            (last, chunk_size)).fetchall()
+        if not rows:
+            return count
+        updates = [dict(derived_columns(dict(zip(SOURCE_COLUMNS, row[1:]))), normalized_name=row[0]) for row in rows]
+        conn.executemany(f"UPDATE monsters SET {', '.join(f'{column} = :{column}' for column, _ in DERIVED_SCHEMA)} WHERE normalized_name = :normalized_name", updates)
+        count += len(rows)
+        last = rows[-1][0]
+
+
+def create_attack_table(conn):
+    conn.execute(f'''CREATE TABLE IF NOT EXISTS monster_attacks
+                     ({', '.join(f'{column} {definition}' for column, definition in ATTACK_SCHEMA)},
+                      PRIMARY KEY (normalized_name, position)) WITHOUT ROWID''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS monster_attacks_delete AFTER DELETE ON monsters BEGIN
+                        DELETE FROM monster_attacks WHERE normalized_name = old.normalized_name;
+                    END''')
+    refresh_all_attacks(conn)
+
+
+def refresh_attacks(conn, normalized_names):
+    # Relu depuis la ligne enregistrée : une mise à jour partielle (actions seules) reste cohérente
+    # Sans texte d'actions en base, les attaques éventuelles viennent de la fiche lue à la demande (replace_attacks) : on les garde
+    rows, refreshed = [], []
+    for normalized_name in normalized_names:
+        row = conn.execute(f"SELECT {', '.join(ATTACK_SOURCE_COLUMNS)} FROM monsters WHERE normalized_name = ?", (normalized_name,)).fetchone()
+        if row and all(value is None for value in row):
+            continue
+        attacks = parse_attacks(dict(zip(ATTACK_SOURCE_COLUMNS, row))) if row else []
+        rows.extend(dict(attack, normalized_name=normalized_name, position=position) for position, attack in enumerate(attacks))
+        refreshed.append((normalized_name,))
+    conn.executemany("DELETE FROM monster_attacks WHERE normalized_name = ?", refreshed)
+    conn.executemany(INSERT_ATTACK, rows)
+    return len(rows)
+
+
+def refresh_all_attacks(conn, chunk_size=1000):
+    last, count = '', 0
+    while True:
+        names = [row[0] for row in conn.execute("SELECT normalized_name FROM monsters WHERE normalized_name > ? ORDER BY normalized_name LIMIT ?", (last, chunk_size))]
+        if not names:
+            return count
+        count += refresh_attacks(conn, names)
+        last = names[-1]
+
+
+def fulltext_tokens(search_term):
+    return re.findall(r"\w+", fold(search_term))
+
+
+def fulltext_query(search_term):
+    # Chaque mot devient un préfixe entre guillemets : pas d'injection de syntaxe FTS5, tous les mots requis
+    return ' '.join(f'"{token}"*' for token in fulltext_tokens(search_term))
+
+
+def create_page_index(conn):
+    # Remplace idx_monsters_name_cr : même préfixe name pour la recherche par nom, et la clé de pagination complète
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_monsters_page ON monsters({PAGE_KEY})")
+    conn.execute("DROP INDEX IF EXISTS idx_monsters_name_cr")
+    conn.execute("ANALYZE")
+
+
+def page_key(row):
+    # (name, cr, normalized_name) lu dans une page -> paramètres de la clé de pagination
+    return row[0], NULL_CR if row[1] is None else row[1], row[2]
+
+
+# Chaque migration porte la base à la version suivante ; ne jamais modifier une migration publiée, en ajouter une
+MIGRATIONS = [
+    create_base_tables,
+    drop_alignment_column,
+    add_missing_monster_columns,
+    create_monster_indexes,
+    create_fulltext_index,
+    add_derived_columns,
+    create_attack_table,
+    create_page_index,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+SELECT_MONSTER = f"SELECT {', '.join(MONSTER_COLUMNS)} FROM monsters WHERE name = ?"
+SELECT_SUMMARIES = f'''SELECT {', '.join(f'm.{column}' for column in SUMMARY_COLUMNS)} FROM monsters m
+                       LEFT JOIN listing_entries l ON l.normalized_name = m.normalized_name
+                       WHERE l.removed_at IS NULL'''
+SELECT_NAMES = "SELECT name FROM monsters ORDER BY name"
+# Pagination par clé sur (name, FP, normalized_name) via idx_monsters_page : un FP NULL compterait comme inconnu dans la
+# comparaison, et normalized_name (unique) départage deux homonymes pour que l'ordre soit total
+SELECT_PAGE = f"SELECT name, cr, normalized_name FROM monsters ORDER BY {PAGE_KEY} LIMIT ?"
+SELECT_PAGE_AFTER = f"SELECT name, cr, normalized_name FROM monsters WHERE ({PAGE_KEY}) > (?, ?, ?) ORDER BY {PAGE_KEY} LIMIT ?"
+SELECT_KEY_AT = f"SELECT name, cr, normalized_name FROM monsters ORDER BY {PAGE_KEY} LIMIT 1 OFFSET ?"
+COUNT_MONSTERS = "SELECT count(*) FROM monsters"
+COUNT_MONSTERS_BEFORE = f"SELECT count(*) FROM monsters WHERE ({PAGE_KEY}) < (?, ?, ?)"
+SELECT_CRAWL_SOURCE = "SELECT url, image_url FROM crawl_state WHERE normalized_name = ?"
+SELECT_PENDING = '''SELECT m.normalized_name, m.name FROM monsters m
+                    LEFT JOIN crawl_state c ON c.normalized_name = m.normalized_name
+                    WHERE m.hp IS NULL
+                      AND (c.status IS NULL OR (c.status = 'error' AND c.attempts < ?))
+                    ORDER BY m.normalized_name'''
+PARTIAL_INDEXES = ['idx_monsters_pending']
+SELECT_STAT_BLOCK = "SELECT data, fetched_at, source_hash FROM stat_blocks WHERE normalized_name = ?"
+SELECT_ATTACKS = f"SELECT {', '.join(ATTACK_FIELDS)} FROM monster_attacks WHERE normalized_name = ? ORDER BY position"
+SELECT_FULLTEXT = "SELECT name FROM monsters_fts WHERE monsters_fts MATCH ? LIMIT ?"
+# bm25 relit les listes complètes de chaque terme pour l'IDF (~80 ms sur 50k lignes) : on classe plutôt par palier
+# de colonne (nom, type, tout) sur un nombre borné de candidats
+FULLTEXT_TIERS = ["{{name}} : ({query})", "{{type}} : ({query})", "{query}"]
+RANK_CANDIDATES = 500
+
+
+def full_scans(plan):
+    # Seuls le parcours d'un index partiel et la table FTS (index MATCH) restent bornés ; tout autre SCAN lit la table ou un index en entier
+    return [step for step in plan if step.startswith("SCAN") and "VIRTUAL TABLE INDEX" not in step
+            and not any(f"INDEX {index}" in step for index in PARTIAL_INDEXES)]
+
+
+# Requêtes chaudes de l'application, celles des méthodes appelées à chaque fiche, page ou recherche : aucune ne doit
+# parcourir toute la table (le chargement du catalogue et la liste des noms du créateur lisent tout par nature, les
+# filtres FP/type/taille se font en mémoire dans monster_search)
+def hot_queries():
+    return [
+        ("get_by_name", SELECT_MONSTER, ("Gobelin",)),
+        ("get_crawl_source", SELECT_CRAWL_SOURCE, ("gobelin",)),
+        ("get_stat_block", SELECT_STAT_BLOCK, ("gobelin",)),
+        ("get_attacks", SELECT_ATTACKS, ("gobelin",)),
+        ("pending_crawl", SELECT_PENDING, (3,)),
+        ("page suivante", SELECT_PAGE_AFTER, ("Gobelin", 0.25, "gobelin", 100)),
+        ("position d'une clé", COUNT_MONSTERS_BEFORE, ("Gobelin", 0.25, "gobelin")),
+        ("plein texte", SELECT_FULLTEXT, (fulltext_query("attaques multiples feu"), RANK_CANDIDATES)),
+    ]
+
+
+class MonsterRepository:
+    def __init__(self, db_path="monsters.db"):
+        self.db_path = db_path
+        # Une seule connexion par processus, partagée entre threads sous verrou
+        self.conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False, cached_statements=256)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.RLock()
+        self.depth = 0
+        for pragma in PRAGMAS:
+            self.conn.execute(pragma)
+        self.migrate()
+        self.fulltext = self.query_one("SELECT 1 FROM sqlite_master WHERE name = 'monsters_fts'") is not None
+
+    def schema_version(self):
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def migrate(self):
+        with self.lock:
+            if self.schema_version() >= SCHEMA_VERSION:
+                return
+            # Verrou d'écriture avant de relire la version : un autre processus a pu migrer entre-temps
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = self.schema_version()
+                for number, migration in enumerate(MIGRATIONS[version:], version + 1):
+                    migration(self.conn)
+                    print(f"Migration {number}/{SCHEMA_VERSION} de {self.db_path} : {migration.__name__}")
+                self.conn.execute(f"PRAGMA user_version = {max(version, SCHEMA_VERSION)}")
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
+    @contextmanager
+    def transaction(self):
+        # Les transactions imbriquées rejoignent la transaction englobante
+        with self.lock:
+            self.depth += 1
+            try:
+                if self.depth > 1:
+                    yield self.conn
+                else:
+                    with self.conn:
+                        yield self.conn
+            finally:
+                self.depth -= 1
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchone()
+
+    def get_by_name(self, name):
+        return self.query_one(SELECT_MONSTER, (name,))
+
+    def search_fulltext(self, search_term, limit=200):
+        # None : FTS5 absent, l'appelant revient à la recherche par sous-chaîne
+        if not self.fulltext:
+            return None
+        query = fulltext_query(search_term)
+        if not query:
+            return []
+        first_token = fulltext_tokens(search_term)[0]
+        results = {}
+        for tier in FULLTEXT_TIERS:
+            names = [row[0] for row in self.query(SELECT_FULLTEXT, (tier.format(query=query), RANK_CANDIDATES)) if row[0] not in results]
+            # Dans un palier : noms commençant par le premier mot, puis les plus courts
+            for name in sorted(names, key=lambda name: (not fold(name).startswith(first_token), len(name), name)):
+                results[name] = None
+            if len(results) >= limit:
+                break
+        return list(results)[:limit]
+
+    def backfill_derived(self):
+        with self.transaction() as conn:
+            return backfill_derived_columns(conn)
+
+    def rebuild_fulltext(self):
+        with self.transaction() as conn:
+            rebuild_fulltext_index(conn)
+
+    def list_summaries(self):
+        return self.query(SELECT_SUMMARIES)
+
+    def iter_monsters(self, chunk_size=1000):
+        # Pagination par clé : le verrou n'est tenu que le temps d'un lot
+        last = ''
+        while True:
+            rows = self.query(f"SELECT {', '.join(MONSTER_COLUMNS)} FROM monsters WHERE normalized_name > ? ORDER BY normalized_name LIMIT ?", (last, chunk_size))
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            last = rows[-1]['normalized_name']
+
+    def list_names(self):
+        return [row[0] for row in self.query(SELECT_NAMES)]
+
+    def count_monsters(self, before=None):
+        if before is None:
+            return self.query_one(COUNT_MONSTERS)[0]
+        return self.query_one(COUNT_MONSTERS_BEFORE, page_key(before))[0]
+
+    def page_monsters(self, after=None, limit=100):
+        if after is None:
+            return [tuple(row) for row in self.query(SELECT_PAGE, (limit,))]
+        return [tuple(row) for row in self.query(SELECT_PAGE_AFTER, (*page_key(after), limit))]
+
+    def monster_key_at(self, offset):
+        # Saut direct (glissement de l'ascenseur) : un OFFSET sur l'index couvrant, ensuite on reprend par clé
+        row = self.query_one(SELECT_KEY_AT, (offset,))
+        return tuple(row) if row else None
+
+    def upsert_many(self, monsters):
+        monsters = list(monsters)
+        if not monsters:
+            return 0
+        # Colonnes dérivées (PV moyens, CA, modificateurs...) recalculées à chaque écriture
+        monsters = [dict(monster, **derived_columns(monster)) for monster in monsters]
+        columns = list(monsters[0])
+        unknown = set(columns) - set(MONSTER_COLUMNS)
+        if unknown or 'normalized_name' not in columns:
+            raise ValueError(f"Colonnes invalides pour monsters : {sorted(unknown) or 'normalized_name manquant'}")
+        updates = ', '.join(f"{column} = excluded.{column}" for column in columns if column != 'normalized_name')
+        sql = f'''INSERT INTO monsters ({', '.join(columns)}) VALUES ({', '.join(f':{column}' for column in columns)})
+                  ON CONFLICT(normalized_name) DO UPDATE SET {updates}'''
+        with self.transaction() as conn:
+            conn.executemany(sql, monsters)
+            # Attaques recalculées dans la même transaction dès que le texte des actions est réécrit
+            if any(column in columns for column in ATTACK_SOURCE_COLUMNS):
+                refresh_attacks(conn, [monster['normalized_name'] for monster in monsters])
+        return len(monsters)
+
+    def get_attacks(self, normalized_name):
+        return self.query(SELECT_ATTACKS, (normalized_name,))
+
+    def replace_attacks(self, normalized_name, attacks):
+        # Fiches aidedd lues à la demande : pas de ligne d'actions dans monsters, les attaques viennent de la fiche
+        rows = [dict(attack, normalized_name=normalized_name, position=position) for position, attack in enumerate(attacks)]
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM monster_attacks WHERE normalized_name = ?", (normalized_name,))
+            conn.executemany(INSERT_ATTACK, rows)
+
+    def refresh_all_attacks(self):
+        with self.transaction() as conn:
+            return refresh_all_attacks(conn)
+
+    def get_sync_state(self):
+        return {row['key']: row['value'] for row in self.query("SELECT key, value FROM sync_state")}
+
+    def set_sync_state(self, state):
+        with self.transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", state.items())
+
+    def listing_snapshot(self):
+        existing = {row[0]: tuple(row) for row in self.query("SELECT normalized_name, name, cr, type, size, xp, hp FROM monsters")}
+        listed = {row[0]: tuple(row) for row in self.query("SELECT normalized_name, row_hash, removed_at FROM listing_entries")}
+        return existing, listed
+
+    def apply_listing_sync(self, inserts, updates, listing_rows, removed, state):
+        with self.transaction() as conn:
+            self.upsert_many(dict(zip(SUMMARY_COLUMNS, row)) for row in inserts + updates)
+            conn.executemany('INSERT OR REPLACE INTO listing_entries (normalized_name, row_hash, removed_at) VALUES (?, ?, NULL)', listing_rows)
+            conn.executemany('UPDATE listing_entries SET removed_at = ? WHERE normalized_name = ?', removed)
+            self.set_sync_state(state)
+
+    def get_crawl_source(self, normalized_name):
+        return self.query_one(SELECT_CRAWL_SOURCE, (normalized_name,))
+
+    def pending_crawl(self, max_attempts):
+        # Le point de reprise : tout ce qui a déjà des PV ou un statut final est ignoré
+        return self.query(SELECT_PENDING, (max_attempts,))
+
+    def record_crawl_state(self, rows):
+        with self.transaction() as conn:
+            conn.executemany('''INSERT INTO crawl_state (normalized_name, status, url, image_url, attempts, last_error, fetched_at)
+                                VALUES (?, ?, ?, ?, ?, ?, ?)
+                                ON CONFLICT(normalized_name) DO UPDATE SET status = excluded.status, url = excluded.url,
+                                    image_url = excluded.image_url, attempts = crawl_state.attempts + excluded.attempts,
+                                    last_error = excluded.last_error, fetched_at = excluded.fetched_at''', rows)
+
+    def crawled_image_urls(self):
+        return [row[0] for row in self.query("SELECT image_url FROM crawl_state WHERE image_url IS NOT NULL")]
+
+    def get_stat_block(self, normalized_name):
+        return self.query_one(SELECT_STAT_BLOCK, (normalized_name,))
+
+    def put_stat_blocks(self, rows):
+        with self.transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO stat_blocks (normalized_name, data, fetched_at, source_hash) VALUES (?, ?, ?, ?)", rows)
+
+    def touch_stat_block(self, normalized_name, fetched_at):
+        with self.transaction() as conn:
+            conn.execute("UPDATE stat_blocks SET fetched_at = ? WHERE normalized_name = ?", (fetched_at, normalized_name))
+
+    def delete_stat_block(self, normalized_name):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM stat_blocks WHERE normalized_name = ?", (normalized_name,))
+
+    def query_plan(self, sql, params=()):
+        return [row['detail'] for row in self.query(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+    def check_query_plans(self, verbose=False):
+        failures = []
+        for label, sql, params in hot_queries():
+            if "monsters_fts" in sql and not self.fulltext:
+                continue
+            plan = self.query_plan(sql, params)
+            scans = full_scans(plan)
+            if scans:
+                failures.append((label, scans))
+            if verbose or scans:
+                print(f"{'ÉCHEC' if scans else 'ok'} {label}")
+                for step in plan:
+                    print(f"    {step}")
+        return failures
+
+
+_repositories = {}
+_repositories_lock = threading.Lock()
+
+
+def get_repository(db_path="monsters.db"):
+    key = os.path.abspath(db_path)
+    with _repositories_lock:
+        if key not in _repositories:
+            _repositories[key] = MonsterRepository(db_path)
+        return _repositories[key]
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Outils de maintenance de monsters.db")
+    parser.add_argument("--db", default="monsters.db")
+    parser.add_argument("--check-plans", action="store_true", help="Vérifie qu'aucune requête chaude ne parcourt toute une table")
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--backfill-derived", action="store_true", help="Recalcule PV moyens, CA, vitesse et modificateurs de toutes les lignes")
+    parser.add_argument("--rebuild-fts", action="store_true", help="Reconstruit l'index plein texte (après un VACUUM par exemple)")
+    parser.add_argument("--refresh-attacks", action="store_true", help="Réextrait les attaques du texte des actions de toutes les lignes")
+    args = parser.parse_args()
+    repository = MonsterRepository(args.db)
+    print(f"{args.db} : schéma version {repository.schema_version()}")
+    if args.backfill_derived:
+        print(f"{repository.backfill_derived()} lignes recalculées")
+    if args.rebuild_fts:
+        repository.rebuild_fulltext()
+        print("Index plein texte reconstruit")
+    if args.refresh_attacks:
+        print(f"{repository.refresh_all_attacks()} attaques extraites")
+    if args.check_plans:
+        failures = repository.check_query_plans(args.verbose)
+        print(f"{len(hot_queries()) - len(failures)}/{len(hot_queries())} requêtes indexées")
+        raise SystemExit(1 if failures else 0)
@@ -0,0 +1,172 @@
+import heapq
+import re
+from collections import Counter
+import monster_utils
+
+
+class MonsterSearchIndex:
+    def __init__(self, monsters):
+        # Construit une fois au chargement : trié, dédoublonné, clés normalisées précalculées
+        self.keys = []
+        self.labels = []
+        self.monsters = []
+        self.positions = {}
+        for monster in sorted(monsters, key=lambda m: (m.name.lower(), m.cr)):
+            key = monster_utils.normalize_name(monster.name)
+            if key in self.positions:
+                continue
+            self.positions[key] = len(self.keys)
+            self.keys.append(key)
+            self.labels.append(f"{monster.name} (CR {monster.cr})")
+            self.monsters.append(monster)
+        # Pile des recherches successives : ('', tout), ('d', ...), ('dr', ...) ; un retour arrière la dépile
+        self.history = [('', list(range(len(self.keys))))]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def position(self, name):
+        return self.positions.get(monster_utils.normalize_name(name))
+
+    def search(self, search_term):
+        key = monster_utils.normalize_name(search_term)
+        while self.history[-1][0] not in key:
+            self.history.pop()
+        last_key, last_result = self.history[-1]
+        if last_key == key:
+            return last_result
+        # Une requête qui contient la précédente ne peut que restreindre le résultat précédent
+        keys = self.keys
+        result = [i for i in last_result if key in keys[i]]
+        self.history.append((key, result))
+        return result
+
+
+def trigrams(key):
+    # Bordé d'espaces pour que début et fin de mot pèsent : " go", "gob", ..., "in "
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def levenshtein(a, b, max_distance=None):
+    # Une ligne de la matrice à la fois ; abandonne dès que toute la ligne dépasse max_distance
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+def fuzzy_key(name):
+    # La ponctuation ne compte pas : "dragon rouge adulte" doit trouver "Dragon rouge, adulte"
+    return monster_utils.normalize_name(re.sub(r"[^\w\s]", " ", name))
+
+
+class FuzzyIndex:
+    def __init__(self, names):
+        # Positions dans names, comme MonsterSearchIndex : l'appelant garde sa propre liste
+        self.keys = [fuzzy_key(name) for name in names]
+        self.postings = {}
+        for position, key in enumerate(self.keys):
+            for trigram in trigrams(key):
+                self.postings.setdefault(trigram, []).append(position)
+
+    def distance(self, query, key, max_distance):
+        # Meilleure distance entre la requête et le nom entier ou un morceau de même longueur commençant à un mot
+        if query in key:
+            return 0
+        best = levenshtein(query, key, max_distance)
+        for start in [i + 1 for i, char in enumerate(key) if char == ' '] if len(key) > len(query) else []:
+            best = min(best, levenshtein(query, key[start:start + len(query)], min(best, max_distance)))
+        best = min(best, levenshtein(query, key[:len(query)], min(best, max_distance)))
+        return best
+
+    def search(self, search_term, limit=20, candidates=100):
+        query = fuzzy_key(search_term)
+        if not query:
+            return []
+        query_trigrams = trigrams(query)
+        counts = Counter()
+        for trigram in query_trigrams:
+            counts.update(self.postings.get(trigram, ()))
+        # Tolérance proportionnelle à la longueur : une faute sur "orc", deux ou trois sur "dragon rouge adulte"
+        max_distance = max(1, len(query) // 4)
+        # Chaque faute détruit au plus trois trigrammes : en dessous de ce seuil, inutile de calculer la distance
+        min_shared = len(query_trigrams) - 3 * max_distance
+        scored = []
+        for position, shared in heapq.nlargest(candidates, counts.items(), key=lambda item: item[1]):
+            if shared < min_shared:
+                break
+            key = self.keys[position]
+            distance = self.distance(query, key, max_distance)
+            if distance <= max_distance:
+                scored.append((distance, -shared, len(key), key, position))
+        return [item[-1] for item in heapq.nsmallest(limit, scored)]
+
+
+def bitset(positions, size):
+    # Entier Python dont le bit i vaut 1 si la position i est présente
+    flags = bytearray((size + 7) // 8)
+    for position in positions:
+        flags[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(flags, 'little')
+
+
+def select_positions(mask, positions, size):
+    # Conserve l'ordre de positions : valable pour une liste triée comme pour un classement plein texte
+    bits = format(mask, f'0{size}b')[::-1]
+    return [position for position in positions if bits[position] == '1']
+
+
+class MonsterFacets:
+    def __init__(self, index):
+        # Une liste de positions par valeur, convertie une fois en bitset : combiner des filtres n'est plus qu'un & ou un |
+        self.size = len(index)
+        self.all = (1 << self.size) - 1
+        postings = {'cr': {}, 'type': {}, 'size': {}}
+        for position, monster in enumerate(index.monsters):
+            postings['cr'].setdefault(monster.cr, []).append(position)
+            postings['type'].setdefault(monster_utils.base_type(monster.type), []).append(position)
+            postings['size'].setdefault(monster.size, []).append(position)
+        self.crs = {cr: bitset(positions, self.size) for cr, positions in postings['cr'].items()}
+        self.types = {value: bitset(positions, self.size) for value, positions in postings['type'].items()}
+        self.sizes = {value: bitset(positions, self.size) for value, positions in postings['size'].items()}
+        self.cr_values = sorted(self.crs)
+        self.type_values = sorted(self.types, key=monster_utils.normalize_name)
+        order = {size: i for i, size in enumerate(monster_utils.SIZES)}
+        self.size_values = sorted(self.sizes, key=lambda size: (order.get(size, len(order)), size))
+
+    def cr_mask(self, cr_min=None, cr_max=None):
+        if not self.cr_values or (cr_min is None or cr_min <= self.cr_values[0]) and (cr_max is None or cr_max >= self.cr_values[-1]):
+            return self.all
+        mask = 0
+        for cr in self.cr_values:
+            if (cr_min is None or cr >= cr_min) and (cr_max is None or cr <= cr_max):
+                mask |= self.crs[cr]
+        return mask
+
+    def values_mask(self, masks, selected):
+        if not selected:
+            return self.all
+        mask = 0
+        for value in selected:
+            mask |= masks.get(value, 0)
+        return mask
+
+    def filter(self, base=None, cr_min=None, cr_max=None, types=(), sizes=()):
+        # Chaque compteur ignore son propre filtre : cocher une valeur n'efface pas le compte des autres
+        base = self.all if base is None else base
+        cr_mask = self.cr_mask(cr_min, cr_max) & base
+        type_mask = self.values_mask(self.types, types)
+        size_mask = self.values_mask(self.sizes, sizes)
+        type_counts = {value: (mask & cr_mask & size_mask).bit_count() for value, mask in self.types.items()}
+        size_counts = {value: (mask & cr_mask & type_mask).bit_count() for value, mask in self.sizes.items()}
+        return cr_mask & type_mask & size_mask, type_counts, size_counts
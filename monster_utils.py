@@ -0,0 +1,107 @@
+import re
+import unicodedata
+
+CR_XP = {
+    0: 10, 0.125: 25, 0.25: 50, 0.5: 100, 1: 200, 2: 450, 3: 700, 4: 1100,
+    5: 1800, 6: 2300, 7: 2900, 8: 3900, 9: 5000, 10: 5900, 11: 7200,
+    12: 8400, 13: 10000, 14: 11500, 15: 13000, 16: 15000, 17: 18000,
+    18: 20000, 19: 22000, 20: 25000, 21: 33000, 22: 41000, 23: 50000,
+    24: 62000, 25: 75000, 30: 155000
+}
+
+SIZES = ['TP', 'P', 'M', 'G', 'TG', 'Gig']
+
+
+def fold(text):
+    # Sans accents et en minuscules : base commune de la clé en base et du slug d'URL aidedd
+    return unicodedata.normalize('NFD', text).encode('ascii', 'ignore').decode('utf-8').lower()
+
+
+def normalize_name(name):
+    return re.sub(r'\s+', ' ', fold(name).strip())
+
+
+def aidedd_slug(name):
+    return fold(name).replace(' ', '-').replace(',', '')
+
+
+def cr_to_xp(cr):
+    return CR_XP.get(cr, 0)
+
+
+def parse_cr(value):
+    # "1/4", "0.25", "2" ou un nombre
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = str(value).strip().replace(',', '.')
+    if '/' in value:
+        numerator, denominator = value.split('/', 1)
+        return float(numerator) / float(denominator)
+    return float(value)
+
+
+def format_cr(cr):
+    return {0.125: '1/8', 0.25: '1/4', 0.5: '1/2'}.get(cr, f"{cr:g}")
+
+
+def base_type(monster_type):
+    # "Humanoïde (orc)" -> "Humanoïde" : les sous-types éclateraient le filtre en dizaines d'entrées
+    return (monster_type or 'Créature').split(' (')[0].strip()
+
+
+def calculate_modifier(score):
+    return (score - 10) // 2
+
+
+HP_AVERAGE_RE = re.compile(r"^\s*(\d+)(?![\d\s]*d)")
+DICE_RE = re.compile(r"(\d+)\s*d\s*(\d+)\s*(?:([+-])\s*(\d+))?")
+LEADING_NUMBER_RE = re.compile(r"^\s*(\d+)")
+WALK_SPEED_RE = re.compile(r"^\s*(\d+(?:[.,]\d+)?)\s*m\b")
+ABILITY_SCORES = ['str_score', 'dex_score', 'con_score', 'int_score', 'wis_score', 'cha_score']
+ABILITY_MODIFIERS = {score: score.replace('_score', '_mod') for score in ABILITY_SCORES}
+DERIVED_SCHEMA = [('hp_avg', 'INTEGER'), ('hp_dice', 'TEXT'), ('ac_value', 'INTEGER'), ('speed_walk_m', 'REAL')] + \
+                 [(modifier, 'INTEGER') for modifier in ABILITY_MODIFIERS.values()] + [('initiative_bonus', 'INTEGER')]
+
+
+def parse_hp(hp):
+    # "11 (2d8 + 2)" -> (11, "2d8+2") ; "2d8+2" seul -> moyenne calculée ; "7" -> (7, None)
+    text = str(hp or '')
+    dice_match = DICE_RE.search(text)
+    dice = None
+    average = None
+    if dice_match:
+        count, sides, sign, bonus = dice_match.groups()
+        dice = f"{count}d{sides}{sign + bonus if sign else ''}"
+        average = int(count) * (int(sides) + 1) // 2 + (int(bonus) * (-1 if sign == '-' else 1) if sign else 0)
+    match = HP_AVERAGE_RE.match(text)
+    if match:
+        average = int(match.group(1))
+    return average, dice
+
+
+def derived_columns(row):
+    # Valeurs numériques calculées une fois à l'écriture : la lecture n'analyse plus aucun texte
+    derived = {}
+    if 'hp' in row:
+        derived['hp_avg'], derived['hp_dice'] = parse_hp(row['hp'])
+    if 'ac' in row:
+        match = LEADING_NUMBER_RE.match(str(row['ac'] or ''))
+        derived['ac_value'] = int(match.group(1)) if match else None
+    if 'speed' in row:
+        match = WALK_SPEED_RE.match(str(row['speed'] or ''))
+        derived['speed_walk_m'] = float(match.group(1).replace(',', '.')) if match else None
+    for score, modifier in ABILITY_MODIFIERS.items():
+        if score in row:
+            derived[modifier] = calculate_modifier(int(row[score])) if row[score] not in (None, '') else None
+    if 'dex_score' in row:
+        derived['initiative_bonus'] = derived['dex_mod']
+    return derived
+
+
+def validate_monster(row):
+    warnings = []
+    if not re.match(r"^\d+(?:\s*\(.*\))?$", row.get('hp') or ""):
+        warnings.append(f"format des PV invalide : {row.get('hp')}")
+    if not re.match(r"^\d+\s*m(?:,\s*\w+\s*\d+\s*m)*$", row.get('speed') or ""):
+        warnings.append(f"format de vitesse invalide : {row.get('speed')}")
+    return warnings
@@ -0,0 +1,136 @@
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import http_client
+from image_cache import ImageCache
+from monster_repository import get_repository
+import stat_blocks
+from stat_block_store import StatBlockStore, source_hash
+
+DETAIL_FIELDS = ['ac', 'hp', 'speed', 'str_score', 'dex_score', 'con_score', 'int_score', 'wis_score', 'cha_score',
+                 'skills', 'damage_resistances', 'senses', 'languages', 'traits', 'actions', 'legendary_actions']
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class StatBlockCrawler:
+    def __init__(self, db_path="monsters.db", site_root=stat_blocks.SITE_ROOT, concurrency=4, rate=2.0,
+                 batch_size=25, max_attempts=3, timeout=15):
+        self.db_path = db_path
+        self.site_root = site_root
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate)
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.repository = get_repository(db_path)
+        self.store = StatBlockStore(self.repository)
+        self.client = http_client.HttpClient(pool_size=concurrency, timeout=timeout)
+
+    def pending_monsters(self):
+        return [tuple(row) for row in self.repository.pending_crawl(self.max_attempts)]
+
+    def fetch(self, normalized_name, name):
+        url = stat_blocks.monster_url(name, self.site_root)
+        self.bucket.acquire()
+        try:
+            response = self.client.get(url, use_cache=False)
+            if response.status_code == 404:
+                return normalized_name, url, 'missing', None, "HTTP 404"
+            response.raise_for_status()
+            monster_info = stat_blocks.parse_stat_block(name, url, response.content, self.site_root)
+            if 'error' in monster_info:
+                return normalized_name, url, 'missing', None, monster_info['error']
+            monster_info['source_hash'] = source_hash(response.content)
+            return normalized_name, url, 'done', monster_info, None
+        except Exception as e:
+            return normalized_name, url, 'error', None, str(e)
+
+    def write_batch(self, results):
+        monster_rows, state_rows, stored = [], [], []
+        now = time.time()
+        for normalized_name, url, status, monster_info, error in results:
+            image_url = None
+            if monster_info:
+                columns = stat_blocks.stat_block_columns(monster_info)
+                monster_rows.append(dict({field: columns[field] for field in DETAIL_FIELDS}, normalized_name=normalized_name))
+                image_url = monster_info['image_urls'][0] if monster_info['image_urls'] else None
+                stored.append((normalized_name, monster_info, monster_info.pop('source_hash')))
+            state_rows.append((normalized_name, status, url, image_url, 1 if status == 'error' else 0, error, now))
+        with self.repository.transaction():
+            self.repository.upsert_many(monster_rows)
+            self.repository.record_crawl_state(state_rows)
+            self.store.put_many(stored)
+
+    def prefetch_images(self):
+        urls = self.repository.crawled_image_urls()
+        print(f"Préchargement de {len(urls)} portraits")
+        paths = ImageCache(client=self.client).prefetch(urls, self.concurrency)
+        print(f"{sum(1 for path in paths.values() if path)} portraits en cache")
+
+    def run(self, limit=None):
+        pending = self.pending_monsters()
+        if limit:
+            pending = pending[:limit]
+        print(f"{len(pending)} fiches à récupérer ({self.concurrency} connexions, {self.bucket.rate} requêtes/s)")
+
+        counts = {'done': 0, 'missing': 0, 'error': 0}
+        batch = []
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        try:
+            futures = [executor.submit(self.fetch, normalized_name, name) for normalized_name, name in pending]
+            for future in as_completed(futures):
+                result = future.result()
+                counts[result[2]] += 1
+                if result[2] == 'error':
+                    print(f"Erreur avec {result[1]}: {result[4]}")
+                batch.append(result)
+                if len(batch) >= self.batch_size:
+                    self.write_batch(batch)
+                    batch = []
+                    print(f"Progression : {sum(counts.values())}/{len(pending)}")
+        except KeyboardInterrupt:
+            print("Interruption : enregistrement du point de reprise...")
+            executor.shutdown(wait=False, cancel_futures=True)
+        finally:
+            if batch:
+                self.write_batch(batch)
+            executor.shutdown(wait=False)
+        print(f"Terminé : {counts['done']} fiches, {counts['missing']} introuvables, {counts['error']} erreurs")
+        return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Récupère toutes les fiches de monstres et remplit monsters.db")
+    parser.add_argument("--db", default="monsters.db")
+    parser.add_argument("--site-root", default=stat_blocks.SITE_ROOT, help="Racine du site (ex. un serveur de fixtures local)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=2.0, help="Requêtes par seconde")
+    parser.add_argument("--batch-size", type=int, default=25)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--images", action="store_true", help="Précharge aussi les portraits dans le cache d'images")
+    args = parser.parse_args()
+    crawler = StatBlockCrawler(args.db, args.site_root, args.concurrency, args.rate, args.batch_size)
+    crawler.run(args.limit)
+    if args.images:
+        crawler.prefetch_images()
@@ -0,0 +1,50 @@
+import hashlib
+import json
+import time
+import zlib
+from monster_repository import get_repository
+
+DEFAULT_TTL = 30 * 24 * 3600
+
+ENTRY_KEYS = ('traits', 'actions', 'legendary_actions')
+
+
+def source_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def encode_stat_block(monster_info):
+    return zlib.compress(json.dumps(monster_info, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def decode_stat_block(data):
+    monster_info = json.loads(zlib.decompress(data))
+    # JSON ne connaît pas les tuples (titre, contenu)
+    for key in ENTRY_KEYS:
+        monster_info[key] = [tuple(entry) for entry in monster_info.get(key, [])]
+    return monster_info
+
+
+class StatBlockStore:
+    def __init__(self, repository=None, ttl=DEFAULT_TTL):
+        self.repository = repository or get_repository()
+        self.ttl = ttl
+
+    def get(self, normalized_name):
+        row = self.repository.get_stat_block(normalized_name)
+        if row is None:
+            return None, True, None
+        return decode_stat_block(row[0]), time.time() - row[1] > self.ttl, row[2]
+
+    def put_many(self, entries):
+        now = time.time()
+        self.repository.put_stat_blocks([(normalized_name, encode_stat_block(monster_info), now, content_hash) for normalized_name, monster_info, content_hash in entries])
+
+    def put(self, normalized_name, monster_info, content_hash):
+        self.put_many([(normalized_name, monster_info, content_hash)])
+
+    def touch(self, normalized_name):
+        self.repository.touch_stat_block(normalized_name, time.time())
+
+    def delete(self, normalized_name):
+        self.repository.delete_stat_block(normalized_name)
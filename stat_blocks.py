@@ -0,0 +1,167 @@
+from bs4 import BeautifulSoup, SoupStrainer
+import os
+import re
+from monster_utils import aidedd_slug, calculate_modifier
+
+try:
+    import lxml  # noqa: F401
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+
+AIDEDD_ROOT = "https://www.aidedd.org"
+# AIDEDD_SITE_ROOT permet de viser un serveur de fixtures local (voir aidedd_fixtures.py)
+SITE_ROOT = os.environ.get("AIDEDD_SITE_ROOT", AIDEDD_ROOT).rstrip('/')
+
+STAT_BLOCK_STRAINER = SoupStrainer('div', class_=['jaune', 'col1', 'picture'])
+STAT_BLOCK_TAGS = ['div', 'p', 'img']
+DETAIL_KEYWORDS = ['Compétences', 'Résistances', 'Immunités', 'Sens', 'Langues', 'Puissance']
+HP_RE = re.compile(r"(\d+)(?:\s*\(.*\))?")
+ABILITY_SCORE_RE = re.compile(r"(\d+)")
+
+ABILITY_COLUMNS = {
+    'FOR': 'str_score', 'DEX': 'dex_score', 'CON': 'con_score',
+    'INT': 'int_score', 'SAG': 'wis_score', 'CHA': 'cha_score'
+}
+
+DETAIL_COLUMNS = {
+    'Compétences': 'skills',
+    'Résistances aux dégâts': 'damage_resistances',
+    'Sens': 'senses',
+    'Langues': 'languages'
+}
+
+
+def listing_url(site_root=SITE_ROOT):
+    return f"{site_root}/dnd-filters/monstres.php"
+
+
+def monster_url(monster_name, site_root=SITE_ROOT):
+    return f"{site_root}/dnd/monstres.php?vf={aidedd_slug(monster_name)}"
+
+
+def error_info(monster_name, url):
+    return {'name': monster_name, 'error': 'Fiche non trouvée', 'html': f'<h2>{monster_name}</h2><p>Fiche non disponible.</p>', 'image_urls': [], 'url': url}
+
+
+def parse_stats(red_div):
+    stats = {}
+    current_key = None
+    current_value = []
+    for child in red_div.children:
+        if child.name == 'strong':
+            if current_key and current_value:
+                stats[current_key] = " ".join(current_value).strip()
+            current_key = child.text.strip()
+            current_value = []
+        elif child.name in ('br', 'div'):
+            continue
+        elif child.string:
+            current_value.append(child.string.strip())
+    if current_key and current_value:
+        stats[current_key] = " ".join(current_value).strip()
+    return stats
+
+
+def parse_stat_block(monster_name, url, content, site_root=SITE_ROOT):
+    # Seul le bloc de la fiche (et le portrait) est construit, puis parcouru une seule fois
+    soup = BeautifulSoup(content, PARSER, parse_only=STAT_BLOCK_STRAINER)
+    monster_block = soup.find('div', class_='jaune') or soup.find('div', class_='col1')
+    if not monster_block:
+        print(f"Monster block not found for {monster_name} at {url}")
+        return error_info(monster_name, url)
+
+    image_urls = []
+    stats = {}
+    abilities = {}
+    details = []
+    monster_type = ''
+    traits, actions, legendary_actions = [], [], []
+    current_section = traits
+    for tag in soup.find_all(STAT_BLOCK_TAGS):
+        if tag.name == 'p':
+            text = tag.text
+            if any(kw in text for kw in DETAIL_KEYWORDS):
+                details.append(text.strip())
+            strong = tag.strong
+            if strong is not None and tag.em is not None:
+                title = strong.text.strip()
+                current_section.append((title, text.replace(title, '', 1).strip()))
+            continue
+        classes = tag.get('class') or ()
+        if tag.name == 'img':
+            if not image_urls and tag.get('src') and tag.find_parent('div', class_='picture'):
+                src = tag['src']
+                image_urls.append(src if src.startswith('http') else f"{site_root}{src}")
+        elif 'carac' in classes:
+            strong = tag.strong
+            if strong is not None:
+                value = tag.text.replace(strong.text, '').strip()
+                match = ABILITY_SCORE_RE.match(value)
+                abilities[strong.text.strip()] = f"{int(match.group(1))} ({calculate_modifier(int(match.group(1))):+d})" if match else value
+        elif 'rub' in classes:
+            # Les traits précèdent le premier bandeau "rub", puis chaque bandeau ouvre sa section
+            current_section = legendary_actions if 'légendaire' in tag.text.lower() else actions
+        elif 'red' in classes and not stats:
+            stats = parse_stats(tag)
+        elif 'type' in classes and not monster_type:
+            monster_type = tag.text.strip()
+
+    hp_formula = stats.get("Points de vie", "").strip()
+    average_hp = 1
+    if hp_formula:
+        match = HP_RE.match(hp_formula)
+        if match:
+            average_hp = int(match.group(1))
+        else:
+            print(f"Could not parse HP for {monster_name}: {hp_formula}")
+    else:
+        print(f"No HP formula found for {monster_name}, defaulting to 1")
+    if average_hp <= 0:
+        print(f"Warning: Invalid HP ({average_hp}) for {monster_name}, setting to 1")
+        average_hp = 1
+
+    return {
+        'name': monster_name,
+        'url': url,
+        'html': str(monster_block).replace('src="/', f'src="{site_root}/').replace('href="/', f'href="{site_root}/'),
+        'image_urls': image_urls,
+        'hp': average_hp,
+        'hp_formula': hp_formula,
+        'type': monster_type,
+        'stats': stats,
+        'abilities': abilities,
+        'details': details,
+        'traits': traits,
+        'actions': actions,
+        'legendary_actions': legendary_actions
+    }
+
+
+def join_entries(entries):
+    lines = []
+    for title, content in entries:
+        content = content.lstrip('. ').strip()
+        lines.append(f"{title}. {content}" if content else title)
+    return "\n".join(lines) or None
+
+
+def stat_block_columns(monster_info):
+    columns = {
+        'ac': monster_info['stats'].get("Classe d'armure"),
+        'hp': monster_info['hp_formula'] or None,
+        'speed': monster_info['stats'].get("Vitesse"),
+        'traits': join_entries(monster_info['traits']),
+        'actions': join_entries(monster_info['actions']),
+        'legendary_actions': join_entries(monster_info['legendary_actions'])
+    }
+    for key, column in ABILITY_COLUMNS.items():
+        match = ABILITY_SCORE_RE.match(monster_info['abilities'].get(key, ''))
+        columns[column] = int(match.group(1)) if match else None
+    for prefix, column in DETAIL_COLUMNS.items():
+        columns[column] = monster_info['stats'].get(prefix)
+    for detail in monster_info['details']:
+        for prefix, column in DETAIL_COLUMNS.items():
+            if detail.startswith(prefix):
+                columns[column] = detail[len(prefix):].strip(' :')
+    return columns
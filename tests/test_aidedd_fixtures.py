@@ -0,0 +1,48 @@
+import json
+from aidedd_fixtures import INDEX_FILE, FixtureRecorder
+from bench_stat_blocks import page_paths
+from http_client import HttpResponse
+
+PAGES = {
+    "https://www.aidedd.org/dnd/monstres.php?vf=gobelin": (200, b"<div class='jaune'>Gobelin</div>", 'text/html; charset=UTF-8'),
+    "https://www.aidedd.org/dnd/images/goblin.jpg": (200, b"\xff\xd8\xff", 'image/jpeg'),
+}
+
+
+class FakeClient:
+    def __init__(self):
+        self.urls = []
+
+    def get(self, url, use_cache=True):
+        self.urls.append(url)
+        status, content, content_type = PAGES[url]
+        return HttpResponse(url, status, content, {'Content-Type': content_type})
+
+
+def test_recorded_fixtures_keep_an_extension_and_are_benchmarked(tmp_path):
+    recorder = FixtureRecorder(str(tmp_path))
+    recorder.client = FakeClient()
+    for url in PAGES:
+        recorder.record(url)
+    recorder.save_index()
+
+    files = {key: entry['file'] for key, entry in recorder.index.items()}
+    assert files['/dnd/monstres.php?vf=gobelin'].endswith('.html')
+    assert files['/dnd/images/goblin.jpg'].endswith('.jpg')
+    assert page_paths(str(tmp_path)) == [str(tmp_path / files['/dnd/monstres.php?vf=gobelin'])]
+
+    # Relecture depuis l'index, sans nouvelle requête
+    reloaded = FixtureRecorder(str(tmp_path))
+    reloaded.client = FakeClient()
+    assert reloaded.record("https://www.aidedd.org/dnd/monstres.php?vf=gobelin") == b"<div class='jaune'>Gobelin</div>"
+    assert reloaded.client.urls == []
+
+
+def test_benchmark_reads_fixtures_recorded_without_extension(tmp_path):
+    (tmp_path / "0a1b2c").write_bytes(b"<div class='jaune'>Orc</div>")
+    (tmp_path / "3d4e5f").write_bytes(b"Fixture absente")
+    (tmp_path / INDEX_FILE).write_text(json.dumps({
+        '/dnd/monstres.php?vf=orc': {'file': '0a1b2c', 'status': 200, 'content_type': 'text/html', 'recorded_at': 0},
+        '/dnd/monstres.php?vf=x': {'file': '3d4e5f', 'status': 404, 'content_type': 'text/html', 'recorded_at': 0},
+    }), encoding='utf-8')
+    assert page_paths(str(tmp_path)) == [str(tmp_path / "0a1b2c")]
@@ -0,0 +1,47 @@
+import attack_parser
+import combat_simulator
+
+WEAPON_2014 = "Cimeterre. Attaque d'arme au corps à corps : +4 pour toucher, allonge 1,50 m, une cible. Touché : 5 (1d6 + 2) dégâts tranchants."
+WEAPON_SUFFIX = "Cimeterre. Attaque au corps à corps avec une arme : +4 pour toucher, allonge 1,50 m, une cible. Touché : 5 (1d6 + 2) dégâts tranchants."
+RANGED_SUFFIX = "Arc court. Attaque à distance avec une arme : +4 pour toucher, portée 24/96 m, une cible. Touché : 5 (1d6 + 2) dégâts perforants."
+SPELL_SUFFIX = "Rayon. Attaque à distance avec un sort : +5 pour toucher, portée 36 m, une cible. Touché : 10 (3d6) dégâts de feu."
+WEAPON_2024 = "Griffe. Jet d'attaque au corps à corps : +6, allonge 1,50 m. Touché : 8 (1d10 + 3) dégâts tranchants."
+
+
+def test_both_weapon_wordings_give_the_same_attack():
+    [first] = attack_parser.parse_attacks({'actions': WEAPON_2014})
+    [second] = attack_parser.parse_attacks({'actions': WEAPON_SUFFIX})
+    assert first == second
+    assert first['kind'] == 'arme corps à corps'
+    assert first['to_hit'] == 4
+    assert first['reach'] == '1,50 m'
+    assert (first['damage_dice'], first['damage_average'], first['damage_type']) == ('1d6+2', 5, 'tranchants')
+
+
+def test_ranged_and_spell_suffixes():
+    ranged, spell = attack_parser.parse_attacks({'actions': f"{RANGED_SUFFIX}\n{SPELL_SUFFIX}"})
+    assert (ranged['kind'], ranged['to_hit'], ranged['range'], ranged['damage_dice']) == ('arme distance', 4, '24/96 m', '1d6+2')
+    assert (spell['kind'], spell['to_hit'], spell['damage_dice'], spell['damage_type']) == ('sort distance', 5, '3d6', 'feu')
+
+
+def test_2024_wording_and_scraper_tuples():
+    [attack] = attack_parser.parse_attacks({'actions': [("Griffe", WEAPON_2024.partition('. ')[2])], 'legendary_actions': []})
+    assert (attack['kind'], attack['to_hit'], attack['damage_dice']) == ('corps à corps', 6, '1d10+3')
+
+
+def test_unknown_wording_falls_back_on_pour_toucher():
+    [attack] = attack_parser.parse_attacks({'actions': "Coup. Attaque spéciale : +3 pour toucher, une cible. Touché : 4 (1d4 + 2) dégâts contondants."})
+    assert (attack['kind'], attack['to_hit'], attack['damage_dice']) == (None, 3, '1d4+2')
+
+
+def test_save_attack_and_rider_damage():
+    text = ("Morsure. Attaque d'arme au corps à corps : +14 pour toucher, allonge 3 m, une cible. Touché : 19 (2d10 + 8) dégâts perforants plus 7 (2d6) dégâts de feu.\n"
+            "Souffle. Chaque créature doit effectuer un jet de sauvegarde de Dextérité DD 21, subissant 63 (18d6) dégâts de feu en cas d'échec.")
+    bite, breath = attack_parser.parse_attacks({'actions': text})
+    assert (bite['damage_dice'], bite['damage_average']) == ('2d10+8+2d6', 26)
+    assert (breath['kind'], breath['save_dc'], breath['save_ability'], breath['damage_dice']) == ('sauvegarde', 21, 'Dextérité', '18d6')
+
+
+def test_simulator_reads_the_suffix_wording():
+    combatant = combat_simulator.combatant_from_info("Gobelin 1", {'hp': 7, 'ac_value': 15, 'actions': [(WEAPON_SUFFIX, "")]})
+    assert (combatant.attack_bonus, combatant.damage_dice, combatant.damage_sides, combatant.damage_bonus) == (4, 1, 6, 2)
@@ -0,0 +1,14 @@
+import pytest
+from dice import compile_expression
+
+
+@pytest.mark.parametrize("text", ["2 d6", "2 D6", "2d 6", "2 d 6", "5 6", "1d8 + 2 d6"])
+def test_whitespace_inside_a_term_is_rejected(text):
+    with pytest.raises(ValueError):
+        compile_expression(text)
+
+
+@pytest.mark.parametrize("text, minimum, maximum", [("2d6 + 3", 5, 15), ("1D20 ADV", 1, 20), ("1d20 dis - 1", 0, 19), ("4d6 kh3", 3, 18), (" d8 ", 1, 8)])
+def test_whitespace_between_terms_is_allowed(text, minimum, maximum):
+    expression = compile_expression(text)
+    assert (expression.minimum, expression.maximum) == (minimum, maximum)
@@ -0,0 +1,16 @@
+from encounter_difficulty import encounter_multiplier
+from encounter_generator import bucket_compositions, target_band
+
+
+def test_limit_applies_to_each_group_size():
+    # Beaucoup de paliers : les petits effectifs suffiraient à épuiser un budget global
+    bucket_xp = sorted(range(50, 3000, 10), reverse=True)
+    low, high = target_band(4, 5, 2)
+    compositions = bucket_compositions(bucket_xp, low, high, 4, 3, 8, 20)
+    counts = {count for count, _ in compositions}
+    assert counts == set(range(1, 9))
+    for count in counts:
+        assert sum(1 for found, _ in compositions if found == count) <= 20
+    for count, picks in compositions:
+        assert sum(quantity for _, quantity in picks) == count and len(picks) <= 3
+        assert low <= sum(bucket_xp[i] * quantity for i, quantity in picks) * encounter_multiplier(count, 4) <= high
@@ -0,0 +1,31 @@
+import os
+from http_client import HttpClient
+
+HEADERS = {'Content-Type': 'text/html', 'ETag': '"abc"'}
+
+
+def test_cache_evicts_least_recently_used_entries_over_budget(tmp_path):
+    client = HttpClient(cache_dir=str(tmp_path), max_cache_bytes=2500)
+    urls = [f"https://www.aidedd.org/dnd/monstres.php?vf={slug}" for slug in ("gobelin", "orc", "ogre")]
+    client.store_entry(urls[0], HEADERS, b"a" * 1000)
+    client.store_entry(urls[1], HEADERS, b"b" * 1000)
+    assert client.load_entry(urls[0])[1] == b"a" * 1000
+
+    client.store_entry(urls[2], HEADERS, b"c" * 1000)
+
+    assert client.load_entry(urls[1]) is None
+    assert not any(os.path.exists(path) for path in client.cache_paths(urls[1]))
+    assert client.load_entry(urls[0])[1] == b"a" * 1000
+    assert client.load_entry(urls[2])[1] == b"c" * 1000
+    assert client.cache_size() == client.entry_size(urls[0]) + client.entry_size(urls[2]) <= 2500
+
+
+def test_entries_written_before_the_index_are_counted_on_read(tmp_path):
+    url = "https://www.aidedd.org/dnd/monstres.php?vf=gobelin"
+    HttpClient(cache_dir=str(tmp_path)).store_entry(url, HEADERS, b"x" * 100)
+    os.remove(tmp_path / "index.db")
+
+    client = HttpClient(cache_dir=str(tmp_path))
+    assert client.cache_size() == 0
+    assert client.load_entry(url)[1] == b"x" * 100
+    assert client.cache_size() == client.entry_size(url)
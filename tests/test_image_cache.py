@@ -0,0 +1,24 @@
+import os
+from http_client import HttpResponse
+from image_cache import ImageCache
+
+
+class FakeClient:
+    def get(self, url, use_cache=True):
+        return HttpResponse(url, 200, b"x" * 1000, {'Content-Type': 'image/jpeg'})
+
+
+def test_eviction_leaves_files_being_written_alone(tmp_path):
+    cache = ImageCache(cache_dir=str(tmp_path), max_bytes=1500, client=FakeClient())
+    first = cache.get("https://www.aidedd.org/dnd/images/goblin.jpg")
+    key = cache.key_for("https://www.aidedd.org/dnd/images/goblin.jpg")
+    # Miniature en cours d'écriture pour la première image
+    in_flight = tmp_path / f"{key}_thumb.png.1.2.tmp"
+    in_flight.write_bytes(b"y" * 500)
+
+    second = cache.get("https://www.aidedd.org/dnd/images/orc.jpg")
+
+    assert not os.path.exists(first) and os.path.exists(second)
+    assert in_flight.exists()
+    assert cache.total_size() == 1000
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('.tmp-')]
@@ -0,0 +1,29 @@
+from attack_parser import parse_attacks
+from monster_repository import MonsterRepository
+
+GOBELIN_ACTIONS = "Cimeterre. Attaque d'arme au corps à corps : +4 pour toucher, allonge 1,50 m, une cible. Touché : 5 (1d6 + 2) dégâts tranchants."
+ORC_ACTIONS = "Hache à deux mains. Attaque d'arme au corps à corps : +5 pour toucher, allonge 1,50 m, une cible. Touché : 9 (1d12 + 3) dégâts tranchants."
+
+
+def attack_names(repository, normalized_name):
+    return [attack['name'] for attack in repository.get_attacks(normalized_name)]
+
+
+def test_refresh_keeps_attacks_read_from_on_demand_stat_blocks(tmp_path):
+    repository = MonsterRepository(str(tmp_path / "monsters.db"))
+    repository.upsert_many([{'normalized_name': "gobelin", 'name': "Gobelin", 'cr': 0.25, 'actions': GOBELIN_ACTIONS},
+                            {'normalized_name': "orc", 'name': "Orc", 'cr': 0.5, 'actions': None}])
+    # L'orc n'a pas d'actions en base : ses attaques viennent de la fiche aidedd lue à la demande
+    repository.replace_attacks("orc", parse_attacks({'actions': ORC_ACTIONS}))
+
+    assert repository.refresh_all_attacks() == 1
+    assert attack_names(repository, "gobelin") == ["Cimeterre"]
+    assert attack_names(repository, "orc") == ["Hache à deux mains"]
+
+    # Une mise à jour sans texte d'actions ne les efface pas non plus
+    repository.upsert_many([{'normalized_name': "orc", 'name': "Orc", 'cr': 0.5, 'actions': None, 'legendary_actions': None}])
+    assert attack_names(repository, "orc") == ["Hache à deux mains"]
+
+    # Dès que la base a son propre texte, il fait foi
+    repository.upsert_many([{'normalized_name': "orc", 'name': "Orc", 'cr': 0.5, 'actions': GOBELIN_ACTIONS}])
+    assert attack_names(repository, "orc") == ["Cimeterre"]
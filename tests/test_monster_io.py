@@ -0,0 +1,25 @@
+import monster_io
+from monster_repository import MonsterRepository
+
+
+def test_non_object_lines_are_reported_without_aborting(tmp_path):
+    path = tmp_path / "monstres.jsonl"
+    path.write_text('{"name": "Gobelin", "cr": "1/4", "hp": "7 (2d6)"}\n[1, 2]\n"x"\n42\n'
+                    '{"name": "Orc", "cr": 0.5, "hp": "15 (2d8 + 6)"}\n', encoding='utf-8')
+    repository = MonsterRepository(str(tmp_path / "monsters.db"))
+    report = monster_io.import_monsters(str(path), repository=repository)
+    assert report['imported'] == 2
+    assert [number for number, _ in report['errors']] == [2, 3, 4]
+    assert sorted(repository.list_names()) == ["Gobelin", "Orc"]
+
+
+def test_truncated_srd_array_keeps_the_entries_already_read(tmp_path):
+    path = tmp_path / "srd.json"
+    path.write_text('[{"name": "Goblin", "challenge_rating": 0.25, "hit_points": 7, "hit_dice": "2d6"},\n'
+                    ' {"name": "Orc", "challenge_rating": 0.5, "hit_points": 15, "hit_dice": "2d8"},\n'
+                    ' {"name": "Ogre", "challenge_rat', encoding='utf-8')
+    repository = MonsterRepository(str(tmp_path / "monsters.db"))
+    report = monster_io.import_monsters(str(path), repository=repository)
+    assert report['imported'] == 2
+    assert [number for number, _ in report['errors']] == [3]
+    assert sorted(repository.list_names()) == ["Goblin", "Orc"]
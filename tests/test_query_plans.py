@@ -0,0 +1,36 @@
+from monster_repository import MonsterRepository, full_scans, hot_queries
+
+
+def make_repository(tmp_path):
+    repository = MonsterRepository(str(tmp_path / "monsters.db"))
+    repository.upsert_many({'normalized_name': f"monstre {i:03d}", 'name': f"Monstre {i:03d}", 'cr': i % 20, 'type': "bête",
+                            'size': "M", 'xp': 10, 'hp': "7 (2d6)" if i % 2 else None} for i in range(200))
+    return repository
+
+
+def test_hot_queries_use_indexes(tmp_path):
+    assert make_repository(tmp_path).check_query_plans() == []
+
+
+def test_queries_run_by_the_app_are_checked_and_indexed(tmp_path):
+    # Les requêtes réellement envoyées par les méthodes appelées à chaque fiche, page ou recherche
+    repository = make_repository(tmp_path)
+    statements = []
+    repository.conn.set_trace_callback(statements.append)
+    repository.get_by_name("Monstre 010")
+    repository.get_crawl_source("monstre 010")
+    repository.get_stat_block("monstre 010")
+    repository.get_attacks("monstre 010")
+    repository.pending_crawl(3)
+    repository.page_monsters(("Monstre 010", 10, "monstre 010"), 50)
+    repository.count_monsters(before=("Monstre 010", 10, "monstre 010"))
+    repository.search_fulltext("monstre")
+    repository.conn.set_trace_callback(None)
+
+    checked = {' '.join(sql.split()) for _, sql, _ in hot_queries()}
+    # Les lignes "-- ..." sont les sous-requêtes internes de FTS5, pas celles de l'application
+    for statement in [statement for statement in statements if statement.lstrip().upper().startswith("SELECT")]:
+        plan = [row['detail'] for row in repository.conn.execute(f"EXPLAIN QUERY PLAN {statement}")]
+        assert full_scans(plan) == [], statement
+        template = ' '.join(statement.split())
+        assert any(template.startswith(sql.split('?')[0]) for sql in checked), f"requête absente de hot_queries : {statement}"
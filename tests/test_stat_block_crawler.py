@@ -0,0 +1,88 @@
+import json
+import threading
+import pytest
+from aidedd_fixtures import INDEX_FILE, ReplayHandler, ReplayServer
+from stat_block_crawler import StatBlockCrawler
+
+GOBELIN_PAGE = '''<html><body><div class="jaune"><h1>Gobelin</h1><div class="type">Humanoïde (gobelinoïde) de taille P</div>
+<div class="red"><strong>Classe d'armure</strong> 15 (armure de cuir, bouclier)<br><strong>Points de vie</strong> 7 (2d6)<br>
+<strong>Vitesse</strong> 9 m<br>
+<div class="carac"><strong>FOR</strong><br>8 (-1)</div><div class="carac"><strong>DEX</strong><br>14 (+2)</div>
+<div class="carac"><strong>CON</strong><br>10 (+0)</div><div class="carac"><strong>INT</strong><br>10 (+0)</div>
+<div class="carac"><strong>SAG</strong><br>8 (-1)</div><div class="carac"><strong>CHA</strong><br>8 (-1)</div>
+<strong>Compétences</strong> Discrétion +6<br><strong>Sens</strong> vision dans le noir 18 m<br><strong>Langues</strong> commun, gobelin<br></div>
+<p><strong><em>Fuite agile</em></strong>. Le gobelin peut effectuer l'action Se désengager ou Se cacher par une action bonus.</p>
+<div class="rub">Actions</div>
+<p><strong><em>Cimeterre</em></strong>. <em>Attaque au corps à corps avec une arme</em> : +4 pour toucher, allonge 1,50 m, une cible. <em>Touché</em> : 5 (1d6 + 2) dégâts tranchants.</p>
+</div><div class="picture"><img src="https://www.aidedd.org/dnd/images/goblin.jpg"></div></body></html>'''
+
+ORC_PAGE = '''<html><body><div class="jaune"><h1>Orc</h1><div class="type">Humanoïde (orc) de taille M</div>
+<div class="red"><strong>Classe d'armure</strong> 13 (armure de peau)<br><strong>Points de vie</strong> 15 (2d8 + 6)<br>
+<strong>Vitesse</strong> 9 m<br>
+<div class="carac"><strong>FOR</strong><br>16 (+3)</div><div class="carac"><strong>DEX</strong><br>12 (+1)</div>
+<div class="carac"><strong>CON</strong><br>16 (+3)</div><div class="carac"><strong>INT</strong><br>7 (-2)</div>
+<div class="carac"><strong>SAG</strong><br>11 (+0)</div><div class="carac"><strong>CHA</strong><br>10 (+0)</div></div>
+<div class="rub">Actions</div>
+<p><strong><em>Hache à deux mains</em></strong>. <em>Attaque d'arme au corps à corps</em> : +5 pour toucher, allonge 1,50 m, une cible. <em>Touché</em> : 9 (1d12 + 3) dégâts tranchants.</p>
+</div></body></html>'''
+
+
+class CountingHandler(ReplayHandler):
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        super().do_GET()
+
+
+@pytest.fixture
+def replay_server(tmp_path):
+    fixture_dir = tmp_path / "fixtures"
+    fixture_dir.mkdir()
+    index = {}
+    for slug, page in [("gobelin", GOBELIN_PAGE), ("orc", ORC_PAGE)]:
+        (fixture_dir / slug).write_text(page, encoding='utf-8')
+        index[f"/dnd/monstres.php?vf={slug}"] = {'file': slug, 'status': 200, 'content_type': 'text/html; charset=UTF-8', 'recorded_at': 1700000000}
+    (fixture_dir / INDEX_FILE).write_text(json.dumps(index), encoding='utf-8')
+    server = ReplayServer(str(fixture_dir), port=0)
+    server.RequestHandlerClass = CountingHandler
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_crawler(tmp_path, server):
+    return StatBlockCrawler(str(tmp_path / "monsters.db"), server.root, concurrency=2, rate=1000, batch_size=2)
+
+
+def test_crawl_replayed_fixtures_and_resume(tmp_path, replay_server):
+    crawler = make_crawler(tmp_path, replay_server)
+    crawler.repository.upsert_many({'normalized_name': name.lower(), 'name': name, 'cr': cr, 'type': "humanoïde", 'size': size, 'xp': xp}
+                                   for name, cr, size, xp in [("Gobelin", 0.25, "P", 50), ("Orc", 0.5, "M", 100), ("Fantome", 4, "M", 1100)])
+
+    assert crawler.run() == {'done': 2, 'missing': 1, 'error': 0}
+
+    gobelin = crawler.repository.get_by_name("Gobelin")
+    assert (gobelin['ac'], gobelin['hp'], gobelin['speed']) == ("15 (armure de cuir, bouclier)", "7 (2d6)", "9 m")
+    assert [gobelin[column] for column in ('str_score', 'dex_score', 'con_score', 'int_score', 'wis_score', 'cha_score')] == [8, 14, 10, 10, 8, 8]
+    assert (gobelin['skills'], gobelin['senses'], gobelin['languages']) == ("Discrétion +6", "vision dans le noir 18 m", "commun, gobelin")
+    assert gobelin['traits'].startswith("Fuite agile. Le gobelin")
+    assert gobelin['actions'].startswith("Cimeterre. Attaque au corps à corps avec une arme : +4")
+    assert crawler.repository.get_by_name("Orc")['hp'] == "15 (2d8 + 6)"
+    assert [(attack['name'], attack['to_hit'], attack['damage_dice']) for attack in crawler.repository.get_attacks("orc")] == [("Hache à deux mains", 5, "1d12+3")]
+    assert crawler.repository.get_stat_block("gobelin") is not None
+
+    states = {row['normalized_name']: row for row in crawler.repository.query("SELECT * FROM crawl_state")}
+    assert {name: row['status'] for name, row in states.items()} == {'gobelin': 'done', 'orc': 'done', 'fantome': 'missing'}
+    assert states['gobelin']['url'] == f"{replay_server.root}/dnd/monstres.php?vf=gobelin"
+    assert states['gobelin']['image_url'] == f"{replay_server.root}/dnd/images/goblin.jpg"
+    assert states['fantome']['last_error'] == "HTTP 404"
+    assert all(row['attempts'] == 0 for row in states.values())
+
+    # Reprise : tout a des PV ou un statut final, aucune requête ne part
+    replay_server.requests.clear()
+    resumed = make_crawler(tmp_path, replay_server)
+    assert resumed.pending_monsters() == []
+    assert resumed.run() == {'done': 0, 'missing': 0, 'error': 0}
+    assert replay_server.requests == []
@@ -0,0 +1,18 @@
+from monster_repository import MonsterRepository
+from virtual_list import RepositoryProvider
+
+
+def test_paging_keeps_homonyms_and_monsters_without_cr(tmp_path):
+    repository = MonsterRepository(str(tmp_path / "monsters.db"))
+    rows = [("gobelin", "Gobelin", None), ("gobelin 2", "Gobelin", None), ("gobelin chef", "Gobelin", 1),
+            ("gobelin archer", "Gobelin", 0.25), ("gobelin sans fp", "Gobelin", None), ("orc", "Orc", None), ("orc 2", "Orc", 0.5)]
+    repository.upsert_many({'normalized_name': normalized_name, 'name': name, 'cr': cr} for normalized_name, name, cr in rows)
+    provider = RepositoryProvider(repository, page_size=2)
+
+    listed = provider.rows(0, len(provider))
+
+    assert len(provider) == len(rows)
+    assert [row[2] for row in listed] == ["gobelin", "gobelin 2", "gobelin sans fp", "gobelin archer", "gobelin chef", "orc", "orc 2"]
+    assert [provider.index_of(row) for row in listed] == list(range(len(rows)))
+    # Saut direct au milieu de la liste (ascenseur) : même résultat qu'en lisant page après page
+    assert RepositoryProvider(repository, page_size=2).rows(4, 7) == listed[4:]
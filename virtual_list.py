@@ -0,0 +1,182 @@
+import tkinter as tk
+from tkinter import ttk
+from lru_cache import LRUCache
+
+
+class ListProvider:
+    # Résultats déjà en mémoire (liste filtrée du sélecteur, résultats approchés) : rien à paginer
+    def __init__(self, items, label=str):
+        self.items = items
+        self.label = label
+        self.positions = None
+
+    def __len__(self):
+        return len(self.items)
+
+    def rows(self, start, stop):
+        return self.items[start:stop]
+
+    def index_of(self, item):
+        if self.positions is None:
+            self.positions = {value: i for i, value in enumerate(self.items)}
+        return self.positions.get(item)
+
+
+class RepositoryProvider:
+    # Lignes (name, cr, normalized_name) lues page par page dans la base ; seules les pages visitées récemment restent en mémoire
+    def __init__(self, repository, page_size=100, max_pages=32, label=lambda row: row[0]):
+        self.repository = repository
+        self.page_size = page_size
+        self.label = label
+        self.total = repository.count_monsters()
+        self.pages = LRUCache(maxsize=max_pages)
+        # Clé après laquelle commence chaque page : la page 0 part du début
+        self.anchors = {0: None}
+
+    def __len__(self):
+        return self.total
+
+    def anchor(self, number):
+        if number not in self.anchors:
+            self.anchors[number] = self.repository.monster_key_at(number * self.page_size - 1)
+        return self.anchors[number]
+
+    def page(self, number):
+        rows = self.pages.get(number)
+        if rows is None:
+            rows = self.repository.page_monsters(self.anchor(number), self.page_size)
+            self.pages.put(number, rows)
+            if rows:
+                self.anchors[number + 1] = rows[-1]
+        return rows
+
+    def rows(self, start, stop):
+        result = []
+        for number in range(start // self.page_size, (max(stop, start + 1) - 1) // self.page_size + 1):
+            page_start = number * self.page_size
+            result.extend(self.page(number)[max(start - page_start, 0):stop - page_start])
+        return result
+
+    def index_of(self, item):
+        return self.repository.count_monsters(before=item) if item is not None else None
+
+
+class VirtualList(ttk.Frame):
+    # Listbox de hauteur fixe : seules les lignes visibles existent côté Tk, la sélection est un index absolu
+    def __init__(self, parent, provider=None, height=10, on_select=None, on_activate=None, **listbox_options):
+        super().__init__(parent)
+        self.provider = provider or ListProvider([])
+        self.height = height
+        self.on_select = on_select
+        self.on_activate = on_activate
+        self.top = 0
+        self.selected = None
+        self.listbox = tk.Listbox(self, height=height, exportselection=False, activestyle="none", **listbox_options)
+        self.listbox.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.on_scroll)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        self.listbox.bind("<Button-1>", self.on_click)
+        self.listbox.bind("<Double-Button-1>", self.on_double_click)
+        self.listbox.bind("<Return>", lambda event: self.activate())
+        self.listbox.bind("<Up>", lambda event: self.move(-1))
+        self.listbox.bind("<Down>", lambda event: self.move(1))
+        self.listbox.bind("<Prior>", lambda event: self.move(-self.height))
+        self.listbox.bind("<Next>", lambda event: self.move(self.height))
+        self.listbox.bind("<Home>", lambda event: self.move_to(0))
+        self.listbox.bind("<End>", lambda event: self.move_to(len(self.provider) - 1))
+        self.listbox.bind("<MouseWheel>", lambda event: self.scroll(-3 if event.delta > 0 else 3))
+        self.listbox.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.listbox.bind("<Button-5>", lambda event: self.scroll(3))
+        self.render()
+
+    def set_provider(self, provider, keep_selection=True):
+        item = self.selected_item() if keep_selection else None
+        self.provider = provider
+        self.top = 0
+        self.selected = None
+        if item is not None:
+            index = provider.index_of(item)
+            if index is not None and index < len(provider):
+                self.selected = index
+                self.top = self.clamp_top(index - self.height // 2)
+        self.render()
+
+    def selected_item(self):
+        if self.selected is None or self.selected >= len(self.provider):
+            return None
+        rows = self.provider.rows(self.selected, self.selected + 1)
+        return rows[0] if rows else None
+
+    def clamp_top(self, top):
+        return max(0, min(top, len(self.provider) - self.height))
+
+    def render(self):
+        rows = self.provider.rows(self.top, self.top + self.height)
+        self.listbox.delete(0, tk.END)
+        if rows:
+            self.listbox.insert(tk.END, *(self.provider.label(row) for row in rows))
+        if self.selected is not None and self.top <= self.selected < self.top + len(rows):
+            self.listbox.selection_set(self.selected - self.top)
+        total = len(self.provider)
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self.height) / total))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll(self, rows):
+        top = self.clamp_top(self.top + rows)
+        if top != self.top:
+            self.top = top
+            self.render()
+        return "break"
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.top = self.clamp_top(int(float(amount) * len(self.provider)))
+            self.render()
+        else:
+            self.scroll(int(amount) * (self.height if unit == "pages" else 1))
+
+    def see(self, index):
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.height:
+            self.top = self.clamp_top(index - self.height + 1)
+
+    def select(self, index):
+        if not len(self.provider):
+            return
+        self.selected = max(0, min(index, len(self.provider) - 1))
+        self.see(self.selected)
+        self.render()
+        if self.on_select:
+            self.on_select(self.selected_item())
+
+    def move(self, delta):
+        self.select(self.top if self.selected is None else self.selected + delta)
+        return "break"
+
+    def move_to(self, index):
+        self.select(index)
+        return "break"
+
+    def on_click(self, event):
+        self.listbox.focus_set()
+        row = self.listbox.nearest(event.y)
+        if 0 <= row < self.listbox.size():
+            self.select(self.top + row)
+        return "break"
+
+    def on_double_click(self, event):
+        self.on_click(event)
+        self.activate()
+        return "break"
+
+    def activate(self):
+        item = self.selected_item()
+        if item is not None and self.on_activate:
+            self.on_activate(item)
+        return "break"